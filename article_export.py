@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文章流式导出 - 把抓取到的每篇文章追加写入 NDJSON 文件（每行一个JSON对象）
+
+支持可选压缩，按文件后缀自动选择：
+  articles.ndjson       不压缩
+  articles.ndjson.gz    gzip
+  articles.ndjson.zst   zstd（需要安装 zstandard）
+
+iter_articles() 逐条惰性读取，处理几十万篇文章时内存占用保持不变。
+"""
+
+import gzip
+import io
+import logging
+
+import json_codec
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖
+    zstandard = None
+
+_GZIP_MAGIC = b'\x1f\x8b'
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# 按文件名识别NDJSON文章流的后缀（extract_html、html_converter 共用）
+NDJSON_SUFFIXES = ('.ndjson', '.jsonl', '.ndjson.gz', '.jsonl.gz', '.ndjson.zst', '.jsonl.zst')
+
+
+def detect_compression(path):
+    """根据文件后缀判断压缩格式"""
+    path = str(path)
+    if path.endswith('.gz'):
+        return 'gzip'
+    if path.endswith('.zst') or path.endswith('.zstd'):
+        return 'zstd'
+    return None
+
+
+def _require_zstandard():
+    if zstandard is None:
+        raise RuntimeError("zstd 压缩需要安装 zstandard：pip install zstandard")
+
+
+class NDJSONArticleSink:
+    """追加写入的 NDJSON 文章导出文件
+
+    不压缩时每条记录写完立即刷到操作系统，进程崩溃最多丢失正在写的一行；
+    压缩时每 flush_every 条刷新一次，避免频繁刷新降低压缩率。
+    """
+
+    def __init__(self, path, compression='auto', flush_every=100):
+        self.path = str(path)
+        self.compression = detect_compression(path) if compression == 'auto' else compression
+        self.flush_every = 1 if self.compression is None else max(1, int(flush_every))
+        self.count = 0
+        self._raw = open(self.path, 'ab')
+        if self.compression == 'gzip':
+            # 追加模式会生成多成员gzip文件，gzip模块可以连续读取
+            self._stream = gzip.GzipFile(fileobj=self._raw, mode='ab')
+        elif self.compression == 'zstd':
+            _require_zstandard()
+            # 每次打开写一个新的zstd帧，读取时跨帧连续解压
+            self._stream = zstandard.ZstdCompressor().stream_writer(self._raw, closefd=False)
+        elif self.compression is None:
+            self._stream = self._raw
+        else:
+            raise ValueError(f"不支持的压缩格式: {self.compression}")
+
+    def write(self, article_data):
+        """写入一篇文章"""
+        self._stream.write(json_codec.dumps_bytes(dict(article_data)) + b'\n')
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self.flush()
+
+    def flush(self):
+        """把已写入的记录刷到磁盘"""
+        if self.compression == 'zstd':
+            self._stream.flush(zstandard.FLUSH_BLOCK)
+        else:
+            self._stream.flush()
+        if self._stream is not self._raw:
+            self._raw.flush()
+
+    def close(self):
+        """结束压缩流并关闭文件"""
+        if self._stream is not self._raw:
+            self._stream.close()
+        self._raw.close()
+        logger.info(f"✓ 已导出 {self.count} 篇文章到: {self.path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _open_stream(raw):
+    """按文件头自动识别压缩格式，返回逐行可迭代的二进制流"""
+    magic = raw.read(4)
+    raw.seek(0)
+    if magic.startswith(_GZIP_MAGIC):
+        return gzip.GzipFile(fileobj=raw, mode='rb')
+    if magic == _ZSTD_MAGIC:
+        _require_zstandard()
+        reader = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+        return io.BufferedReader(reader)
+    return raw
+
+
+def iter_articles(path, line_numbers=False):
+    """逐条惰性读取 NDJSON 文章文件，跳过空行和无法解析的行；line_numbers=True 时产出 (行号, 文章)"""
+    with open(path, 'rb') as raw:
+        with _open_stream(raw) as stream:
+            try:
+                for line_no, line in enumerate(stream, 1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json_codec.loads(line)
+                        yield (line_no, record) if line_numbers else record
+                    except ValueError as e:
+                        # 进程崩溃时最后一行可能不完整
+                        logger.warning(f"⚠️  {path} 第 {line_no} 行不是有效的JSON，已跳过: {e}")
+            except EOFError:
+                # 压缩流在崩溃时没有正常结束，已读出的记录仍然有效
+                logger.warning(f"⚠️  {path} 压缩流不完整，已读取到文件末尾")
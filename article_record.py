@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文章记录 - fetch_article 返回的轻量文章对象，以及按字节估算文章占用内存的工具
+
+ArticleRecord 使用 __slots__，没有每个实例一份的 __dict__，同时支持 article_data['src_url']、
+article_data.get(...) 和 dict(article_data)，原来按字典读取文章的代码不需要修改。
+
+内存主要花在正文上：抓取线程池预取的文章和批量写库的缓冲区都按 article_memory_bytes()
+计算的字节数限制（见 IyunbaoCrawler 的 max_buffer_bytes），并发数再高也不会无限增长。
+
+测量每篇文章的内存占用（字典与 ArticleRecord 对比）:
+  python3 article_record.py --paragraphs 200 --images 50
+"""
+
+import argparse
+import sys
+import tracemalloc
+from datetime import datetime
+
+ARTICLE_KEYS = (
+    'src_url', 'src_title', 'src_content', 'read_count', 'like_count',
+    'src_user', 'from_source', 'create_time', 'post_id'
+)
+
+
+class ArticleRecord:
+    """一篇抓取到的文章"""
+
+    __slots__ = ARTICLE_KEYS
+
+    def __init__(self, src_url, src_title, src_content, read_count, like_count,
+                 src_user, from_source, create_time, post_id):
+        self.src_url = src_url
+        self.src_title = src_title
+        self.src_content = src_content
+        self.read_count = read_count
+        self.like_count = like_count
+        self.src_user = src_user
+        self.from_source = from_source
+        self.create_time = create_time
+        self.post_id = post_id
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        if key not in ARTICLE_KEYS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in ARTICLE_KEYS
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in ARTICLE_KEYS else default
+
+    def keys(self):
+        return ARTICLE_KEYS
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in ARTICLE_KEYS}
+
+    def __repr__(self):
+        return f"ArticleRecord(post_id={self.post_id!r}, src_title={self.src_title!r})"
+
+
+def article_memory_bytes(article_data):
+    """估算一篇文章（ArticleRecord 或字典）占用的内存：对象本身加上各个字段的值"""
+    size = sys.getsizeof(article_data)
+    for key in ARTICLE_KEYS:
+        value = article_data.get(key)
+        if value is not None:
+            size += sys.getsizeof(value)
+    return size
+
+
+def _measure(build, count):
+    """用 tracemalloc 测量构造 count 篇文章新增的内存，返回每篇的字节数"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    articles = [build(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del articles
+    return (after - before) / count
+
+
+def main():
+    from bench_sanitizer import make_article
+    from html_sanitizer import sanitize_html
+
+    parser = argparse.ArgumentParser(description='测量每篇文章的内存占用')
+    parser.add_argument('--paragraphs', type=int, default=200, help='合成文章的段落数，默认：200')
+    parser.add_argument('--images', type=int, default=50, help='合成文章的图片数，默认：50')
+    parser.add_argument('--count', type=int, default=200, help='构造的文章数，默认：200')
+    args = parser.parse_args()
+
+    body = sanitize_html(make_article(args.paragraphs, args.images))
+
+    def fields(i):
+        # 每篇文章的正文各自独立分配，与真实抓取一致
+        return dict(
+            src_url=f'https://bbs.iyunbao.com/m/community/topic?a=1&postId={i}',
+            src_title=f'文章标题 #{i}', src_content=body[:-1] + body[-1],
+            read_count=i, like_count=i % 100, src_user='作者',
+            from_source='iyunbao', create_time=datetime.now(), post_id=i
+        )
+
+    dict_bytes = _measure(fields, args.count)
+    record_bytes = _measure(lambda i: ArticleRecord(**fields(i)), args.count)
+    overhead = lambda total: total - sys.getsizeof(body)
+    print("=" * 80)
+    print(f"📄 正文 {len(body)} 字符（{sys.getsizeof(body)} 字节），{args.count} 篇")
+    print(f"  字典:           {dict_bytes:>10.0f} 字节/篇（正文以外 {overhead(dict_bytes):.0f} 字节）")
+    print(f"  ArticleRecord:  {record_bytes:>10.0f} 字节/篇（正文以外 {overhead(record_bytes):.0f} 字节）")
+    print(f"  article_memory_bytes() 估算: {article_memory_bytes(ArticleRecord(**fields(0)))} 字节/篇")
+    print("=" * 80)
+
+
+if __name__ == '__main__':
+    main()
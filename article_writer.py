@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量写入 baoxianblog - 缓冲抓取到的文章，按数量或时间阈值一次性提交
+
+每批只占用一个事务（一次网络往返 + 一次提交），批量写入失败时对半拆分重试，
+最终只有真正出错的行会被判定为失败。实际写入由 storage.ArticleStorage 完成。
+
+BatchArticleWriter 在调用线程中同步写入；BackgroundArticleWriter 把凑满的一批交给写库线程，
+抓取线程请求下一批文章的同时上一批在写入数据库，写入结果在之后的调用中返回。
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from article_record import article_memory_bytes
+from storage import StorageError
+
+logger = logging.getLogger(__name__)
+
+# 一次刷新的结果：written 为成功写入的文章，failed 为最终写入失败的文章
+FlushResult = namedtuple('FlushResult', ['written', 'failed'])
+
+
+class BatchArticleWriter:
+    """缓冲文章，达到 batch_size 条、占用内存达到 max_buffer_bytes 或距上次刷新超过 flush_interval 秒时批量写入"""
+
+    def __init__(self, storage, batch_size=100, flush_interval=30, metrics=None, max_buffer_bytes=None,
+                 lock=None, after_write=None):
+        self.storage = storage  # storage.ArticleStorage
+        self.metrics = metrics  # metrics.Metrics，记录每批写入的耗时
+        self.lock = lock or threading.Lock()  # 写入时持有，与其他使用同一数据库连接的操作互斥
+        self.after_write = after_write  # 每批写入后、仍持有 lock 时以成功写入的文章调用（如记录正文指纹）
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        self.max_buffer_bytes = max_buffer_bytes  # 为 None 时只按条数刷新
+        self.buffered_bytes = 0
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        if metrics is not None:
+            metrics.gauge('writer_buffered_bytes', lambda: self.buffered_bytes)
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def add(self, article_data):
+        """加入缓冲区；触发刷新时返回 FlushResult，否则返回 None"""
+        self._buffer.append(article_data)
+        if self.max_buffer_bytes is not None:
+            self.buffered_bytes += article_memory_bytes(article_data)
+            if self.buffered_bytes >= self.max_buffer_bytes:
+                return self._dispatch(self._take())
+        if len(self._buffer) >= self.batch_size:
+            return self._dispatch(self._take())
+        return self.maybe_flush()
+
+    def maybe_flush(self):
+        """距上次刷新超过时间阈值时刷新缓冲区"""
+        if self._buffer and time.monotonic() - self._last_flush >= self.flush_interval:
+            return self._dispatch(self._take())
+        return None
+
+    def flush(self):
+        """把缓冲区中的文章写入数据库"""
+        return self._dispatch(self._take()) or FlushResult([], [])
+
+    def close(self):
+        """写入器不再使用时调用；同步写入没有需要释放的资源"""
+
+    def _take(self):
+        """取出缓冲区中的文章并清空缓冲区"""
+        articles = self._buffer
+        self._buffer = []
+        self.buffered_bytes = 0
+        self._last_flush = time.monotonic()
+        return articles
+
+    def _dispatch(self, articles):
+        """同步写入取出的一批文章"""
+        if not articles:
+            return FlushResult([], [])
+        return self._write(articles)
+
+    def _write(self, articles):
+        """持有 lock 写入一批文章，返回 FlushResult"""
+        written, failed = [], []
+        with self.lock:
+            started = time.perf_counter()
+            self._write_batch(articles, written, failed)
+            if self.metrics is not None:
+                self.metrics.observe('db_insert', time.perf_counter() - started)
+            if written and self.after_write is not None:
+                self._after_write(written)
+        logger.info(f"✓ 批量写入数据库: 成功 {len(written)} 篇, 失败 {len(failed)} 篇")
+        return FlushResult(written, failed)
+
+    def _after_write(self, written):
+        """调用 after_write；这些文章已经提交，回调出错只记录日志，不影响它们的写入结果"""
+        try:
+            self.after_write(written)
+        except Exception as e:
+            logger.error(f"✗ 写入后处理 {len(written)} 篇文章出错（文章已写入）: {e}")
+
+    def _write_batch(self, articles, written, failed):
+        """单个事务写入一批文章，失败时对半拆分，只重试出错的那一半"""
+        try:
+            self.storage.write_articles(articles)
+            written.extend(articles)
+            return
+        except StorageError as e:
+            # 单行失败或连接已断开时不再拆分
+            if len(articles) == 1 or not self.storage.is_connected():
+                for article_data in articles:
+                    logger.error(f"✗ 数据库写入失败 #{article_data.get('post_id')}: {e}")
+                failed.extend(articles)
+                return
+
+        mid = len(articles) // 2
+        self._write_batch(articles[:mid], written, failed)
+        self._write_batch(articles[mid:], written, failed)
+
+
+class BackgroundArticleWriter(BatchArticleWriter):
+    """在写库线程中批量写入，调用方只负责凑批
+
+    最多 max_pending 批在队列中等待写入，队列满时 add() 阻塞，抓取随之暂停（背压）。
+    max_buffer_bytes 同时限制缓冲区和已交给写库线程、还没写完的文章：合计达到上限时 add()
+    等待写库线程写完一批，大正文时总内存与同步写入相同。
+    add() / maybe_flush() 返回调用之前已经写完的批次的合并结果（没有时返回 None），
+    flush() 等待所有批次写完后返回。len() 包括已交给写库线程、还没写完的文章。
+    """
+
+    def __init__(self, storage, batch_size=100, flush_interval=30, metrics=None, max_buffer_bytes=None,
+                 lock=None, after_write=None, max_pending=2):
+        super().__init__(storage, batch_size, flush_interval, metrics, max_buffer_bytes, lock, after_write)
+        self._queue = queue.Queue(maxsize=max(1, int(max_pending)))
+        self._results = queue.SimpleQueue()
+        self._in_flight = 0  # 已入队、还没写完的文章数
+        self._in_flight_bytes = 0
+        self._written = threading.Condition()  # 保护上面两个计数，写完一批时通知
+        self._thread = threading.Thread(target=self._run, name='article-writer', daemon=True)
+        self._thread.start()
+        if metrics is not None:
+            metrics.gauge('writer_queued_batches', lambda: self._queue.qsize())
+
+    def __len__(self):
+        return len(self._buffer) + self._in_flight
+
+    def add(self, article_data):
+        if self.max_buffer_bytes is not None:
+            with self._written:
+                if self._in_flight_bytes and self.buffered_bytes + self._in_flight_bytes >= self.max_buffer_bytes:
+                    if self.metrics is not None:
+                        self.metrics.incr('writer_backpressure')
+                    while self._in_flight_bytes and self.buffered_bytes + self._in_flight_bytes >= self.max_buffer_bytes:
+                        self._written.wait()
+        return super().add(article_data)
+
+    def flush(self):
+        """把缓冲区中的文章交给写库线程，等待所有批次写完，返回尚未返回过的结果"""
+        articles = self._take()
+        if articles:
+            self._enqueue(articles)
+        self._queue.join()
+        return self._collect() or FlushResult([], [])
+
+    def close(self):
+        """写完剩余的批次后结束写库线程，之后的结果通过 flush() 取得"""
+        if self._thread.is_alive():
+            self._enqueue(None)
+            self._thread.join()
+
+    def _dispatch(self, articles):
+        if articles:
+            self._enqueue(articles)
+        return self._collect()
+
+    def maybe_flush(self):
+        result = super().maybe_flush()
+        return result if result is not None else self._collect()
+
+    def _enqueue(self, articles):
+        if articles is not None:
+            size = sum(map(article_memory_bytes, articles)) if self.max_buffer_bytes is not None else 0
+            with self._written:
+                self._in_flight += len(articles)
+                self._in_flight_bytes += size
+        if self.metrics is not None and self._queue.full():
+            self.metrics.incr('writer_backpressure')
+        self._queue.put(articles)  # 队列满时阻塞
+
+    def _collect(self):
+        """合并写库线程已经完成的批次的结果，没有时返回 None"""
+        written, failed = [], []
+        collected = False
+        while True:
+            try:
+                result = self._results.get_nowait()
+            except queue.Empty:
+                break
+            collected = True
+            written.extend(result.written)
+            failed.extend(result.failed)
+        return FlushResult(written, failed) if collected else None
+
+    def _run(self):
+        while True:
+            articles = self._queue.get()
+            try:
+                if articles is None:
+                    return
+                self._write_queued(articles)
+            finally:
+                # 写完的批次不再被这个线程引用，等待下一批时不占内存
+                articles = None
+                self._queue.task_done()
+
+    def _write_queued(self, articles):
+        try:
+            result = self._write(articles)
+        except Exception as e:
+            # 写入时的意外错误不能让写库线程退出，这一批记为失败（after_write 的错误已在 _write 中处理）
+            logger.error(f"✗ 写库线程出错，{len(articles)} 篇文章记为失败: {e}")
+            result = FlushResult([], list(articles))
+        self._results.put(result)
+        size = sum(map(article_memory_bytes, articles)) if self.max_buffer_bytes is not None else 0
+        with self._written:
+            self._in_flight -= len(articles)
+            self._in_flight_bytes -= size
+            self._written.notify_all()
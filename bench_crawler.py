@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬虫吞吐量基准测试 - 用本地模拟接口（mock_api.py）和内存存储（storage.MemoryStorage）离线运行爬虫
+
+每个场景在独立的进程中运行，模拟接口也在另一个进程中，互不争抢GIL；报告：
+  articles/s   每秒新增文章数
+  p50 / p99    单篇文章抓取耗时（含限速等待、重试和HTML清理）
+  peak RSS     爬虫进程的峰值内存
+
+shardkill 场景检查分片模式的正确性而不是速度：第一个分片工作进程运行几秒后被杀死（写库缓冲区和
+写库队列中还有文章），租约过期后由第二个进程接手，分片中有任何postId没有入库时场景失败。
+
+使用方法:
+  python3 bench_crawler.py                              # 运行全部场景
+  python3 bench_crawler.py --scenario w8 --scale 0.5    # 只运行一个场景，文章数减半
+  python3 bench_crawler.py --json bench.json            # 保存结果
+  python3 bench_crawler.py --baseline bench.json --max-regression 0.2   # CI：比基线慢20%以上时退出码为1
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import resource
+import socket
+import sys
+import tempfile
+import time
+
+# 场景：mock 为模拟接口参数，crawler 为爬虫参数，storage 为 MemoryStorage 参数，count 为目标新增文章数；
+# shard 为分片场景的工作进程参数（此时 count 是分片的postId数）
+SCENARIOS = {
+    'serial': {
+        'description': '单线程，20ms延迟',
+        'mock': {'latency': 0.02},
+        'crawler': {'workers': 1},
+        'count': 100,
+    },
+    'w8': {
+        'description': '8个抓取线程，20ms延迟',
+        'mock': {'latency': 0.02, 'jitter': 0.01},
+        'crawler': {'workers': 8},
+        'count': 800,
+    },
+    'errors': {
+        'description': '8个抓取线程，10%请求返回500',
+        'mock': {'latency': 0.02, 'error_rate': 0.1},
+        'crawler': {'workers': 8},
+        'count': 400,
+    },
+    'sparse': {
+        'description': '8个抓取线程，5%随机缺失，另有400个连续删除的postId',
+        'mock': {'latency': 0.02, 'missing_rate': 0.05, 'deleted_ranges': [(99500, 99899)]},
+        'crawler': {'workers': 8},
+        'count': 400,
+    },
+    'large': {
+        'description': '8个抓取线程，约1MB的大正文',
+        'mock': {'latency': 0.02, 'paragraphs': 3000, 'images': 300},
+        'crawler': {'workers': 8},
+        'count': 200,
+    },
+    'slowdb': {
+        'description': '8个抓取线程，每批20篇写库耗时100ms（模拟远程MySQL）',
+        'mock': {'latency': 0.02, 'jitter': 0.01},
+        'crawler': {'workers': 8, 'batch_size': 20},
+        'storage': {'write_latency': 0.1},
+        'count': 800,
+    },
+    'shardkill': {
+        'description': '分片工作进程写库前被杀死，租约过期后由另一个进程接手，不能漏掉文章',
+        'mock': {'latency': 0.02},
+        'shard': {'workers': 2, 'batch_size': 50, 'lease': 2, 'kill_after': 3},
+        'count': 600,
+    },
+}
+START_POST_ID = 100000
+# 单个场景的最长运行时间（秒），超过时视为爬虫卡住
+SCENARIO_TIMEOUT = 600
+# 只比较这些指标：(字段, 越大越好)
+REGRESSION_METRICS = (('articles_per_second', True), ('peak_rss_mb', False))
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _serve_mock(port, options):
+    """子进程：运行模拟接口"""
+    from mock_api import MockIyunbaoAPI
+    MockIyunbaoAPI(port=port, **options).serve_forever()
+
+
+def _wait_for_port(port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"模拟接口未在 {timeout} 秒内启动")
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def _run_crawler(base_url, crawler_options, storage_options, count, results):
+    """子进程：用内存存储跑一次爬虫，把结果放入 results 队列"""
+    import iyunbao_crawler
+    from storage import MemoryStorage
+
+    logging.getLogger().setLevel(logging.ERROR)
+    storage = MemoryStorage(keep_content=False, **storage_options)
+    crawler = iyunbao_crawler.IyunbaoCrawler(
+        rate=1e6, burst=max(crawler_options.get('workers', 1), 1) * 2,
+        checkpoint=None, storage=storage, api_base_url=base_url, **crawler_options
+    )
+    # 模拟接口的500是瞬时错误，缩短退避时间，避免测试被等待时间主导
+    crawler.transport.backoff_base = 0.05
+    crawler.transport.backoff_max = 0.5
+
+    latencies = []
+    fetch_article = crawler.fetch_article
+
+    def timed_fetch(post_id):
+        started = time.perf_counter()
+        try:
+            return fetch_article(post_id)
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    crawler.fetch_article = timed_fetch
+    # 爬虫会把第一篇文章保存到当前目录，在临时目录中运行，不留下文件
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        started = time.perf_counter()
+        crawler.crawl_articles(start_post_id=START_POST_ID, count=count)
+        elapsed = time.perf_counter() - started
+
+    snapshot = crawler.metrics.snapshot()
+    results.put({
+        'articles': len(storage.rows),
+        'requests': snapshot['stages'].get('http', {}).get('count', 0),
+        'seconds': round(elapsed, 3),
+        'articles_per_second': round(len(storage.rows) / elapsed, 2) if elapsed else 0,
+        'p50_ms': round(_percentile(latencies, 50) * 1000, 2),
+        'p99_ms': round(_percentile(latencies, 99) * 1000, 2),
+        # Linux 上 ru_maxrss 的单位是KB
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    })
+
+
+def _run_shard_worker(store_path, storage_path, base_url, options, workdir):
+    """子进程：运行一个分片工作进程（shard_coordinator.run_worker），只输出错误日志"""
+    logging.basicConfig(level=logging.ERROR)
+    from shard_coordinator import run_worker
+
+    os.chdir(workdir)
+    workers = options['workers']
+    run_worker(
+        store_path, 'bench', 1e6, workers * 2, workers, options['lease'], options['batch_size'],
+        storage_spec=storage_path, api_base_url=base_url
+    )
+
+
+class ScenarioError(RuntimeError):
+    """场景没有产出结果：爬虫子进程崩溃或超时"""
+
+
+def _wait_for_result(worker, results, timeout):
+    """等待爬虫子进程的结果；子进程退出却没有结果或超时时抛出 ScenarioError"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            # 短间隔轮询，子进程崩溃时不用等到超时
+            return results.get(timeout=1)
+        except queue.Empty:
+            pass
+        if not worker.is_alive():
+            # 退出前放入的结果可能刚刚到达
+            try:
+                return results.get(timeout=1)
+            except queue.Empty:
+                raise ScenarioError(f"爬虫子进程异常退出（exitcode={worker.exitcode}），没有产出结果") from None
+        if time.monotonic() >= deadline:
+            raise ScenarioError(f"爬虫子进程 {timeout} 秒内没有产出结果")
+
+
+def _run_shard_kill(ctx, base_url, options, count, timeout):
+    """把 count 个postId规划为一个分片，第一个工作进程运行 kill_after 秒后被杀死，租约过期后
+    第二个工作进程接手；返回结果字典，分片中有postId没有入库时抛出 ScenarioError"""
+    from post_id_set import post_id_from_url
+    from shard_coordinator import SQLiteShardStore
+    from storage import SQLiteStorage
+
+    # 规划分片的日志会打断结果表格
+    logging.getLogger('shard_coordinator').setLevel(logging.WARNING)
+    low_id = START_POST_ID - count + 1
+    with tempfile.TemporaryDirectory() as workdir:
+        store_path = os.path.join(workdir, 'shards.db')
+        storage_path = os.path.join(workdir, 'articles.db')
+        SQLiteShardStore(store_path).plan(low_id, START_POST_ID, count)
+        args = (store_path, storage_path, base_url, options, workdir)
+
+        started = time.perf_counter()
+        first = ctx.Process(target=_run_shard_worker, args=args)
+        first.start()
+        first.join(options['kill_after'])
+        if not first.is_alive():
+            raise ScenarioError(f"第一个工作进程在 {options['kill_after']} 秒内已经退出（exitcode={first.exitcode}），没有测到中途被杀死")
+        first.kill()
+        first.join()
+        # 等被杀死的进程的租约过期，第二个进程才能领取
+        time.sleep(options['lease'] + 0.5)
+
+        second = ctx.Process(target=_run_shard_worker, args=args)
+        second.start()
+        second.join(timeout)
+        if second.is_alive():
+            second.terminate()
+            second.join()
+            raise ScenarioError(f"接手的工作进程 {timeout} 秒内没有完成分片")
+        if second.exitcode != 0:
+            raise ScenarioError(f"接手的工作进程退出码为 {second.exitcode}")
+        elapsed = time.perf_counter() - started
+
+        storage = SQLiteStorage(storage_path)
+        storage.connect()
+        try:
+            stored = {post_id_from_url(url) for url in storage.iter_src_urls()}
+        finally:
+            storage.close()
+
+    lost = sorted(set(range(low_id, START_POST_ID + 1)) - stored)
+    if lost:
+        raise ScenarioError(f"工作进程被杀死后漏掉 {len(lost)} 篇文章（postId {lost[-1]} … {lost[0]}）")
+    return {
+        'articles': len(stored),
+        'requests': 0,
+        'seconds': round(elapsed, 3),
+        'articles_per_second': round(len(stored) / elapsed, 2) if elapsed else 0,
+        'p50_ms': 0.0,
+        'p99_ms': 0.0,
+        'peak_rss_mb': 0.0,
+    }
+
+
+def run_scenario(name, scale=1.0, timeout=SCENARIO_TIMEOUT):
+    """运行一个场景，返回结果字典；爬虫崩溃或超时时抛出 ScenarioError"""
+    scenario = SCENARIOS[name]
+    ctx = multiprocessing.get_context('spawn')
+    port = _free_port()
+    server = ctx.Process(target=_serve_mock, args=(port, scenario['mock']), daemon=True)
+    server.start()
+    try:
+        _wait_for_port(port)
+        results = ctx.Queue()
+        count = max(1, int(scenario['count'] * scale))
+        base_url = f"http://127.0.0.1:{port}/discover/open/v1/post"
+        if 'shard' in scenario:
+            result = _run_shard_kill(ctx, base_url, scenario['shard'], count, timeout)
+            result['scenario'] = name
+            return result
+        worker = ctx.Process(
+            target=_run_crawler, args=(base_url, scenario['crawler'], scenario.get('storage', {}), count, results)
+        )
+        worker.start()
+        try:
+            result = _wait_for_result(worker, results, timeout)
+            worker.join(timeout=30)
+        finally:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+        if worker.exitcode != 0:
+            raise ScenarioError(f"爬虫子进程退出码为 {worker.exitcode}")
+    finally:
+        server.terminate()
+        server.join()
+    result['scenario'] = name
+    return result
+
+
+def compare(results, baseline, max_regression):
+    """与基线比较，返回退化的指标说明列表"""
+    regressions = []
+    for result in results:
+        base = baseline.get(result['scenario'])
+        if not base:
+            continue
+        for field, higher_is_better in REGRESSION_METRICS:
+            old, new = base.get(field), result.get(field)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (higher_is_better and change < -max_regression) or (not higher_is_better and change > max_regression):
+                regressions.append(f"{result['scenario']}.{field}: {old} → {new} ({change:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='用本地模拟接口测试爬虫吞吐量')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='只运行指定场景，可重复指定，默认运行全部')
+    parser.add_argument('--scale', type=float, default=1.0, help='各场景目标文章数的倍数，默认：1.0')
+    parser.add_argument('--json', help='把结果保存为JSON文件')
+    parser.add_argument('--baseline', help='与之前保存的JSON结果比较')
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help='允许的最大退化比例，超过时退出码为1，默认：0.2')
+    parser.add_argument('--timeout', type=float, default=SCENARIO_TIMEOUT,
+                        help=f'单个场景的最长运行时间（秒），超过或爬虫崩溃时退出码为1，默认：{SCENARIO_TIMEOUT}')
+    args = parser.parse_args()
+
+    names = args.scenario or list(SCENARIOS)
+    results = []
+    print("=" * 80)
+    print(f"{'场景':<10}{'文章':>7}{'请求':>7}{'耗时(s)':>10}{'文章/s':>10}{'p50(ms)':>10}{'p99(ms)':>10}{'峰值内存(MB)':>14}")
+    print("-" * 80)
+    for name in names:
+        try:
+            result = run_scenario(name, args.scale, args.timeout)
+        except ScenarioError as e:
+            print("=" * 80)
+            print(f"✗ 场景 {name} 失败: {e}")
+            sys.exit(1)
+        results.append(result)
+        print(f"{name:<10}{result['articles']:>7}{result['requests']:>7}{result['seconds']:>10}"
+              f"{result['articles_per_second']:>10}{result['p50_ms']:>10}{result['p99_ms']:>10}"
+              f"{result['peak_rss_mb']:>14}")
+    print("=" * 80)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({result['scenario']: result for result in results}, f, ensure_ascii=False, indent=2)
+        print(f"✓ 结果已保存到: {args.json}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print(f"✗ 超过 {args.max_regression:.0%} 的性能退化:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"✓ 与基线相比没有超过 {args.max_regression:.0%} 的退化")
+
+
+if __name__ == '__main__':
+    main()
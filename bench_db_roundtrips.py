@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+查重往返对比 - 同一条查重语句用普通游标和 prepared=True 游标各执行 N 次，报告每次耗时和服务器收到的命令数
+
+mysql-connector-python（8.2，纯Python和C扩展的 prepared 游标都一样）在每次 execute 之前发送
+COM_STMT_RESET，复用同一个预处理语句时每次查重是 COM_STMT_RESET + COM_STMT_EXECUTE 两次往返，
+普通游标只有一次 COM_QUERY。远程MySQL上一次往返远比解析这条按索引查找的语句慢，
+所以 storage.MySQLStorage 的查重和批量写入使用普通游标。
+
+服务器收到的命令数取自 SHOW SESSION STATUS（Com_select / Com_stmt_*），只执行查询，不写入数据。
+
+使用方法:
+  python3 bench_db_roundtrips.py                   # 使用 iyunbao_crawler.DB_CONFIG
+  python3 bench_db_roundtrips.py -n 500 --pure     # 使用纯Python实现
+  python3 bench_db_roundtrips.py --host 127.0.0.1 --port 3307 --user bench --password ''
+"""
+
+import argparse
+import time
+
+import mysql.connector
+from mysql.connector import Error
+
+from iyunbao_crawler import DB_CONFIG
+from post_id_set import build_article_url
+
+EXISTS_SQL = "SELECT id FROM baoxianblog WHERE src_url = %s LIMIT 1"
+STATUS_COUNTERS = ('Com_select', 'Com_stmt_prepare', 'Com_stmt_reset', 'Com_stmt_execute')
+DEFAULT_COUNT = 200
+
+
+def session_counters(connection):
+    """当前会话的命令计数 {名称: 次数}；服务器不支持时返回 None"""
+    cursor = connection.cursor()
+    try:
+        placeholders = ', '.join(['%s'] * len(STATUS_COUNTERS))
+        cursor.execute(f"SHOW SESSION STATUS WHERE Variable_name IN ({placeholders})", STATUS_COUNTERS)
+        return {name: int(value) for name, value in cursor.fetchall()}
+    except Error:
+        return None
+    finally:
+        cursor.close()
+
+
+def plain_exists(connection):
+    """storage.MySQLStorage 的查重方式：每次一个普通游标"""
+    def exists(src_url):
+        cursor = connection.cursor()
+        cursor.execute(EXISTS_SQL, (src_url,))
+        result = cursor.fetchone()
+        cursor.close()
+        return result is not None
+    return exists
+
+
+def prepared_exists(connection):
+    """复用一个 prepared=True 游标，语句在连接上只准备一次"""
+    cursor = connection.cursor(prepared=True)
+
+    def exists(src_url):
+        cursor.execute(EXISTS_SQL, (src_url,))
+        return bool(cursor.fetchall())
+    return exists
+
+
+def measure(db_config, factory, count):
+    """执行 count 次查重，返回 (每次毫秒数, 命令计数增量或 None)"""
+    connection = mysql.connector.connect(**db_config)
+    try:
+        exists = factory(connection)
+        exists(build_article_url(0))  # 预热：建立预处理语句
+        before = session_counters(connection)
+        started = time.perf_counter()
+        # 不存在的postId，只读不写
+        for post_id in range(count):
+            exists(build_article_url(-1 - post_id))
+        elapsed = time.perf_counter() - started
+        after = session_counters(connection)
+    finally:
+        connection.close()
+    delta = None
+    if before is not None and after is not None:
+        # 读取计数的 SHOW 语句不计入这几个计数
+        delta = {name: after.get(name, 0) - before.get(name, 0) for name in STATUS_COUNTERS}
+    return elapsed / count * 1000, delta
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对比查重语句用普通游标和 prepared 游标时的耗时和往返次数')
+    parser.add_argument('-n', '--count', type=int, default=DEFAULT_COUNT, help=f'每种方式执行的次数，默认：{DEFAULT_COUNT}')
+    parser.add_argument('--pure', action='store_true', help='使用纯Python实现（默认为C扩展）')
+    parser.add_argument('--host', help='覆盖 DB_CONFIG 中的主机')
+    parser.add_argument('--port', type=int, help='覆盖 DB_CONFIG 中的端口')
+    parser.add_argument('--user', help='覆盖 DB_CONFIG 中的用户名')
+    parser.add_argument('--password', help='覆盖 DB_CONFIG 中的密码')
+    parser.add_argument('--database', help='覆盖 DB_CONFIG 中的数据库')
+    args = parser.parse_args()
+
+    db_config = dict(DB_CONFIG, use_pure=args.pure)
+    for key in ('host', 'port', 'user', 'password', 'database'):
+        if getattr(args, key) is not None:
+            db_config[key] = getattr(args, key)
+
+    print("=" * 80)
+    print(f"mysql-connector-python {mysql.connector.__version__}（{'纯Python' if args.pure else 'C扩展'}），"
+          f"每种方式查重 {args.count} 次 → {db_config['host']}:{db_config['port']}")
+    print("-" * 80)
+    for label, factory in (('普通游标', plain_exists), ('prepared=True 复用', prepared_exists)):
+        try:
+            per_call_ms, delta = measure(db_config, factory, max(1, args.count))
+        except Error as e:
+            print(f"✗ {label}: 数据库错误: {e}")
+            continue
+        counters = ('  ' + ', '.join(f"{name} {value}" for name, value in delta.items())) if delta else \
+            '  （服务器不支持 SHOW SESSION STATUS）'
+        print(f"{label:<20}{per_call_ms:>8.2f} ms/次{counters}")
+    print("=" * 80)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTML清理性能对比 - 单遍清理器 html_sanitizer 与原来三个脚本中多次 re.sub 的实现
+
+使用方法:
+  python3 bench_sanitizer.py                       # 默认：200个段落、100张图片的合成文章
+  python3 bench_sanitizer.py --paragraphs 1000 --images 500 --repeat 20
+  python3 bench_sanitizer.py --json first_article_97867.json   # 用真实文章测试
+"""
+
+import argparse
+import json
+import random
+import re
+import timeit
+
+from html_sanitizer import sanitize_html, PROFILE_CRAWLER, PROFILE_CONVERTER, PROFILE_EXTRACT
+
+
+# ---- 原实现（保留用于对比） ----
+
+def legacy_crawler_clean(html_content):
+    """iyunbao_crawler.IyunbaoCrawler.clean_html_content 的原实现"""
+    if not html_content:
+        return html_content
+    html_content = re.sub(r'\s+_src="[^"]*"', '', html_content)
+    html_content = re.sub(r'\s+style=""', '', html_content)
+    html_content = re.sub(r'  +', ' ', html_content)
+
+    def fix_img_tag(match):
+        return re.sub(r'\s+_src="[^"]*"', '', match.group(0))
+
+    return re.sub(r'<img[^>]*>', fix_img_tag, html_content)
+
+
+def legacy_converter_clean(html_content):
+    """html_converter.clean_html_content 的原实现"""
+    html_content = re.sub(r'\s+_src="[^"]*"', '', html_content)
+    html_content = re.sub(
+        r'<img\s+([^>]*)src="([^"]*)"([^>]*)>',
+        r'<img \1src="\2" loading="lazy"\3>',
+        html_content
+    )
+    html_content = re.sub(r'\s+', ' ', html_content)
+    html_content = re.sub(r'>\s+<', '><', html_content)
+    return html_content
+
+
+def legacy_extract_process(html_content):
+    """extract_html.process_html 的原实现"""
+    html_content = html_content.replace('\\"', '"')
+    html_content = re.sub(r'\s+_src="[^"]*"', '', html_content)
+    html_content = re.sub(r'<img\s+src="([^"]*)">', r'<img src="\1" alt="">', html_content)
+    return html_content
+
+
+# ---- 测试数据 ----
+
+def make_article(paragraphs, images, seed=0):
+    """生成一篇类似i云保文章的合成HTML：带 _src 的图片、空 style、连续空格和换行"""
+    rng = random.Random(seed)
+    parts = []
+    image_every = max(1, paragraphs // max(images, 1))
+    for i in range(paragraphs):
+        words = '  '.join('保险' * rng.randint(1, 4) for _ in range(rng.randint(5, 30)))
+        parts.append(f'<p style=""><span style="color: rgb(0, 0, 0);">{words}</span>\n</p>\n')
+        if images and i % image_every == 0:
+            url = f'https://cdn.iyunbao.com/img/{rng.randint(1, 10 ** 9)}.png'
+            parts.append(f'<p><img src="{url}" _src="{url}" style="" width="{rng.randint(100, 900)}"/></p>\n')
+    return ''.join(parts)
+
+
+# (场景, 原实现, 配置, 输入是否已经过爬虫清理)
+# 转换工具和提取工具处理的是爬虫已经清理过、存入JSON/数据库的正文，因此用清理后的正文测试
+CASES = [
+    ('crawler', legacy_crawler_clean, PROFILE_CRAWLER, False),
+    ('converter', legacy_converter_clean, PROFILE_CONVERTER, True),
+    ('extract', legacy_extract_process, PROFILE_EXTRACT, True),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对比单遍HTML清理器与原多遍实现的性能')
+    parser.add_argument('--paragraphs', type=int, default=200, help='合成文章的段落数，默认：200')
+    parser.add_argument('--images', type=int, default=100, help='合成文章的图片数，默认：100')
+    parser.add_argument('--repeat', type=int, default=50, help='每个实现重复执行的次数，默认：50')
+    parser.add_argument('--json', help='使用爬虫保存的文章JSON代替合成文章')
+    args = parser.parse_args()
+
+    if args.json:
+        with open(args.json, 'r', encoding='utf-8') as f:
+            raw_html = json.load(f).get('src_content', '')
+    else:
+        raw_html = make_article(args.paragraphs, args.images)
+
+    print("=" * 80)
+    print(f"📄 文章长度: {len(raw_html)} 字符, 图片: {raw_html.count('<img')} 张, 重复: {args.repeat} 次")
+    print("=" * 80)
+    print(f"{'场景':<12}{'原实现(ms)':>14}{'单遍(ms)':>14}{'加速比':>10}   输出")
+    print("-" * 80)
+    crawled = sanitize_html(raw_html, PROFILE_CRAWLER)
+    for name, legacy, profile, after_crawl in CASES:
+        html = crawled if after_crawl else raw_html
+        legacy_ms = timeit.timeit(lambda: legacy(html), number=args.repeat) * 1000 / args.repeat
+        new_ms = timeit.timeit(lambda: sanitize_html(html, profile), number=args.repeat) * 1000 / args.repeat
+        same = '一致' if legacy(html) == sanitize_html(html, profile) else '不同*'
+        print(f"{name:<12}{legacy_ms:>14.3f}{new_ms:>14.3f}{legacy_ms / new_ms:>9.2f}x   {same}")
+    print("=" * 80)
+    print("* 三个脚本现在使用同一套属性规则。原实现中转换工具保留空 style，提取工具只给恰好为")
+    print("  <img src=\"...\"> 的标签补 alt，现在所有缺少 alt 的 img 都会补上，因此输出不同。")
+
+
+if __name__ == '__main__':
+    main()
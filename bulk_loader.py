@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量导入 baoxianblog - 把NDJSON导出文件或本地存储（SQLite/Parquet）中的文章一次性导入MySQL
+
+每块文章（默认10000篇）的处理：
+  1. 写入临时暂存表：优先用 LOAD DATA LOCAL INFILE，服务端或客户端不允许时
+     改为按 max_allowed_packet 切分的多行 INSERT
+  2. 一条 INSERT ... SELECT 把暂存表中 src_url 尚不存在于 baoxianblog 的文章插入（反连接去重）
+  3. 清空暂存表并提交；整个过程关闭自动提交，每块一个事务
+
+第2步的反连接按 src_url 查找，baoxianblog 没有 src_url 索引时每块都是全表扫描，导入前会检查并警告
+（先运行 migrate_schema.py apply 创建索引）。连接取自共享连接池，导入结束后恢复原来的自动提交设置。
+
+输入文件中 src_url 重复的文章只导入第一篇；缺少 baoxianblog 必填字段的记录（如
+extract_html --out *.ndjson 只导出了 id/src_title/src_content）跳过并报告行号。
+正文指纹不会自动记录，导入后可运行 content_hash.py backfill 补算。
+
+使用方法:
+  python3 bulk_loader.py articles.ndjson.gz
+  python3 bulk_loader.py articles.db --chunk-size 20000
+  python3 bulk_loader.py articles.parquet --method insert     # 不尝试 LOAD DATA
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from mysql.connector import Error
+
+from article_export import iter_articles as iter_ndjson_articles
+from db_pool import get_pool
+from iyunbao_crawler import DB_CONFIG
+from migrate_schema import covering_index, load_schema
+from storage import StorageError, article_to_row, open_storage
+
+logger = logging.getLogger(__name__)
+
+STAGE_TABLE = 'iyunbao_bulk_stage'
+DEFAULT_CHUNK_SIZE = 10000
+# 与 storage.article_to_row 返回的元组顺序一致
+INSERT_COLUMNS = (
+    'src_url', 'src_title', 'src_content', 'read_count', 'like_count', 'src_user',
+    'from_source', 'create_time', 'update_time', 'isPublish', 'published_user'
+)
+# storage.article_to_row 用到的字段，缺少任何一个的记录不导入
+REQUIRED_FIELDS = (
+    'src_url', 'src_title', 'src_content', 'read_count', 'like_count', 'src_user', 'from_source', 'create_time'
+)
+# 逐条报告的无效记录数上限，之后只计数
+MAX_REPORTED_INVALID = 20
+# 多行 INSERT 单条语句的行数上限，字节数另按 max_allowed_packet 限制
+MAX_ROWS_PER_STATEMENT = 1000
+LOCAL_STORE_SUFFIXES = ('.db', '.sqlite', '.sqlite3', '.parquet')
+
+# LOAD DATA 默认格式：制表符分隔、换行结束、反斜杠转义，\N 表示 NULL
+_TSV_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r', '\0': '\\0'})
+
+
+def iter_source_articles(path):
+    """按路径读取文章，产出 (位置, 文章)：SQLite文件或 .parquet 目录用本地存储读取，位置为第几条；
+    其余按NDJSON读取，位置为行号"""
+    if str(path).rstrip('/').endswith(LOCAL_STORE_SUFFIXES):
+        store = open_storage(str(path))
+        store.connect()
+        try:
+            yield from enumerate(store.iter_articles(), 1)
+        finally:
+            store.close()
+    else:
+        yield from iter_ndjson_articles(path, line_numbers=True)
+
+
+def missing_fields(article_data):
+    """记录中缺少（或为空值）的必填字段；不是JSON对象时返回全部必填字段"""
+    if not hasattr(article_data, 'get'):
+        return list(REQUIRED_FIELDS)
+    return [field for field in REQUIRED_FIELDS if article_data.get(field) is None]
+
+
+def _tsv_field(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return str(value).translate(_TSV_ESCAPES)
+
+
+def _row_bytes(row):
+    """估算一行在SQL语句中占用的字节数"""
+    return sum(len(str(value).encode('utf-8')) + 4 for value in row)
+
+
+class BulkLoader:
+    """按块把文章经暂存表导入 baoxianblog"""
+
+    def __init__(self, connection, method='auto'):
+        self.connection = connection
+        self.method = method  # 'auto' 先尝试 LOAD DATA；'infile' / 'insert' 只用一种
+        self.inserted = 0
+        self.duplicates = 0
+        self.invalid = 0  # 缺少必填字段而跳过的记录数
+        self._max_statement_bytes = None
+        self._autocommit = None  # prepare() 之前连接的自动提交设置，close() 时恢复
+
+    def prepare(self):
+        """检查 src_url 索引，关闭自动提交，创建与 baoxianblog 列类型一致的临时暂存表"""
+        indexes, primary_key, _ = load_schema(self.connection)
+        if covering_index(indexes, primary_key, ('src_url',)) is None:
+            logger.warning("⚠️  baoxianblog.src_url 没有索引，反连接去重每块都要全表扫描，"
+                           "建议先运行 python3 migrate_schema.py apply")
+        self._autocommit = self.connection.autocommit
+        self.connection.autocommit = False
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {STAGE_TABLE}")
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE {STAGE_TABLE} "
+                f"SELECT {', '.join(INSERT_COLUMNS)} FROM baoxianblog LIMIT 0"
+            )
+            cursor.execute("SELECT @@max_allowed_packet")
+            (max_packet,) = cursor.fetchone()
+            # 留出一半余量给转义和协议开销
+            self._max_statement_bytes = max(int(max_packet) // 2, 64 * 1024)
+        finally:
+            cursor.close()
+
+    def close(self):
+        """删除暂存表并恢复 prepare() 之前的自动提交设置，连接归还连接池之前调用"""
+        if self._autocommit is None:
+            return
+        cursor = self.connection.cursor()
+        try:
+            self.connection.rollback()
+            cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {STAGE_TABLE}")
+        finally:
+            cursor.close()
+            self.connection.autocommit = self._autocommit
+            self._autocommit = None
+
+    def _load_infile(self, cursor, rows):
+        """把一块文章写成临时TSV文件，用 LOAD DATA LOCAL INFILE 导入暂存表"""
+        fd, path = tempfile.mkstemp(prefix='iyunbao_bulk_', suffix='.tsv')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+                for row in rows:
+                    f.write('\t'.join(_tsv_field(value) for value in row))
+                    f.write('\n')
+            cursor.execute(
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE {STAGE_TABLE} CHARACTER SET utf8mb4 "
+                f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' "
+                f"({', '.join(INSERT_COLUMNS)})",
+                (path,)
+            )
+        finally:
+            os.remove(path)
+
+    def _load_inserts(self, cursor, rows):
+        """用多行 INSERT 导入暂存表，每条语句不超过 max_allowed_packet 的一半"""
+        prefix = f"INSERT INTO {STAGE_TABLE} ({', '.join(INSERT_COLUMNS)}) VALUES "
+        placeholder = f"({', '.join(['%s'] * len(INSERT_COLUMNS))})"
+        statement_rows, statement_bytes = [], len(prefix)
+        for row in rows:
+            size = _row_bytes(row)
+            if statement_rows and (len(statement_rows) >= MAX_ROWS_PER_STATEMENT
+                                   or statement_bytes + size > self._max_statement_bytes):
+                self._execute_insert(cursor, prefix, placeholder, statement_rows)
+                statement_rows, statement_bytes = [], len(prefix)
+            statement_rows.append(row)
+            statement_bytes += size
+        if statement_rows:
+            self._execute_insert(cursor, prefix, placeholder, statement_rows)
+
+    def _execute_insert(self, cursor, prefix, placeholder, rows):
+        params = [value for row in rows for value in row]
+        cursor.execute(prefix + ', '.join([placeholder] * len(rows)), params)
+
+    def _stage(self, cursor, rows):
+        if self.method in ('auto', 'infile'):
+            try:
+                self._load_infile(cursor, rows)
+                return
+            except Error as e:
+                if self.method == 'infile':
+                    raise
+                logger.warning(f"⚠️  LOAD DATA LOCAL INFILE 不可用，改用多行INSERT: {e}")
+                self.connection.rollback()
+                self.method = 'insert'
+        self._load_inserts(cursor, rows)
+
+    def load_chunk(self, articles):
+        """导入一块文章（一个事务），返回新插入的文章数"""
+        rows = [article_to_row(a) for a in articles]
+        cursor = self.connection.cursor()
+        try:
+            self._stage(cursor, rows)
+            # 反连接：只插入 baoxianblog 中还没有的 src_url
+            cursor.execute(
+                f"INSERT INTO baoxianblog ({', '.join(INSERT_COLUMNS)}) "
+                f"SELECT {', '.join('s.' + c for c in INSERT_COLUMNS)} FROM {STAGE_TABLE} s "
+                f"LEFT JOIN baoxianblog b ON b.src_url = s.src_url WHERE b.id IS NULL"
+            )
+            inserted = cursor.rowcount
+            cursor.execute(f"DELETE FROM {STAGE_TABLE}")
+            self.connection.commit()
+        except Error:
+            self.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+        self.inserted += inserted
+        self.duplicates += len(rows) - inserted
+        return inserted
+
+    def load(self, records, chunk_size=DEFAULT_CHUNK_SIZE):
+        """按块导入 (位置, 文章) 迭代器，输入中重复的 src_url 只保留第一篇，缺少必填字段的记录跳过；
+        返回新插入的文章数"""
+        seen = set()
+        chunk = []
+        input_duplicates = 0
+        started = time.monotonic()
+        for position, article_data in records:
+            missing = missing_fields(article_data)
+            if missing:
+                self.invalid += 1
+                if self.invalid <= MAX_REPORTED_INVALID:
+                    logger.warning(f"⚠️  第 {position} 行缺少字段 {', '.join(missing)}，已跳过")
+                elif self.invalid == MAX_REPORTED_INVALID + 1:
+                    logger.warning("⚠️  无效记录过多，之后不再逐条报告")
+                continue
+            src_url = article_data['src_url']
+            if src_url in seen:
+                input_duplicates += 1
+                continue
+            seen.add(src_url)
+            chunk.append(article_data)
+            if len(chunk) >= chunk_size:
+                self._load_and_log(chunk, started)
+                chunk = []
+        if chunk:
+            self._load_and_log(chunk, started)
+        self.duplicates += input_duplicates
+        return self.inserted
+
+    def _load_and_log(self, chunk, started):
+        chunk_started = time.monotonic()
+        inserted = self.load_chunk(chunk)
+        elapsed = time.monotonic() - started
+        logger.info(
+            f"✓ 导入 {len(chunk)} 篇（新增 {inserted} 篇，{time.monotonic() - chunk_started:.1f} 秒）"
+            f"，累计新增 {self.inserted} 篇，{self.inserted / elapsed if elapsed else 0:.0f} 篇/秒"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='把NDJSON导出文件或本地存储中的文章批量导入 baoxianblog')
+    parser.add_argument('source', help='NDJSON文件（可为 .gz/.zst），SQLite文件或 .parquet 目录')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f'每个事务导入的文章数，默认：{DEFAULT_CHUNK_SIZE}')
+    parser.add_argument('--method', choices=('auto', 'infile', 'insert'), default='auto',
+                        help='auto：先尝试 LOAD DATA LOCAL INFILE，不可用时改用多行INSERT，默认：auto')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.chunk_size < 1:
+        logger.error("✗ 块大小必须大于0")
+        return False
+
+    pool = get_pool(dict(DB_CONFIG, allow_local_infile=args.method != 'insert'), pool_size=1)
+    try:
+        connection = pool.acquire()
+    except Error as e:
+        logger.error(f"✗ 数据库连接失败: {e}")
+        return False
+
+    loader = BulkLoader(connection, args.method)
+    started = time.monotonic()
+    try:
+        loader.prepare()
+        loader.load(iter_source_articles(args.source), args.chunk_size)
+    except (Error, StorageError, OSError) as e:
+        logger.error(f"✗ 导入失败（已提交的块保留在数据库中，重新运行会跳过它们）: {e}")
+        return False
+    finally:
+        try:
+            loader.close()
+        except Error as e:
+            # 连接状态不确定，不放回连接池
+            logger.warning(f"⚠️  恢复连接设置失败: {e}")
+            pool.discard(connection)
+        else:
+            pool.release(connection)
+
+    logger.info("=" * 80)
+    logger.info(f"✓ 导入完成: 新增 {loader.inserted} 篇，已存在或重复 {loader.duplicates} 篇，"
+                f"缺少字段跳过 {loader.invalid} 篇，耗时 {time.monotonic() - started:.1f} 秒")
+    logger.info("=" * 80)
+    return True
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+正文指纹 - 记录每篇文章清理后正文的指纹，重新抓取时只改写真正变化的正文
+
+指纹保存在表 iyunbao_content_hash（以postId为主键）：
+  - content_hash：清理后HTML的 blake2b 摘要，判断正文是否变化
+  - simhash：正文文字的64位SimHash，海明距离很小的两篇文章基本是同一篇的转载/改写
+
+爬虫写入新文章后只记录 content_hash（blake2b，每篇几十微秒）；SimHash 每篇要几十毫秒，
+放在写库线程上会拖慢写入，留空由 backfill 补算。已有文章同样用 backfill 从数据库中的正文补算，
+之后 recrawl 重新抓取时只比较指纹，正文没变的文章不写库。指纹表只由本脚本创建，爬虫不执行DDL。
+
+使用方法:
+  python3 content_hash.py backfill                       # 为已入库的文章补算指纹（只读正文）
+  python3 content_hash.py recrawl -s 97867 -c 1000 -w 4 --rate 1
+  python3 content_hash.py duplicates --distance 3        # 列出疑似重复的文章
+"""
+
+import argparse
+import hashlib
+import logging
+import re
+from collections import defaultdict
+from itertools import islice
+
+from mysql.connector import Error
+
+from article_record import ArticleRecord
+from storage import UPDATE_ARTICLE_SQL, article_to_update_row
+from post_id_set import PostIdBitmap, post_id_from_url
+
+logger = logging.getLogger(__name__)
+
+HASH_TABLE = 'iyunbao_content_hash'
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 4        # 中文按字切分，取4个字的滑动窗口作为特征
+DEFAULT_DISTANCE = 3    # SimHash 海明距离不超过3视为近似重复
+
+_TAG_RE = re.compile(r'<[^>]+>')
+
+
+def content_fingerprint(html_content):
+    """清理后正文的指纹（32位十六进制），正文完全相同时指纹相同"""
+    return hashlib.blake2b((html_content or '').encode('utf-8'), digest_size=16).hexdigest()
+
+
+def simhash(html_content):
+    """正文文字（去掉标签和空白）的64位SimHash"""
+    text = ''.join(_TAG_RE.sub(' ', html_content or '').split())
+    if not text:
+        return 0
+    shingles = {text[i:i + SHINGLE_SIZE] for i in range(max(1, len(text) - SHINGLE_SIZE + 1))}
+    # 每个特征的哈希转成01字符串，按列统计1的个数，逐位计数在C层面完成
+    bits = [
+        format(int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'big'), '064b')
+        for s in shingles
+    ]
+    half = len(bits) / 2
+    value = 0
+    for column in zip(*bits):
+        value = (value << 1) | (column.count('1') > half)
+    return value
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+def hash_row(post_id, html_content):
+    """指纹表的一行：(post_id, content_hash, simhash)"""
+    return post_id, content_fingerprint(html_content), simhash(html_content)
+
+
+def fingerprint_row(post_id, html_content):
+    """只含 content_hash 的指纹行，simhash 为 None，之后由 backfill 补算"""
+    return post_id, content_fingerprint(html_content), None
+
+
+class ContentHashStore:
+    """指纹表的读写，与爬虫共用同一个数据库连接"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def create_table(self):
+        cursor = self.connection.cursor()
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {HASH_TABLE} (
+                post_id INT PRIMARY KEY,
+                content_hash CHAR(32) NOT NULL,
+                simhash BIGINT UNSIGNED NULL,
+                updated_at DATETIME NOT NULL
+            )
+        """)
+        if not self.table_ready():
+            # 旧版本建的表 simhash 不允许为空，放开后爬虫才能只记录 content_hash
+            cursor.execute(f"ALTER TABLE {HASH_TABLE} MODIFY simhash BIGINT UNSIGNED NULL")
+        self.connection.commit()
+        cursor.close()
+
+    def table_ready(self):
+        """指纹表是否存在且 simhash 允许为空（爬虫据此决定是否记录指纹，不执行DDL）"""
+        cursor = self.connection.cursor()
+        cursor.execute(
+            "SELECT IS_NULLABLE FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = 'simhash'", (HASH_TABLE,)
+        )
+        row = cursor.fetchone()
+        cursor.close()
+        return row is not None and row[0] == 'YES'
+
+    def get_many(self, post_ids):
+        """{post_id: content_hash}，没有记录的postId不在结果中"""
+        post_ids = list(post_ids)
+        if not post_ids:
+            return {}
+        cursor = self.connection.cursor()
+        placeholders = ', '.join(['%s'] * len(post_ids))
+        cursor.execute(
+            f"SELECT post_id, content_hash FROM {HASH_TABLE} WHERE post_id IN ({placeholders})", post_ids
+        )
+        result = dict(cursor.fetchall())
+        cursor.close()
+        return result
+
+    def save(self, cursor, rows):
+        """写入 hash_row() / fingerprint_row() 生成的指纹行，由调用方提交事务
+
+        simhash 为 None 且正文没变时保留已有的 simhash（赋值按顺序执行，simhash 要在 content_hash 之前更新）。
+        """
+        if not rows:
+            return
+        cursor.executemany(
+            f"""
+            INSERT INTO {HASH_TABLE} (post_id, content_hash, simhash, updated_at)
+            VALUES (%s, %s, %s, NOW())
+            ON DUPLICATE KEY UPDATE
+                simhash = IF(VALUES(simhash) IS NULL AND VALUES(content_hash) = content_hash,
+                             simhash, VALUES(simhash)),
+                content_hash = VALUES(content_hash), updated_at = VALUES(updated_at)
+            """,
+            rows
+        )
+
+    def save_rows(self, rows):
+        """写入一批指纹行并提交"""
+        if not rows:
+            return
+        cursor = self.connection.cursor()
+        try:
+            self.save(cursor, rows)
+            self.connection.commit()
+        finally:
+            cursor.close()
+
+    def hashed_post_ids(self):
+        """content_hash 和 simhash 都已记录的postId位图"""
+        cursor = self.connection.cursor()
+        cursor.execute(f"SELECT post_id FROM {HASH_TABLE} WHERE simhash IS NOT NULL")
+        hashed = PostIdBitmap(post_id for (post_id,) in cursor.fetchall())
+        cursor.close()
+        return hashed
+
+    def simhashes(self):
+        """[(post_id, simhash)]，不含尚未补算 simhash 的文章"""
+        cursor = self.connection.cursor()
+        cursor.execute(f"SELECT post_id, simhash FROM {HASH_TABLE} WHERE simhash IS NOT NULL")
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+
+
+def backfill(store, connection, batch_size=500):
+    """为数据库中还没有指纹或还没有 simhash 的i云保文章补算指纹，返回补算的篇数"""
+    hashed = store.hashed_post_ids()
+    read_cursor = connection.cursor(buffered=False)
+    read_cursor.execute("SELECT src_url, src_content FROM baoxianblog WHERE from_source='iyunbao'")
+    rows = []
+    try:
+        while True:
+            chunk = read_cursor.fetchmany(batch_size)
+            if not chunk:
+                break
+            for src_url, src_content in chunk:
+                post_id = post_id_from_url(src_url)
+                if post_id is not None and post_id not in hashed:
+                    # 只保留指纹，不在内存中积累正文
+                    rows.append(hash_row(post_id, src_content))
+                    hashed.add(post_id)
+    finally:
+        read_cursor.close()
+
+    # 读完后再写：未缓冲的游标在读完之前不能在同一连接上执行其它语句
+    written = 0
+    for start in range(0, len(rows), batch_size):
+        cursor = connection.cursor()
+        try:
+            store.save(cursor, rows[start:start + batch_size])
+            connection.commit()
+        finally:
+            cursor.close()
+        written += len(rows[start:start + batch_size])
+        logger.info(f"✓ 已补算 {written}/{len(rows)} 篇文章的指纹")
+    return written
+
+
+def _rewrite_changed(store, connection, articles):
+    """比较一批重新抓取的文章与已有指纹，只改写正文有变化的文章，返回改写的篇数"""
+    stored = store.get_many(a['post_id'] for a in articles)
+    changed = [a for a in articles if stored.get(a['post_id']) != content_fingerprint(a['src_content'])]
+    if not changed:
+        return 0
+    cursor = connection.cursor()
+    try:
+        cursor.executemany(UPDATE_ARTICLE_SQL, [article_to_update_row(a) for a in changed])
+        store.save(cursor, [hash_row(a['post_id'], a['src_content']) for a in changed])
+        connection.commit()
+    except Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    for article_data in changed:
+        logger.info(f"✎ 正文有变化，已更新 #{article_data['post_id']}: {article_data['src_title'][:60]}")
+    return len(changed)
+
+
+def recrawl(crawler, store, start_post_id, count, stop_post_id=1, batch_size=100):
+    """从 start_post_id 往下重新抓取 count 篇已入库的文章，返回 (检查篇数, 改写篇数, 失败篇数)"""
+    known = crawler.known_post_ids
+    post_ids = islice(
+        (post_id for post_id in range(start_post_id, max(stop_post_id, 1) - 1, -1) if post_id in known),
+        count
+    )
+    checked = rewritten = failed = 0
+    batch = []
+    fetched = crawler._iter_fetched_articles(post_ids, skip_known=False)
+    try:
+        for post_id, article_data in fetched:
+            if not isinstance(article_data, ArticleRecord):
+                # None（请求失败）或 NOT_FOUND（文章已被删除）
+                failed += 1
+            else:
+                batch.append(article_data)
+            if len(batch) >= batch_size:
+                rewritten += _rewrite_changed(store, crawler.db_connection, batch)
+                checked += len(batch)
+                batch = []
+            if crawler.stop_event.is_set():
+                break
+    finally:
+        fetched.close()
+    if batch:
+        rewritten += _rewrite_changed(store, crawler.db_connection, batch)
+        checked += len(batch)
+    return checked, rewritten, failed
+
+
+def near_duplicates(store, max_distance=DEFAULT_DISTANCE):
+    """SimHash 海明距离不超过 max_distance 的文章对 [(post_id, post_id, distance)]
+
+    把64位切成 max_distance+1 段：距离不超过 max_distance 的两个值至少有一段完全相同，
+    只需比较同一段取值相同的文章，不用两两比较全部文章。
+    """
+    bands = max_distance + 1
+    width = SIMHASH_BITS // bands
+    rows = store.simhashes()
+    buckets = defaultdict(list)
+    for post_id, value in rows:
+        for band in range(bands):
+            buckets[band, (value >> (band * width)) & ((1 << width) - 1)].append((post_id, value))
+
+    pairs = {}
+    for members in buckets.values():
+        for i, (post_id_a, value_a) in enumerate(members):
+            for post_id_b, value_b in members[i + 1:]:
+                key = (max(post_id_a, post_id_b), min(post_id_a, post_id_b))
+                if key not in pairs:
+                    distance = hamming_distance(value_a, value_b)
+                    if distance <= max_distance:
+                        pairs[key] = distance
+    return sorted((a, b, d) for (a, b), d in pairs.items())
+
+
+def main():
+    # 爬虫模块本身依赖本模块记录指纹，命令行入口中再导入
+    from iyunbao_crawler import IyunbaoCrawler, DEFAULT_RATE, DEFAULT_BURST
+
+    parser = argparse.ArgumentParser(
+        description='i云保文章正文指纹 - 变化检测与近似重复查找',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+使用示例:
+  python3 content_hash.py backfill
+  python3 content_hash.py recrawl -s 97867 -c 1000 -w 4 --rate 1
+  python3 content_hash.py duplicates --distance 3
+        '''
+    )
+    subparsers = parser.add_subparsers(dest='command')
+
+    subparsers.add_parser('backfill', help='为已入库的文章补算指纹')
+
+    recrawl_parser = subparsers.add_parser('recrawl', help='重新抓取已入库的文章，只改写正文有变化的文章')
+    recrawl_parser.add_argument('--start', '-s', type=int, default=97867, help='起始postId，默认：97867')
+    recrawl_parser.add_argument('--count', '-c', type=int, default=100, help='重新抓取的文章数，默认：100')
+    recrawl_parser.add_argument('--workers', '-w', type=int, default=1, help='同时在途的请求数，默认：1')
+    recrawl_parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help='总请求速率（次/秒），默认：0.33')
+    recrawl_parser.add_argument('--burst', type=int, default=DEFAULT_BURST, help='令牌桶容量，默认：1')
+
+    duplicates_parser = subparsers.add_parser('duplicates', help='列出疑似重复的文章')
+    duplicates_parser.add_argument(
+        '--distance', type=int, default=DEFAULT_DISTANCE, help='SimHash 最大海明距离，默认：3'
+    )
+
+    args = parser.parse_args()
+    if args.command is None:
+        parser.print_help()
+        return False
+
+    if args.command == 'recrawl':
+        if args.start < 1 or args.count < 1 or args.workers < 1 or args.rate <= 0 or args.burst < 1:
+            logger.error("✗ 参数必须为正数")
+            return False
+        crawler = IyunbaoCrawler(workers=args.workers, rate=args.rate, burst=args.burst)
+    else:
+        crawler = IyunbaoCrawler()
+    if not crawler.connect_db():
+        return False
+
+    store = ContentHashStore(crawler.db_connection)
+    try:
+        store.create_table()
+        if args.command == 'backfill':
+            written = backfill(store, crawler.db_connection)
+            logger.info(f"\n✓ 补算完成：{written} 篇")
+        elif args.command == 'recrawl':
+            # 先补齐指纹，否则没有指纹的文章都会被当成有变化而改写
+            backfill(store, crawler.db_connection)
+            if not crawler.load_known_post_ids():
+                return False
+            checked, rewritten, failed = recrawl(crawler, store, args.start, args.count)
+            logger.info(f"\n✓ 重新抓取完成：检查 {checked} 篇，改写 {rewritten} 篇，失败 {failed} 篇")
+        else:
+            # 爬虫写入的新文章只有 content_hash，先补算 simhash
+            backfill(store, crawler.db_connection)
+            pairs = near_duplicates(store, args.distance)
+            print("=" * 80)
+            print(f"🔍 疑似重复的文章（海明距离 ≤ {args.distance}）：{len(pairs)} 对")
+            print("-" * 80)
+            for post_id_a, post_id_b, distance in pairs:
+                print(f"  postId {post_id_a:<8} ≈ postId {post_id_b:<8} 距离 {distance}")
+            print("=" * 80)
+        return True
+    except Error as e:
+        logger.error(f"✗ 数据库操作失败: {e}")
+        return False
+    finally:
+        crawler.close_db()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬虫断点文件 - 用一个小型SQLite文件持久化遍历进度和每个postId的处理结果
+
+post_status 表记录每个postId的状态（已入库/已存在/失败/不存在/待写入/空洞跳过），
+run_state 表记录遍历游标和计数，进程崩溃或重启后可以用 --resume 精确续跑；
+meta 表记录跨越多次遍历的值（如追新模式的高水位），开始新的一轮遍历时不会被清空。
+"""
+
+import json
+import sqlite3
+import time
+
+DEFAULT_CHECKPOINT_FILE = 'crawl_checkpoint.db'
+DEFAULT_TAIL_CHECKPOINT_FILE = 'crawl_tail.db'  # 追新模式（post_tail）使用的断点文件
+
+STATUS_DONE = 'done'        # 已写入数据库
+STATUS_EXISTS = 'exists'    # 数据库中已存在，跳过
+STATUS_FAILED = 'failed'    # 请求或写库失败，续跑时重试
+STATUS_MISSING = 'missing'  # 文章不存在（已删除）
+STATUS_PENDING = 'pending'  # 已抓取、在写入缓冲区中尚未提交，续跑时重试
+STATUS_GAP = 'gap'          # 探测空洞时跳过、未逐个请求的postId（推测不存在）
+
+# 续跑时需要重新抓取的状态
+RETRY_STATUSES = (STATUS_FAILED, STATUS_PENDING)
+
+
+class CrawlCheckpoint:
+    """SQLite断点文件；状态变更攒够 commit_every 条提交一次，避免每个postId一次fsync"""
+
+    def __init__(self, path=DEFAULT_CHECKPOINT_FILE, commit_every=50):
+        self.path = path
+        self.commit_every = max(1, int(commit_every))
+        self._dirty = 0
+        self._state = {}
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS post_status (
+                post_id INTEGER PRIMARY KEY,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 1,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS run_state (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def mark(self, post_id, status):
+        """记录postId的处理结果，重复记录时累加尝试次数"""
+        self.conn.execute(
+            """
+            INSERT INTO post_status (post_id, status, attempts, updated_at) VALUES (?, ?, 1, ?)
+            ON CONFLICT(post_id) DO UPDATE SET
+                status = excluded.status,
+                attempts = post_status.attempts + 1,
+                updated_at = excluded.updated_at
+            """,
+            (post_id, status, time.time())
+        )
+        self._dirty += 1
+        if self._dirty >= self.commit_every:
+            self.commit()
+
+    def mark_range(self, high, low, status):
+        """把 high 到 low（含）之间的postId一次性记录为同一状态"""
+        if high < low:
+            return
+        now = time.time()
+        self.conn.executemany(
+            """
+            INSERT INTO post_status (post_id, status, attempts, updated_at) VALUES (?, ?, 1, ?)
+            ON CONFLICT(post_id) DO UPDATE SET
+                status = excluded.status,
+                attempts = post_status.attempts + 1,
+                updated_at = excluded.updated_at
+            """,
+            ((post_id, status, now) for post_id in range(high, low - 1, -1))
+        )
+        self._dirty += high - low + 1
+        if self._dirty >= self.commit_every:
+            self.commit()
+
+    def update_state(self, **values):
+        """更新运行状态（游标、计数等），随下一次提交一起落盘"""
+        self._state.update(values)
+
+    def load_state(self):
+        """读取上次保存的运行状态"""
+        rows = self.conn.execute("SELECT key, value FROM run_state").fetchall()
+        state = {key: json.loads(value) for key, value in rows}
+        self._state.update(state)
+        return state
+
+    def get_meta(self, key, default=None):
+        """读取 meta 表中的值"""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_meta(self, key, value):
+        """写入 meta 表并立即提交（连同尚未提交的状态变更）"""
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+        self.commit()
+
+    def clear_state(self):
+        """开始新的一轮遍历时清空运行状态（保留每个postId的处理结果和 meta 表）"""
+        self._state = {}
+        self.conn.execute("DELETE FROM run_state")
+        self.conn.commit()
+
+    def commit(self):
+        """把状态变更和运行状态一起提交"""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO run_state (key, value) VALUES (?, ?)",
+            [(key, json.dumps(value)) for key, value in self._state.items()]
+        )
+        self.conn.commit()
+        self._dirty = 0
+
+    def post_ids_with_status(self, *statuses):
+        """按postId从大到小返回处于指定状态的postId"""
+        placeholders = ', '.join('?' for _ in statuses)
+        rows = self.conn.execute(
+            f"SELECT post_id FROM post_status WHERE status IN ({placeholders}) ORDER BY post_id DESC",
+            statuses
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def retry_post_ids(self):
+        """续跑时需要重试的postId（失败的和未提交的）"""
+        return self.post_ids_with_status(*RETRY_STATUSES)
+
+    def ranges(self, status):
+        """把处于某状态的postId合并为连续区间 [(high, low), ...]，便于查看"""
+        result = []
+        for post_id in self.post_ids_with_status(status):
+            if result and result[-1][1] == post_id + 1:
+                result[-1][1] = post_id
+            else:
+                result.append([post_id, post_id])
+        return [tuple(r) for r in result]
+
+    def close(self):
+        """提交并关闭断点文件"""
+        self.commit()
+        self.conn.close()
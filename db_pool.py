@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MySQL连接池 - 爬虫、HTML提取、统计刷新和分片租约表共用的数据库连接
+
+到远程MySQL建立连接要多次网络往返和认证，按次连接（如 extract_from_db 每次查询、
+分片心跳每次续约、追新模式每一轮）会把大部分时间花在建连上。连接池：
+  - 按需建立连接，同一进程内最多 pool_size 个；归还的连接留给下一次使用
+  - 取出空闲超过 check_after 秒的连接时先 ping，断开的连接原地重连（重试 RECONNECT_ATTEMPTS 次），
+    远程库短暂断开不会让整次爬取失败
+  - 连接都在使用中时等待归还，超过 acquire_timeout 秒抛出 PoolError
+  - 相同配置的调用方通过 get_pool(db_config) 共用一个连接池
+
+mysql.connector.pooling.MySQLConnectionPool 在创建时就会建好全部 pool_size 个连接，
+这里按需建立，只用一个连接的脚本不会多连。
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import mysql.connector
+from mysql.connector import Error
+from mysql.connector.errors import PoolError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_ACQUIRE_TIMEOUT = 30  # 等待空闲连接的最长时间（秒）
+DEFAULT_CHECK_AFTER = 5       # 空闲超过这么多秒的连接取出时先 ping
+RECONNECT_ATTEMPTS = 3
+RECONNECT_DELAY = 2           # 重连失败后的等待时间（秒）
+
+
+class ConnectionPool:
+    """按需建立、最多 pool_size 个连接的MySQL连接池"""
+
+    def __init__(self, db_config, pool_size=DEFAULT_POOL_SIZE, acquire_timeout=DEFAULT_ACQUIRE_TIMEOUT,
+                 check_after=DEFAULT_CHECK_AFTER):
+        self.db_config = dict(db_config)
+        self.pool_size = max(1, int(pool_size))
+        self.acquire_timeout = acquire_timeout
+        self.check_after = check_after
+        self.created = 0      # 建立过的连接数
+        self.reused = 0       # 取出空闲连接的次数
+        self.reconnected = 0  # 健康检查时重连的次数
+        self._idle = []       # [(连接, 归还时间)]，后进先出，最近用过的连接最可能仍然可用
+        self._open = 0        # 已建立、尚未丢弃的连接数（含使用中的）
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """取出一个可用的连接，用完后调用 release()"""
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            while not self._idle and self._open >= self.pool_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolError(f"{self.acquire_timeout} 秒内没有空闲的数据库连接（连接池大小 {self.pool_size}）")
+                self._cond.wait(remaining)
+            if self._idle:
+                conn, released_at = self._idle.pop()
+                self.reused += 1
+            else:
+                conn, released_at = None, None
+                self._open += 1
+
+        try:
+            if conn is None:
+                conn = mysql.connector.connect(**self.db_config)
+                self.created += 1
+            elif time.monotonic() - released_at >= self.check_after:
+                self.check(conn)
+            return conn
+        except Error:
+            self._discard(conn)
+            raise
+
+    def release(self, conn):
+        """归还连接：回滚未提交的事务；连接已不可用时丢弃"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except Error:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def discard(self, conn):
+        """关闭连接而不放回连接池，用于状态不确定的连接（如非缓冲游标中还有没读完的行）"""
+        self._discard(conn)
+
+    @contextmanager
+    def connection(self):
+        """with pool.connection() as conn: ...，退出时归还连接"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def check(self, conn):
+        """ping 连接，断开时原地重连；重连失败抛出 mysql.connector.Error"""
+        try:
+            conn.ping(reconnect=False)
+            return
+        except Error:
+            pass
+        logger.warning("⚠️  数据库连接已断开，正在重连...")
+        conn.ping(reconnect=True, attempts=RECONNECT_ATTEMPTS, delay=RECONNECT_DELAY)
+        self.reconnected += 1
+        logger.info("✓ 数据库已重新连接")
+
+    def close(self):
+        """关闭所有空闲连接（使用中的连接归还后仍会放回连接池）"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            try:
+                conn.close()
+            except Error:
+                pass
+
+    def _discard(self, conn=None):
+        if conn is not None:
+            try:
+                conn.close()
+            except Error:
+                pass
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_config, pool_size=None):
+    """同一进程内相同配置共用一个连接池；pool_size 大于现有连接池时扩大"""
+    key = tuple(sorted(db_config.items()))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(db_config, pool_size or DEFAULT_POOL_SIZE)
+        elif pool_size and pool_size > pool.pool_size:
+            pool.pool_size = pool_size
+        return pool
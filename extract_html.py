@@ -7,13 +7,20 @@
   python3 extract_html.py first_article_97867.json
   或
   python3 extract_html.py --from-db  (从数据库获取最新文章)
+  或
+  python3 extract_html.py --all --out export/  (批量导出全部i云保文章)
 """
 
 import json
 import argparse
-import mysql.connector
+from pathlib import Path
+
 from mysql.connector import Error
 
+from article_export import NDJSON_SUFFIXES, NDJSONArticleSink
+from db_pool import get_pool
+from html_sanitizer import sanitize_html, PROFILE_EXTRACT
+
 DB_CONFIG = {
     'host': '172.105.225.120',
     'user': 'root',
@@ -38,21 +45,20 @@ def extract_from_json(json_file):
     return title, content
 
 def extract_from_db(post_id=None):
-    """从数据库提取HTML"""
+    """从数据库提取HTML（连接取自共享连接池，多次调用不会每次重新建连）"""
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-        
-        if post_id:
-            query = "SELECT src_title, src_content FROM baoxianblog WHERE id=%s LIMIT 1"
-            cursor.execute(query, (post_id,))
-        else:
-            query = "SELECT src_title, src_content FROM baoxianblog WHERE from_source='iyunbao' ORDER BY id DESC LIMIT 1"
-            cursor.execute(query)
-        
-        result = cursor.fetchone()
-        cursor.close()
-        conn.close()
+        with get_pool(DB_CONFIG).connection() as conn:
+            cursor = conn.cursor()
+            
+            if post_id:
+                query = "SELECT src_title, src_content FROM baoxianblog WHERE id=%s LIMIT 1"
+                cursor.execute(query, (post_id,))
+            else:
+                query = "SELECT src_title, src_content FROM baoxianblog WHERE from_source='iyunbao' ORDER BY id DESC LIMIT 1"
+                cursor.execute(query)
+            
+            result = cursor.fetchone()
+            cursor.close()
         
         if result:
             title, content = result
@@ -68,21 +74,100 @@ def extract_from_db(post_id=None):
         print(f"✗ 数据库错误: {e}")
         return None, None
 
-def process_html(html_content):
-    """处理HTML，确保在博客中能正常显示"""
+def iter_db_articles(conn, id_range=None, chunk_size=500):
+    """用非缓冲游标流式读取文章，每次 fetchmany 一小批，内存占用与表大小无关
     
-    # 1. 确保所有引号都是正常的双引号
-    html_content = html_content.replace('\\"', '"')
+    产出 (id, src_title, src_content)；id_range 为 (最小id, 最大id) 时只读取该范围。
+    非缓冲游标读完之前同一连接不能执行其他查询。
+    """
+    query = "SELECT id, src_title, src_content FROM baoxianblog WHERE from_source='iyunbao'"
+    params = ()
+    if id_range:
+        query += " AND id BETWEEN %s AND %s"
+        params = (min(id_range), max(id_range))
+    query += " ORDER BY id DESC"
     
-    # 2. 移除任何可能存在的 _src 属性（再次确保）
-    import re
-    html_content = re.sub(r'\s+_src="[^"]*"', '', html_content)
+    cursor = conn.cursor(buffered=False)
+    try:
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for row in rows:
+                yield row
+    finally:
+        try:
+            cursor.close()
+        except Error:
+            # 提前结束时游标中还有没读完的行（Unread result found），调用方会丢弃这个连接
+            pass
+
+def export_from_db(output, id_range=None, chunk_size=500):
+    """批量导出：一个连接流式读取全部（或指定id范围的）文章，逐篇处理并立即写出
     
-    # 3. 确保img标签的完整性
-    # 替换 <img src="..."> 为标准格式
-    html_content = re.sub(r'<img\s+src="([^"]*)">', r'<img src="\1" alt="">', html_content)
+    output 以 .ndjson/.jsonl（可带 .gz/.zst）结尾时写入一个NDJSON文件，否则视为目录，
+    每篇文章写出 article_{id}.html 和 content_{id}.txt。
+    """
+    to_ndjson = str(output).endswith(NDJSON_SUFFIXES)
+    sink = None
+    if to_ndjson:
+        sink = NDJSONArticleSink(output)
+    else:
+        output = Path(output)
+        output.mkdir(parents=True, exist_ok=True)
     
-    return html_content
+    count = 0
+    pool = get_pool(DB_CONFIG)
+    try:
+        conn = pool.acquire()
+    except Error as e:
+        print(f"✗ 数据库错误: {e}")
+        if sink is not None:
+            sink.close()
+        return 0
+    
+    print(f"📤 开始导出{'全部' if not id_range else f' id {min(id_range)}-{max(id_range)} 的'}i云保文章 → {output}")
+    articles = iter_db_articles(conn, id_range, chunk_size)
+    completed = False
+    try:
+        for row_id, title, content in articles:
+            html_content = process_html(content or '')
+            if sink is not None:
+                sink.write({'id': row_id, 'src_title': title, 'src_content': html_content})
+            else:
+                with open(output / f"article_{row_id}.html", 'w', encoding='utf-8') as f:
+                    f.write(build_html_page(title, html_content))
+                with open(output / f"content_{row_id}.txt", 'w', encoding='utf-8') as f:
+                    f.write(html_content)
+            count += 1
+            if count % 1000 == 0:
+                print(f"  已导出 {count} 篇...")
+        completed = True
+    except Error as e:
+        print(f"✗ 数据库错误: {e}")
+    except OSError as e:
+        print(f"✗ 写出文件失败: {e}")
+    finally:
+        if completed:
+            pool.release(conn)
+        else:
+            # 中途出错时非缓冲游标中还有没读完的行，这个连接不能再放回连接池
+            articles.close()
+            pool.discard(conn)
+        if sink is not None:
+            sink.close()
+    
+    if completed:
+        print(f"✓ 导出完成，共 {count} 篇文章")
+    else:
+        print(f"✗ 导出中断，已导出 {count} 篇文章")
+    return count
+
+def process_html(html_content):
+    """处理HTML，确保在博客中能正常显示"""
+    # 还原转义引号、移除 _src 属性、补全img的alt，一次扫描完成（见 html_sanitizer）
+    return sanitize_html(html_content, PROFILE_EXTRACT)
 
 def output_formats(title, html_content):
     """输出多种格式"""
@@ -98,24 +183,8 @@ def output_formats(title, html_content):
     
     # 格式2：保存为HTML文件
     html_file = f"article_{title[:20]}.html"
-    html_template = f"""<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title}</title>
-    <style>
-        body {{ font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif; line-height: 1.6; }}
-        img {{ max-width: 100%; height: auto; }}
-    </style>
-</head>
-<body>
-{html_content}
-</body>
-</html>"""
-    
     with open(html_file, 'w', encoding='utf-8') as f:
-        f.write(html_template)
+        f.write(build_html_page(title, html_content))
     print(f"\n【格式2】已保存为HTML文件: {html_file}")
     
     # 格式3：保存为纯HTML内容
@@ -134,6 +203,24 @@ def output_formats(title, html_content):
     except:
         pass
 
+def build_html_page(title, html_content):
+    """用简洁的页面模板包装文章HTML"""
+    return f"""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title}</title>
+    <style>
+        body {{ font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif; line-height: 1.6; }}
+        img {{ max-width: 100%; height: auto; }}
+    </style>
+</head>
+<body>
+{html_content}
+</body>
+</html>"""
+
 def main():
     parser = argparse.ArgumentParser(
         description='提取纯净的HTML内容，用于博客发布',
@@ -143,6 +230,8 @@ def main():
   python3 extract_html.py first_article_97867.json    # 从JSON提取
   python3 extract_html.py --from-db                   # 从数据库提取最新
   python3 extract_html.py --from-db --id 15791        # 从数据库提取指定ID
+  python3 extract_html.py --all --out export/         # 批量导出全部文章到目录
+  python3 extract_html.py --range 15000 16000 --out part.ndjson.gz   # 导出id范围到NDJSON
         '''
     )
     
@@ -164,8 +253,39 @@ def main():
         help='数据库文章ID'
     )
     
+    parser.add_argument(
+        '--all',
+        action='store_true',
+        help='批量导出数据库中全部i云保文章'
+    )
+    
+    parser.add_argument(
+        '--range',
+        type=int,
+        nargs=2,
+        metavar=('START', 'END'),
+        help='批量导出数据库id在 [START, END] 范围内的文章'
+    )
+    
+    parser.add_argument(
+        '--out',
+        default='export',
+        help='批量导出的输出目录，或 .ndjson/.jsonl(.gz/.zst) 文件（默认: export）'
+    )
+    
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=500,
+        help='批量导出时每次从数据库读取的行数（默认: 500）'
+    )
+    
     args = parser.parse_args()
     
+    if args.all or args.range:
+        export_from_db(args.out, args.range, args.chunk_size)
+        return
+    
     if args.from_db:
         title, html_content = extract_from_db(args.id)
     elif args.json_file:
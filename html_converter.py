@@ -7,184 +7,141 @@ HTML转换工具 - 将爬取的JSON文章转换为美观的HTML文件
   python3 html_converter.py                        # 使用默认JSON文件
   python3 html_converter.py first_article_97855.json  # 指定JSON文件
   python3 html_converter.py first_article_97855.json -o my_article.html  # 指定输出文件
+  python3 html_converter.py --batch articles.ndjson.gz -d site/ --mirror-images site/images  # 图片下载到本地
 """
 
 import json
-import re
 import argparse
+import glob
+import os
+import textwrap
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
 from pathlib import Path
+from string import Template
+
+from article_export import NDJSON_SUFFIXES, iter_articles
+from image_mirror import ImageMirror
+
+from html_sanitizer import sanitize_html, PROFILE_CONVERTER
 
 def clean_html_content(html_content):
     """清理HTML内容，移除不必要的属性，优化图片显示"""
-    
-    # 1. 移除 _src 属性（保留 src 属性）
-    html_content = re.sub(r'\s+_src="[^"]*"', '', html_content)
-    
-    # 2. 修复img标签的样式属性
-    # 添加style属性以支持CDN图片的加载
-    html_content = re.sub(
-        r'<img\s+([^>]*)src="([^"]*)"([^>]*)>',
-        r'<img \1src="\2" loading="lazy"\3>',
-        html_content
-    )
-    
-    # 3. 移除多余的空格和标签
-    html_content = re.sub(r'\s+', ' ', html_content)
-    html_content = re.sub(r'>\s+<', '><', html_content)
-    
-    return html_content
+    # 移除 _src 属性、给图片加懒加载、合并空白，一次扫描完成（见 html_sanitizer）
+    return sanitize_html(html_content, PROFILE_CONVERTER)
 
-def create_html_file(json_file, output_html=None):
-    """从JSON文件读取内容，创建HTML文件"""
-    
-    # 确定输出文件名
-    if output_html is None:
-        json_path = Path(json_file)
-        output_html = json_path.parent / f"{json_path.stem}.html"
-    
-    # 读取JSON文件
-    print(f"📖 读取JSON文件: {json_file}")
-    with open(json_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    title = data.get('src_title', '文章')
-    content = data.get('src_content', '')
-    read_count = data.get('read_count', 0)
-    like_count = data.get('like_count', 0)
-    author = data.get('src_user', '未知')
-    create_time = data.get('create_time', '')
-    src_url = data.get('src_url', '')
-    
-    print(f"✓ 读取成功")
-    print(f"  标题: {title[:50]}")
-    print(f"  内容长度: {len(content)} 字符")
-    print(f"  图片数量: {content.count('<img')}")
-    
-    # 清理HTML内容
-    print(f"🧹 清理HTML内容...")
-    content = clean_html_content(content)
-    
-    # 创建完整的HTML文件
-    html_template = f"""<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <meta http-equiv="X-UA-Compatible" content="ie=edge">
-    <title>{title}</title>
-    <style>
-        * {{
+# 页面样式：单篇模式内联到 <style> 中，批量模式可以输出为一个共享的 .css 文件
+PAGE_CSS = """        * {
             margin: 0;
             padding: 0;
             box-sizing: border-box;
-        }}
+        }
         
-        html {{
+        html {
             scroll-behavior: smooth;
-        }}
+        }
         
-        body {{
+        body {
             font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', 'PingFang SC', 'Hiragino Sans GB', 'Microsoft YaHei', sans-serif;
             line-height: 1.6;
             color: #333;
             background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
             min-height: 100vh;
             padding: 20px 0;
-        }}
+        }
         
-        .container {{
+        .container {
             max-width: 900px;
             margin: 0 auto;
             padding: 40px;
             background-color: white;
             box-shadow: 0 10px 40px rgba(0, 0, 0, 0.15);
             border-radius: 12px;
-        }}
+        }
         
-        .header {{
+        .header {
             border-bottom: 3px solid #2563eb;
             padding-bottom: 25px;
             margin-bottom: 35px;
-        }}
+        }
         
-        .header h1 {{
+        .header h1 {
             font-size: 32px;
             margin-bottom: 20px;
             color: #1f2937;
             line-height: 1.4;
             word-wrap: break-word;
-        }}
+        }
         
-        .meta {{
+        .meta {
             display: flex;
             flex-wrap: wrap;
             gap: 25px;
             color: #666;
             font-size: 14px;
-        }}
+        }
         
-        .meta-item {{
+        .meta-item {
             display: flex;
             align-items: center;
             gap: 6px;
-        }}
+        }
         
-        .meta-item strong {{
+        .meta-item strong {
             color: #2563eb;
             font-weight: 600;
-        }}
+        }
         
-        .meta-item span {{
+        .meta-item span {
             color: #666;
-        }}
+        }
         
-        .source-link {{
+        .source-link {
             color: #0ea5e9;
             text-decoration: none;
             font-size: 12px;
             transition: color 0.3s ease;
-        }}
+        }
         
-        .source-link:hover {{
+        .source-link:hover {
             color: #2563eb;
             text-decoration: underline;
-        }}
+        }
         
-        .content {{
+        .content {
             font-size: 16px;
             line-height: 1.9;
             color: #444;
             word-wrap: break-word;
             overflow-wrap: break-word;
-        }}
+        }
         
-        .content p {{
+        .content p {
             margin-bottom: 18px;
             text-align: justify;
-        }}
+        }
         
-        .content h1 {{
+        .content h1 {
             font-size: 26px;
             margin: 30px 0 20px 0;
             color: #1f2937;
-        }}
+        }
         
-        .content h2 {{
+        .content h2 {
             font-size: 22px;
             margin: 28px 0 18px 0;
             color: #2563eb;
             border-left: 5px solid #2563eb;
             padding-left: 15px;
-        }}
+        }
         
-        .content h3 {{
+        .content h3 {
             font-size: 18px;
             margin: 20px 0 15px 0;
             color: #1f2937;
-        }}
+        }
         
-        .content img {{
+        .content img {
             max-width: 100%;
             height: auto;
             margin: 25px 0;
@@ -192,197 +149,415 @@ def create_html_file(json_file, output_html=None):
             box-shadow: 0 4px 12px rgba(0, 0, 0, 0.12);
             display: block;
             transition: transform 0.3s ease, box-shadow 0.3s ease;
-        }}
+        }
         
-        .content img:hover {{
+        .content img:hover {
             transform: scale(1.02);
             box-shadow: 0 6px 16px rgba(0, 0, 0, 0.18);
-        }}
+        }
         
-        .content span {{
+        .content span {
             display: inline;
-        }}
+        }
         
-        .content b, .content strong {{
+        .content b, .content strong {
             color: #2563eb;
             font-weight: 600;
-        }}
+        }
         
-        .content u {{
+        .content u {
             text-decoration: underline;
             text-decoration-style: wavy;
             text-decoration-color: #2563eb;
             text-underline-offset: 2px;
-        }}
+        }
         
-        .content i, .content em {{
+        .content i, .content em {
             font-style: italic;
             color: #666;
-        }}
+        }
         
-        .content ul, .content ol {{
+        .content ul, .content ol {
             margin: 15px 0 15px 30px;
-        }}
+        }
         
-        .content li {{
+        .content li {
             margin-bottom: 8px;
-        }}
+        }
         
-        .content blockquote {{
+        .content blockquote {
             border-left: 4px solid #2563eb;
             padding-left: 15px;
             margin: 15px 0;
             color: #666;
             font-style: italic;
-        }}
+        }
         
-        .footer {{
+        .footer {
             margin-top: 50px;
             padding-top: 25px;
             border-top: 2px solid #e5e7eb;
             text-align: center;
             color: #999;
             font-size: 12px;
-        }}
+        }
         
-        .footer p {{
+        .footer p {
             margin-bottom: 8px;
-        }}
+        }
         
         /* 响应式设计 */
-        @media (max-width: 768px) {{
-            .container {{
+        @media (max-width: 768px) {
+            .container {
                 padding: 20px;
                 border-radius: 8px;
-            }}
+            }
             
-            .header h1 {{
+            .header h1 {
                 font-size: 24px;
-            }}
+            }
             
-            .header {{
+            .header {
                 padding-bottom: 18px;
                 margin-bottom: 25px;
-            }}
+            }
             
-            .content {{
+            .content {
                 font-size: 15px;
                 line-height: 1.8;
-            }}
+            }
             
-            .content h2 {{
+            .content h2 {
                 font-size: 18px;
-            }}
+            }
             
-            .meta {{
+            .meta {
                 flex-direction: column;
                 gap: 12px;
                 font-size: 13px;
-            }}
+            }
             
-            .meta-item {{
+            .meta-item {
                 gap: 5px;
-            }}
-        }}
+            }
+        }
         
-        @media (max-width: 480px) {{
-            body {{
+        @media (max-width: 480px) {
+            body {
                 padding: 10px;
-            }}
+            }
             
-            .container {{
+            .container {
                 padding: 15px;
-            }}
+            }
             
-            .header h1 {{
+            .header h1 {
                 font-size: 18px;
-            }}
+            }
             
-            .content {{
+            .content {
                 font-size: 14px;
-            }}
-        }}
+            }
+        }
         
         /* 打印样式 */
-        @media print {{
-            body {{
+        @media print {
+            body {
                 background: white;
-            }}
+            }
             
-            .container {{
+            .container {
                 box-shadow: none;
                 max-width: 100%;
-            }}
-        }}
-    </style>
+            }
+        }
+"""
+
+# 页面脚本：图片加载失败占位、外部链接新窗口打开
+PAGE_SCRIPT = """        // 图片加载错误处理
+        document.querySelectorAll('img').forEach(img => {
+            img.onerror = function() {
+                this.src = 'data:image/svg+xml,%3Csvg xmlns=%22http://www.w3.org/2000/svg%22 width=%22400%22 height=%22300%22%3E%3Crect fill=%22%23f0f0f0%22 width=%22400%22 height=%22300%22/%3E%3Ctext x=%2250%25%22 y=%2250%25%22 font-size=%2220%22 fill=%22%23999%22 text-anchor=%22middle%22 dy=%22.3em%22%3E图片加载失败%3C/text%3E%3C/svg%3E';
+                this.style.opacity = '0.6';
+            };
+        });
+        
+        // 为外部链接添加target="_blank"
+        document.querySelectorAll('a').forEach(a => {
+            if (a.hostname !== window.location.hostname) {
+                a.target = '_blank';
+                a.rel = 'noopener noreferrer';
+            }
+        });
+"""
+
+# 页面骨架（string.Template 语法），样式和脚本在 _compile_page_template 中一次性填入
+_PAGE_SHELL = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <meta http-equiv="X-UA-Compatible" content="ie=edge">
+    <title>$title</title>
+$style_block
 </head>
 <body>
     <div class="container">
         <div class="header">
-            <h1>{title}</h1>
+            <h1>$title</h1>
             <div class="meta">
                 <div class="meta-item">
                     <strong>👁️ 阅读：</strong>
-                    <span>{read_count:,}</span>
+                    <span>$read_count</span>
                 </div>
                 <div class="meta-item">
                     <strong>👍 看好：</strong>
-                    <span>{like_count}</span>
+                    <span>$like_count</span>
                 </div>
                 <div class="meta-item">
                     <strong>✍️ 作者：</strong>
-                    <span>{author}</span>
+                    <span>$author</span>
                 </div>
                 <div class="meta-item">
                     <strong>📅 发布：</strong>
-                    <span>{create_time.split(' ')[0] if create_time else '未知'}</span>
+                    <span>$publish_date</span>
                 </div>
                 <div class="meta-item">
                     <strong>🔗 来源：</strong>
-                    <a href="{src_url}" class="source-link" target="_blank">i云保社区</a>
+                    <a href="$src_url" class="source-link" target="_blank">i云保社区</a>
                 </div>
             </div>
         </div>
         
         <div class="content">
-            {content}
+            $content
         </div>
         
         <div class="footer">
             <p>✨ 本页面由 i云保爬虫生成</p>
-            <p>生成时间：{datetime.now().strftime('%Y年%m月%d日 %H:%M:%S')}</p>
+            <p>生成时间：$generated_at</p>
         </div>
     </div>
     
     <script>
-        // 图片加载错误处理
-        document.querySelectorAll('img').forEach(img => {{
-            img.onerror = function() {{
-                this.src = 'data:image/svg+xml,%3Csvg xmlns=%22http://www.w3.org/2000/svg%22 width=%22400%22 height=%22300%22%3E%3Crect fill=%22%23f0f0f0%22 width=%22400%22 height=%22300%22/%3E%3Ctext x=%2250%25%22 y=%2250%25%22 font-size=%2220%22 fill=%22%23999%22 text-anchor=%22middle%22 dy=%22.3em%22%3E图片加载失败%3C/text%3E%3C/svg%3E';
-                this.style.opacity = '0.6';
-            }};
-        }});
-        
-        // 为外部链接添加target="_blank"
-        document.querySelectorAll('a').forEach(a => {{
-            if (a.hostname !== window.location.hostname) {{
-                a.target = '_blank';
-                a.rel = 'noopener noreferrer';
-            }}
-        }});
-    </script>
+$script    </script>
 </body>
 </html>
 """
+
+SHARED_CSS_NAME = 'article.css'
+
+_compiled_templates = {}
+
+
+def _compile_page_template(stylesheet_href=None):
+    """把样式和脚本填入页面骨架，编译一次后缓存；stylesheet_href 不为空时引用外部样式文件"""
+    template = _compiled_templates.get(stylesheet_href)
+    if template is None:
+        if stylesheet_href:
+            style_block = f'    <link rel="stylesheet" href="{stylesheet_href}">'
+        else:
+            style_block = f"    <style>\n{PAGE_CSS}    </style>"
+        page = Template(_PAGE_SHELL).safe_substitute(style_block=style_block, script=PAGE_SCRIPT)
+        template = _compiled_templates[stylesheet_href] = Template(page)
+    return template
+
+
+def _format_generated_at(moment=None):
+    return (moment or datetime.now()).strftime('%Y年%m月%d日 %H:%M:%S')
+
+
+def render_article_html(data, stylesheet_href=None, generated_at=None):
+    """把一篇文章渲染为完整的HTML页面"""
+    create_time = data.get('create_time', '')
+    return _compile_page_template(stylesheet_href).substitute(
+        title=data.get('src_title', '文章'),
+        read_count=f"{data.get('read_count', 0):,}",
+        like_count=data.get('like_count', 0),
+        author=data.get('src_user', '未知'),
+        publish_date=create_time.split(' ')[0] if create_time else '未知',
+        src_url=data.get('src_url', ''),
+        content=clean_html_content(data.get('src_content', '')),
+        generated_at=generated_at or _format_generated_at()
+    )
+
+
+def _print_mirror_summary(mirror):
+    print(f"🖼️  图片镜像: 下载 {mirror.downloaded} 张，复用 {mirror.reused} 次，失败 {mirror.failed} 张 → {mirror.store_dir}")
+
+
+def create_html_file(json_file, output_html=None, mirror_dir=None):
+    """从JSON文件读取内容，创建HTML文件；指定 mirror_dir 时图片下载到本地并改写地址"""
+    
+    # 确定输出文件名
+    if output_html is None:
+        json_path = Path(json_file)
+        output_html = json_path.parent / f"{json_path.stem}.html"
+    
+    # 读取JSON文件
+    print(f"📖 读取JSON文件: {json_file}")
+    with open(json_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    
+    title = data.get('src_title', '文章')
+    content = data.get('src_content', '')
+    
+    print(f"✓ 读取成功")
+    print(f"  标题: {title[:50]}")
+    print(f"  内容长度: {len(content)} 字符")
+    print(f"  图片数量: {content.count('<img')}")
+    
+    if mirror_dir:
+        print(f"🖼️  下载图片到本地...")
+        with ImageMirror(mirror_dir) as mirror:
+            data['src_content'] = mirror.localize(content, Path(output_html).parent)
+            _print_mirror_summary(mirror)
+    
+    # 清理HTML内容并套用页面模板
+    print(f"🧹 清理HTML内容...")
+    html_page = render_article_html(data)
     
     # 写入HTML文件
     print(f"💾 生成HTML文件...")
     with open(output_html, 'w', encoding='utf-8') as f:
-        f.write(html_template)
+        f.write(html_page)
     
     print(f"✓ 完成！文件已保存: {output_html}")
     return output_html
 
+def iter_batch_sources(source):
+    """展开批量输入，产出 (文章字典或JSON文件路径, 输出文件名)
+    
+    source 可以是目录（其中的 *.json）、NDJSON文章流、单个JSON文件或通配符。
+    """
+    path = Path(source)
+    if path.is_dir():
+        for json_path in sorted(path.glob('*.json')):
+            yield json_path, f"{json_path.stem}.html"
+    elif path.is_file() and path.name.endswith(NDJSON_SUFFIXES):
+        for index, article in enumerate(iter_articles(path)):
+            yield article, f"article_{article.get('post_id', index)}.html"
+    elif path.is_file():
+        yield path, f"{path.stem}.html"
+    else:
+        for json_path in sorted(glob.glob(source)):
+            yield Path(json_path), f"{Path(json_path).stem}.html"
+
+
+def _render_to_file(item, output_html, stylesheet_href, generated_at):
+    """进程池任务：渲染一篇文章并写入文件"""
+    if isinstance(item, Path):
+        with open(item, 'r', encoding='utf-8') as f:
+            item = json.load(f)
+    with open(output_html, 'w', encoding='utf-8') as f:
+        f.write(render_article_html(item, stylesheet_href, generated_at))
+    return output_html
+
+
+def _load_item(item):
+    """批量来源中的JSON文件路径读取为文章字典，已经是字典的原样返回"""
+    if isinstance(item, Path):
+        with open(item, 'r', encoding='utf-8') as f:
+            item = json.load(f)
+    return item
+
+
+def _pop_localized(localizing, mirror, output_dir):
+    """从图片下载中的文章里取出一篇已经下载完的（都没下载完时等待最先完成的），
+    改写正文中的图片地址，返回 (文章字典, 输出文件名)"""
+    while True:
+        for i, (item, output_name, pending) in enumerate(localizing):
+            if mirror.ready(pending):
+                del localizing[i]
+                content = mirror.localize(item.get('src_content', ''), output_dir, pending)
+                return dict(item, src_content=content), output_name
+        mirror.wait_any(pending for _, _, pending in localizing)
+
+
+def render_batch(source, output_dir, jobs=None, shared_css=False, mirror_dir=None):
+    """批量渲染：模板只编译一次，渲染任务分发到进程池，同时在途的任务数有上限以控制内存
+    
+    指定 mirror_dir 时，提交渲染任务前先把文章图片下载到本地镜像（同一张图片全站只下载一次）。
+    最多 2×下载线程数 篇文章的图片同时下载，哪篇先下载完就先渲染哪篇，慢的图片站只拖住引用它的文章。
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    jobs = jobs or os.cpu_count() or 1
+    
+    stylesheet_href = None
+    if shared_css:
+        stylesheet_href = SHARED_CSS_NAME
+        with open(output_dir / SHARED_CSS_NAME, 'w', encoding='utf-8') as f:
+            f.write(textwrap.dedent(PAGE_CSS))
+        print(f"🎨 共享样式已保存: {output_dir / SHARED_CSS_NAME}")
+    
+    # 整批页面使用同一个生成时间
+    generated_at = _format_generated_at()
+    done_count = 0
+    fail_count = 0
+    next_report = 1000
+    max_pending = jobs * 4
+    
+    mirror = ImageMirror(mirror_dir) if mirror_dir else None
+    localizing = []  # 图片下载中的文章：[(文章字典, 输出文件名, PendingImages)]
+    max_localizing = mirror.workers * 2 if mirror is not None else 0
+    
+    print(f"🚀 批量渲染: {source} → {output_dir}（{jobs} 个进程）")
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = set()
+        
+        def submit_render(item, output_name):
+            nonlocal pending, done_count, fail_count, next_report
+            pending.add(executor.submit(
+                _render_to_file, item, output_dir / output_name, stylesheet_href, generated_at
+            ))
+            if len(pending) >= max_pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                done, failed = _collect(finished)
+                done_count += done
+                fail_count += failed
+                if done_count >= next_report:
+                    print(f"  已生成 {done_count} 个页面...")
+                    next_report += 1000
+        
+        for item, output_name in iter_batch_sources(source):
+            if mirror is not None:
+                try:
+                    item = _load_item(item)
+                except (OSError, ValueError) as e:
+                    print(f"❌ 读取失败: {item}: {e}")
+                    fail_count += 1
+                    continue
+                localizing.append((item, output_name, mirror.submit_html(item.get('src_content', ''))))
+                if len(localizing) < max_localizing:
+                    continue
+                item, output_name = _pop_localized(localizing, mirror, output_dir)
+            submit_render(item, output_name)
+        while localizing:
+            submit_render(*_pop_localized(localizing, mirror, output_dir))
+        done, failed = _collect(wait(pending).done)
+        done_count += done
+        fail_count += failed
+    
+    if mirror is not None:
+        mirror.close()
+        _print_mirror_summary(mirror)
+    print(f"✓ 完成！共生成 {done_count} 个页面，失败 {fail_count} 个")
+    return done_count, fail_count
+
+
+def _collect(futures):
+    """统计已完成任务中的成功和失败数"""
+    done = failed = 0
+    for future in futures:
+        try:
+            future.result()
+            done += 1
+        except Exception as e:
+            print(f"❌ 渲染失败: {e}")
+            failed += 1
+    return done, failed
+
 def main():
     parser = argparse.ArgumentParser(
         description='将爬取的JSON文章转换为美观的HTML文件',
@@ -392,6 +567,9 @@ def main():
   python3 html_converter.py                              # 使用first_article_97855.json
   python3 html_converter.py first_article_97867.json    # 转换指定JSON文件
   python3 html_converter.py first_article_97867.json -o my_article.html
+  python3 html_converter.py --batch articles.ndjson.gz -d site/ --shared-css   # 批量渲染NDJSON文章流
+  python3 html_converter.py --batch json_dir/ -d site/ -j 8                     # 批量渲染目录中的JSON文件
+  python3 html_converter.py --batch articles.ndjson.gz -d site/ --mirror-images site/images   # 图片下载到本地
         '''
     )
     
@@ -407,10 +585,48 @@ def main():
         help='输出HTML文件路径（默认: 与JSON文件同名）'
     )
     
+    parser.add_argument(
+        '--batch',
+        metavar='SOURCE',
+        help='批量模式：目录、通配符或NDJSON文章流（.ndjson/.jsonl，可带 .gz/.zst）'
+    )
+    
+    parser.add_argument(
+        '-d', '--output-dir',
+        default='html_output',
+        help='批量模式的输出目录（默认: html_output）'
+    )
+    
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=None,
+        help='批量模式的渲染进程数（默认: CPU核数）'
+    )
+    
+    parser.add_argument(
+        '--shared-css',
+        action='store_true',
+        help='批量模式下把样式输出为一个共享的 article.css，页面只引用它'
+    )
+    
+    parser.add_argument(
+        '--mirror-images',
+        metavar='DIR',
+        help='把正文图片下载到本地目录（按内容去重）并改写为本地地址，页面不再依赖原CDN'
+    )
+    
     args = parser.parse_args()
     
+    if args.batch:
+        try:
+            render_batch(args.batch, args.output_dir, args.jobs, args.shared_css, args.mirror_images)
+        except Exception as e:
+            print(f"❌ 错误: {e}")
+        return
+    
     try:
-        output_file = create_html_file(args.json_file, args.output)
+        output_file = create_html_file(args.json_file, args.output, args.mirror_images)
         print(f"\n🎉 转换成功！现在可以在浏览器中打开文件查看效果")
         print(f"📂 文件位置: {output_file}")
     except FileNotFoundError:
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+i云保API传输层 - 连接池、分离的连接/读取超时、指数退避重试和自适应限速
+
+  - 连接池大小与并发数匹配，所有线程复用同一组keep-alive连接
+  - 连接超时和读取超时分开设置
+  - 网络错误、超时、429/5xx 按指数退避 + 随机抖动重试，优先遵守服务端的 Retry-After
+  - AdaptiveThrottle 根据观测到的延迟和错误率调整全局令牌桶速率：
+    出错时减半，延迟明显变高时小幅下调，恢复正常后逐步回升到目标速率
+"""
+
+import email.utils
+import logging
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# 可以重试的HTTP状态码
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# 表示服务端过载、需要整体降速的状态码
+THROTTLE_STATUS_CODES = (429, 503)
+
+
+def parse_retry_after(value):
+    """解析 Retry-After 头（秒数或HTTP日期），返回等待秒数，无法解析时返回 None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        moment = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment is None:
+        return None
+    return max(0.0, moment.timestamp() - time.time())
+
+
+class AdaptiveThrottle:
+    """按 AIMD（加性增、乘性减）调整令牌桶速率，速率不会超过 target_rate"""
+
+    def __init__(self, bucket, target_rate, min_rate_ratio=0.05, latency_factor=3.0):
+        self.bucket = bucket
+        self.target_rate = float(target_rate)
+        self.min_rate = self.target_rate * min_rate_ratio
+        self.latency_factor = latency_factor
+        self.latency_ewma = None   # 平滑后的请求延迟
+        self.baseline_latency = None  # 观测到的最低平滑延迟，作为"正常"延迟
+        self.error_ewma = 0.0      # 平滑后的错误率
+        self._lock = threading.Lock()
+
+    def _set_rate(self, rate):
+        rate = min(self.target_rate, max(self.min_rate, rate))
+        if abs(rate - self.bucket.rate) > 1e-9:
+            self.bucket.set_rate(rate)
+        return rate
+
+    def record_success(self, latency):
+        """记录一次成功请求：延迟正常时加性回升，明显变慢时小幅下调"""
+        with self._lock:
+            self.error_ewma *= 0.9
+            if self.latency_ewma is None:
+                self.latency_ewma = latency
+            else:
+                self.latency_ewma = 0.8 * self.latency_ewma + 0.2 * latency
+            if self.baseline_latency is None or self.latency_ewma < self.baseline_latency:
+                self.baseline_latency = self.latency_ewma
+
+            if self.latency_ewma > self.baseline_latency * self.latency_factor:
+                self._set_rate(self.bucket.rate * 0.9)
+            elif self.bucket.rate < self.target_rate:
+                self._set_rate(self.bucket.rate + self.target_rate * 0.05)
+
+    def record_error(self, overloaded=False):
+        """记录一次失败请求：服务端过载或错误率升高时速率减半"""
+        with self._lock:
+            self.error_ewma = 0.9 * self.error_ewma + 0.1
+            if overloaded or self.error_ewma > 0.2:
+                rate = self._set_rate(self.bucket.rate * 0.5)
+                logger.warning(f"⚠️  API响应异常，请求速率降至 {rate:.2f} 次/秒")
+
+
+class ApiTransport:
+    """带连接池、重试和自适应限速的 GET 请求封装，可被多个抓取线程共享"""
+
+    def __init__(self, bucket, headers=None, pool_size=10, connect_timeout=5, read_timeout=15,
+                 max_retries=4, backoff_base=1.0, backoff_max=60.0, adaptive=True, metrics=None):
+        self.bucket = bucket
+        self.metrics = metrics  # metrics.Metrics，记录每次请求的耗时和重试次数
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.throttle = AdaptiveThrottle(bucket, bucket.rate) if adaptive else None
+
+        self.session = requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+        # 连接池大小与并发数匹配，保证每个线程都能复用keep-alive连接
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(int(pool_size), 1))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _record(self, started, counter):
+        """记录一次请求尝试的耗时和结果分类"""
+        if self.metrics is not None:
+            self.metrics.observe('http', time.monotonic() - started)
+            self.metrics.incr(counter)
+
+    def _backoff(self, attempt):
+        """第 attempt 次重试前的等待时间：指数退避 + 全抖动"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def get(self, url):
+        """发送GET请求，返回状态码为2xx的响应；重试次数用尽后抛出 requests.RequestException"""
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            started = time.monotonic()
+            try:
+                response = self.session.get(url, timeout=(self.connect_timeout, self.read_timeout))
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record(started, 'http_network_errors')
+                if self.throttle:
+                    self.throttle.record_error()
+                if attempt >= self.max_retries:
+                    raise
+                delay = sleep = self._backoff(attempt)
+                logger.warning(f"⚠️  请求失败（{e.__class__.__name__}），{delay:.1f}秒后第 {attempt + 1} 次重试: {url}")
+            else:
+                self._record(started, f'http_status_{response.status_code // 100}xx')
+                if response.status_code not in RETRY_STATUS_CODES:
+                    if self.throttle:
+                        self.throttle.record_success(time.monotonic() - started)
+                    response.raise_for_status()
+                    return response
+
+                overloaded = response.status_code in THROTTLE_STATUS_CODES
+                if self.throttle:
+                    self.throttle.record_error(overloaded=overloaded)
+                if attempt >= self.max_retries:
+                    response.raise_for_status()
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                delay = sleep = retry_after if retry_after is not None else self._backoff(attempt)
+                if overloaded:
+                    # 服务端要求降速时让所有线程一起等待；本线程在下一次 bucket.acquire() 中等待，不再另外 sleep，
+                    # 否则要等两倍的 Retry-After
+                    self.bucket.pause(delay)
+                    sleep = 0
+                logger.warning(f"⚠️  HTTP {response.status_code}，{delay:.1f}秒后第 {attempt + 1} 次重试: {url}")
+                response.close()
+
+            if self.metrics is not None:
+                self.metrics.incr('http_retries')
+            if sleep:
+                time.sleep(sleep)
+            attempt += 1
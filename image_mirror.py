@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片本地镜像 - 把文章正文引用的图片并发下载到本地的内容寻址存储，并改写 <img> 的 src
+
+存储结构：
+  images/index.db            SQLite索引：图片URL → 内容哈希和本地路径
+  images/ab/abcdef....png    按文件内容的 sha256 命名，前两位作为子目录
+
+  - 按URL去重：索引中已有的URL不再下载，全站共用的横幅、logo只下载一次
+  - 按内容去重：不同URL的相同图片只保存一份文件
+  - 所有文章的图片共用一个下载线程池：submit_html() 开始下载后立即返回，批量渲染时多篇文章的图片
+    同时下载，某个图片站很慢时只有引用它的文章需要等待；同时在下载中的同一URL只下载一次
+
+使用方法（通过 html_converter.py 调用）:
+  python3 html_converter.py --batch articles.ndjson.gz -d site/ --mirror-images site/images
+"""
+
+import hashlib
+import html
+import logging
+import mimetypes
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = 'index.db'
+DEFAULT_WORKERS = 8
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+# submit() 的结果：by_url 为 {URL: [src, ...]}，local 为已在仓库中的 {URL: 路径}，futures 为下载中的 {URL: Future}
+PendingImages = namedtuple('PendingImages', ['by_url', 'local', 'futures'])
+
+# <img ... src="..."> 中的 src 值
+_IMG_SRC_RE = re.compile(r'(<img\b[^>]*?\ssrc=")([^"]+)(")', re.I)
+_CONTENT_TYPE_EXT = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+    'image/svg+xml': '.svg',
+    'image/bmp': '.bmp',
+}
+
+
+def extract_image_urls(html_content):
+    """正文中 <img> 引用的远程图片地址（src 原始值，保持出现顺序、去重）"""
+    seen = {}
+    for match in _IMG_SRC_RE.finditer(html_content or ''):
+        src = match.group(2)
+        if _download_url(src) is not None:
+            seen.setdefault(src, None)
+    return list(seen)
+
+
+def _download_url(src):
+    """把 src 属性值转换为可下载的URL，data: 等非远程地址返回 None"""
+    url = html.unescape(src.strip())
+    if url.startswith('//'):
+        url = 'https:' + url
+    return url if url.startswith(('http://', 'https://')) else None
+
+
+def _guess_extension(url, content_type):
+    """根据响应类型或URL后缀确定文件扩展名"""
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    if content_type in _CONTENT_TYPE_EXT:
+        return _CONTENT_TYPE_EXT[content_type]
+    suffix = os.path.splitext(urlsplit(url).path)[1].lower()
+    if suffix and len(suffix) <= 5 and mimetypes.guess_type('x' + suffix)[0]:
+        return suffix
+    return mimetypes.guess_extension(content_type) or '.img'
+
+
+class ImageMirror:
+    """内容寻址的本地图片仓库；索引只在调用线程中读写，下载在线程池中进行"""
+
+    def __init__(self, store_dir, workers=DEFAULT_WORKERS, timeout=(5, 20)):
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.timeout = timeout
+        self.workers = max(int(workers), 1)
+        self.downloaded = 0   # 本次运行实际下载的图片数
+        self.reused = 0       # 命中索引、没有下载的图片引用数
+        self.failed = 0
+        self._failed_urls = set()  # 本次运行中下载失败的URL，不再重复尝试
+        self._in_flight = {}  # 已提交、结果还没写入索引的 {URL: Future}，多篇文章引用时共用
+        self._write_lock = threading.Lock()
+
+        self.index = sqlite3.connect(str(self.store_dir / INDEX_FILE))
+        self.index.execute("PRAGMA journal_mode=WAL")
+        self.index.execute("""
+            CREATE TABLE IF NOT EXISTS images (
+                url TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self.index.commit()
+
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(int(workers), 1))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max(int(workers), 1))
+
+    def _lookup(self, urls):
+        """{url: 相对存储目录的路径}，只包含索引中已有且文件仍存在的URL"""
+        found = {}
+        urls = list(urls)
+        # SQLite 单条语句的参数个数有上限，分段查询
+        for start in range(0, len(urls), 500):
+            chunk = urls[start:start + 500]
+            placeholders = ', '.join('?' for _ in chunk)
+            for url, path in self.index.execute(
+                f"SELECT url, path FROM images WHERE url IN ({placeholders})", chunk
+            ):
+                if (self.store_dir / path).exists():
+                    found[url] = path
+        return found
+
+    def _download(self, url):
+        """线程池任务：下载一张图片并按内容哈希保存，返回 (sha256, 相对路径, 字节数)"""
+        with self.session.get(url, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            chunks = []
+            size = 0
+            for chunk in response.iter_content(64 * 1024):
+                size += len(chunk)
+                if size > MAX_IMAGE_BYTES:
+                    raise ValueError(f"图片超过 {MAX_IMAGE_BYTES // (1024 * 1024)}MB")
+                chunks.append(chunk)
+            content_type = response.headers.get('Content-Type')
+        data = b''.join(chunks)
+        digest = hashlib.sha256(data).hexdigest()
+        path = f"{digest[:2]}/{digest}{_guess_extension(url, content_type)}"
+        target = self.store_dir / path
+        # 相同内容只保存一份；先写临时文件再改名，中断时不会留下半个文件
+        with self._write_lock:
+            if not target.exists():
+                target.parent.mkdir(exist_ok=True)
+                tmp = target.with_name(f"{target.name}.{threading.get_ident()}.tmp")
+                with open(tmp, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, target)
+        return digest, path, size
+
+    def submit(self, srcs):
+        """开始下载仓库中还没有的图片，不等待下载完成，返回交给 collect() 的 PendingImages"""
+        by_url = {}
+        for src in srcs:
+            url = _download_url(src)
+            if url is not None and url not in self._failed_urls:
+                by_url.setdefault(url, []).append(src)
+        if not by_url:
+            return PendingImages({}, {}, {})
+
+        local = self._lookup(by_url)
+        self.reused += len(local)
+        futures = {}
+        for url in by_url:
+            if url in local:
+                continue
+            future = self._in_flight.get(url)
+            if future is None:
+                future = self._in_flight[url] = self.executor.submit(self._download, url)
+            futures[url] = future
+        return PendingImages(by_url, local, futures)
+
+    def submit_html(self, html_content):
+        """开始下载正文中引用的图片，见 submit()"""
+        return self.submit(extract_image_urls(html_content))
+
+    @staticmethod
+    def ready(pending):
+        """submit() 开始的下载是否都已结束"""
+        return all(future.done() for future in pending.futures.values())
+
+    @staticmethod
+    def wait_any(pendings):
+        """等待这些 PendingImages 中的任意一个下载结束"""
+        futures = {future for pending in pendings for future in pending.futures.values()}
+        if futures:
+            wait(futures, return_when=FIRST_COMPLETED)
+
+    def collect(self, pending):
+        """等待 submit() 开始的下载结束并写入索引，返回 {src: 相对存储目录的路径}（下载失败的不在结果中）"""
+        local = dict(pending.local)
+        rows = []
+        for url, future in pending.futures.items():
+            # 多篇文章共用的下载只由第一个取结果的调用记录
+            first = self._in_flight.get(url) is future
+            if first:
+                del self._in_flight[url]
+            try:
+                digest, path, size = future.result()
+            except (requests.RequestException, ValueError, OSError) as e:
+                if first:
+                    logger.warning(f"⚠️  图片下载失败，保留原地址: {url} ({e})")
+                    self._failed_urls.add(url)
+                    self.failed += 1
+                continue
+            local[url] = path
+            if first:
+                rows.append((url, digest, path, size, time.time()))
+        if rows:
+            self.index.executemany("INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?)", rows)
+            self.index.commit()
+            self.downloaded += len(rows)
+
+        return {src: path for url, path in local.items() for src in pending.by_url[url]}
+
+    def mirror(self, srcs):
+        """确保这些图片都在本地仓库中，返回 {src: 相对存储目录的路径}（下载失败的不在结果中）"""
+        return self.collect(self.submit(srcs))
+
+    def localize(self, html_content, page_dir, pending=None):
+        """下载正文中的图片，并把 src 改写为相对 page_dir（页面所在目录）的本地路径
+
+        pending 为之前 submit_html(html_content) 的结果时只等待已经开始的下载。
+        """
+        if pending is None:
+            pending = self.submit_html(html_content)
+        mapping = self.collect(pending)
+        if not mapping:
+            return html_content
+        prefix = Path(os.path.relpath(self.store_dir, page_dir)).as_posix()
+
+        def replace(match):
+            path = mapping.get(match.group(2))
+            if path is None:
+                return match.group(0)
+            return f"{match.group(1)}{prefix}/{path}{match.group(3)}"
+
+        return _IMG_SRC_RE.sub(replace, html_content)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.session.close()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
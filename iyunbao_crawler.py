@@ -2,14 +2,30 @@
 # -*- coding: utf-8 -*-
 
 import requests
-import json
 from datetime import datetime
-import mysql.connector
 from mysql.connector import Error
-import time
 import logging
 import argparse
-import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from article_export import NDJSONArticleSink
+from article_record import ArticleRecord, article_memory_bytes
+from article_writer import BackgroundArticleWriter, BatchArticleWriter
+from content_hash import ContentHashStore, fingerprint_row
+from crawl_checkpoint import (
+    CrawlCheckpoint, DEFAULT_CHECKPOINT_FILE, DEFAULT_TAIL_CHECKPOINT_FILE,
+    STATUS_DONE, STATUS_EXISTS, STATUS_FAILED, STATUS_GAP, STATUS_MISSING, STATUS_PENDING
+)
+from db_pool import DEFAULT_POOL_SIZE
+from html_sanitizer import sanitize_html, PROFILE_CRAWLER
+from http_transport import ApiTransport
+from json_codec import decode_post, dumps as json_dumps
+from metrics import Metrics, MetricsServer, SnapshotWriter
+from post_id_set import PostIdBitmap, build_article_url, post_id_from_url
+from rate_limiter import TokenBucket
+from storage import MySQLStorage, StorageError, open_storage
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -30,95 +46,156 @@ HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
 }
 
+# 全局请求速率预算（令牌桶），默认每3秒1个请求，与原先的 time.sleep(3) 相当
+DEFAULT_RATE = 1 / 3
+DEFAULT_BURST = 1
+
+# 请求超时（连接、读取分开）和网络错误/429/5xx的最大重试次数
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 15
+DEFAULT_MAX_RETRIES = 4
+
+# 批量写库阈值：攒够100篇或距上次提交超过30秒就提交一次
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL = 30
+# 预取后尚未处理的文章、写库缓冲区中的文章各自最多占用的内存（按 article_memory_bytes 估算）
+DEFAULT_MAX_BUFFER_BYTES = 64 * 1024 * 1024
+# 等待写库线程写入的批次数上限，队列满时暂停抓取；为0时在爬取线程中同步写入
+DEFAULT_WRITE_QUEUE = 2
+
+# 连续遇到这么多个不存在的postId时，改为跳跃探测空洞的下边界
+DEFAULT_GAP_THRESHOLD = 10
+# 探测空洞时的最大跳跃步长：连续存在的postId不少于这个数时不会被整段跳过
+MAX_GAP_STEP = 64
+
+# 追新模式（--tail）的轮询间隔范围（秒）：有新文章时间隔减半，没有时翻倍
+DEFAULT_POLL_MIN = 30
+DEFAULT_POLL_MAX = 600
+# 探测最新postId时每个探测点向上多看的postId数，容忍新文章中零星被删除的
+DEFAULT_TAIL_SLACK = 3
+
+# 预加载的已入库postId在遍历时直接跳过，不发请求；_iter_fetched_articles 用此标记代替文章数据
+ALREADY_CRAWLED = object()
+# 接口返回 isSuccess=false（文章已删除或不存在），与网络错误等真实失败（None）区分
+NOT_FOUND = object()
+
+
+class _ProbeFailed(Exception):
+    """探测请求失败（网络错误等），无法判断postId是否存在"""
+
+
 class IyunbaoCrawler:
-    def __init__(self):
-        self.db_connection = None
-        self.session = requests.Session()
-        self.session.headers.update(HEADERS)
+    def __init__(self, workers=1, rate=DEFAULT_RATE, burst=DEFAULT_BURST,
+                 batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 preload_known=True, checkpoint=None, export_sink=None,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT,
+                 max_retries=DEFAULT_MAX_RETRIES, gap_threshold=DEFAULT_GAP_THRESHOLD, metrics=None,
+                 storage=None, api_base_url=API_BASE_URL, max_buffer_bytes=DEFAULT_MAX_BUFFER_BYTES,
+                 write_queue=DEFAULT_WRITE_QUEUE):
+        self.storage = storage or MySQLStorage(DB_CONFIG)  # storage.ArticleStorage
+        self.db_connection = None  # 只有MySQL存储才有，正文指纹表依赖它
+        self.api_base_url = api_base_url.rstrip('/')
+        self.export_sink = export_sink  # NDJSONArticleSink，为 None 时不导出
+        self.checkpoint = checkpoint  # CrawlCheckpoint，为 None 时不记录断点
+        self.writer = None
+        self.write_queue = write_queue
+        # 写库线程和爬取线程（逐篇查重）共用一个数据库连接，用这把锁互斥
+        self.db_lock = threading.Lock()
+        self.hash_store = None  # ContentHashStore，记录新文章的正文指纹
+        self.preload_known = preload_known
+        self.known_post_ids = None  # 已入库的postId位图，preload_known 时启动加载
+        self.missing_post_ids = None  # 断点文件中已确认不存在的postId位图，遍历时不再请求
+        self.prefetched = {}  # 遍历前已经请求过的postId → 结果（如 post_tail 探测最新postId时），遍历时直接使用
+        self.gap_threshold = gap_threshold  # 为0时不探测空洞
+        self.progress = {}  # 最近一次爬取的游标和计数，分片模式的心跳线程据此上报进度
+        self.pending_post_ids = set()  # 已加入写库缓冲区、还没有写入结果的postId
+        self.highest_failed_post_id = 0  # 本次爬取中抓取或写库失败的最大postId
+        self.stop_event = threading.Event()  # 置位后爬取循环在处理完当前文章后退出
+        self.metrics = metrics or Metrics()  # 分阶段耗时和计数器，见 metrics.py
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer_bytes = max_buffer_bytes
+        self.workers = max(1, int(workers))
+        # 所有抓取线程共享同一个令牌桶，总请求速率不随并发数增加；
+        # 传输层在每次请求（含重试）前取令牌，并根据延迟和错误率自适应调整速率
+        self.rate_limiter = TokenBucket(rate, burst)
+        self.transport = ApiTransport(
+            self.rate_limiter, headers=HEADERS, pool_size=max(self.workers, 10),
+            connect_timeout=connect_timeout, read_timeout=read_timeout, max_retries=max_retries,
+            metrics=self.metrics
+        )
+        self.session = self.transport.session
+        self.metrics.gauge('request_rate', lambda: self.rate_limiter.rate)
     
     def clean_html_content(self, html_content):
         """清理HTML内容，移除不必要属性，确保图片能正常显示"""
-        if not html_content:
-            return html_content
-        
-        # 1. 移除 _src 属性（保留 src 属性）
-        html_content = re.sub(r'\s+_src="[^"]*"', '', html_content)
-        
-        # 2. 移除其他可能导致问题的属性
-        # 移除 style="" 中的空属性
-        html_content = re.sub(r'\s+style=""', '', html_content)
-        
-        # 3. 清理多个空格
-        html_content = re.sub(r'  +', ' ', html_content)
-        
-        # 4. 优化img标签 - 确保img标签格式正确
-        # 移除img标签中的多余属性
-        def fix_img_tag(match):
-            img_tag = match.group(0)
-            # 保留 src 属性，移除 _src
-            img_tag = re.sub(r'\s+_src="[^"]*"', '', img_tag)
-            return img_tag
-        
-        html_content = re.sub(r'<img[^>]*>', fix_img_tag, html_content)
-        
-        return html_content
+        # 移除 _src 属性和空 style，合并多余空格，一次扫描完成（见 html_sanitizer）
+        return sanitize_html(html_content, PROFILE_CRAWLER)
         
     def connect_db(self):
         """连接数据库"""
         try:
-            self.db_connection = mysql.connector.connect(**DB_CONFIG)
+            self.storage.connect()
+            self.db_connection = self.storage.connection
             logger.info("✓ 数据库连接成功")
             return True
-        except Error as e:
+        except StorageError as e:
             logger.error(f"✗ 数据库连接失败: {e}")
             return False
     
     def close_db(self):
-        """关闭数据库连接"""
-        if self.db_connection and self.db_connection.is_connected():
-            self.db_connection.close()
+        """关闭数据库连接（MySQL连接归还连接池，已断开的连接也要归还）"""
+        connected = self.storage.is_connected()
+        self.storage.close()
+        if connected:
             logger.info("✓ 数据库连接已关闭")
     
+    def _get_post(self, post_id):
+        """请求文章接口，返回 json_codec.PostResponse；接口返回 isSuccess=false 时返回 NOT_FOUND"""
+        url = f"{self.api_base_url}/{post_id}?_version=5.3.0&_client=2"
+        # 限速、超时和重试由传输层处理，这里只会拿到2xx响应
+        response = self.transport.get(url)
+        
+        # 直接解码响应字节，只取用到的字段（见 json_codec）
+        with self.metrics.time('json_decode'):
+            post = decode_post(response.content)
+        
+        # 检查是否成功
+        if not post.is_success:
+            logger.info(f"∅ 文章 #{post_id} 不存在: {post.error_msg}")
+            return NOT_FOUND
+        
+        return post
+    
     def fetch_article(self, post_id):
-        """获取单篇文章（使用API）"""
+        """获取单篇文章（使用API），文章不存在时返回 NOT_FOUND，请求或解析失败时返回 None"""
         try:
-            url = f"{API_BASE_URL}/{post_id}?_version=5.3.0&_client=2"
             logger.info(f"正在获取文章 #{post_id}...")
             
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
+            post = self._get_post(post_id)
+            if post is NOT_FOUND:
+                return NOT_FOUND
             
-            data = response.json()
-            
-            # 检查是否成功
-            if not data.get('isSuccess'):
-                logger.warning(f"✗ 文章 #{post_id} 获取失败: {data.get('errorMsg')}")
-                return None
-            
-            result = data.get('result', {})
-            
-            # 提取数据
-            title = result.get('title', '无标题')
-            content_html = result.get('content', '<p>无内容</p>')
+            # 提取数据；取出正文后释放响应对象，清理后原始正文不再被引用，立即释放
+            title, content_html = post.title, post.content
+            read_count, like_count, author_name = post.read_count, post.like_count, post.author
+            del post
             
             # 清理HTML内容 - 移除不必要的属性，确保图片能正常显示
-            content_html = self.clean_html_content(content_html)
-            
-            read_count = int(result.get('postPv', -1))
-            like_count = int(result.get('likeNum', -1))
-            author_name = result.get('author', {}).get('nickname', '头条妹妹')
+            with self.metrics.time('clean_html'):
+                content_html = self.clean_html_content(content_html)
             
-            article_data = {
-                'src_url': f"https://bbs.iyunbao.com/m/community/topic?a=1&postId={post_id}",
-                'src_title': title[:191],  # 限制长度
-                'src_content': content_html,  # 已清理的HTML
-                'read_count': read_count,
-                'like_count': like_count,
-                'src_user': author_name,
-                'from_source': 'iyunbao',
-                'create_time': datetime.now(),
-                'post_id': post_id
-            }
+            article_data = ArticleRecord(
+                src_url=build_article_url(post_id),
+                src_title=title[:191],  # 限制长度
+                src_content=content_html,  # 已清理的HTML
+                read_count=read_count,
+                like_count=like_count,
+                src_user=author_name,
+                from_source='iyunbao',
+                create_time=datetime.now(),
+                post_id=post_id
+            )
             
             logger.info(f"✓ 成功解析文章 #{post_id}")
             logger.info(f"  标题: {title[:80]}")
@@ -133,82 +210,339 @@ class IyunbaoCrawler:
             logger.error(f"✗ 解析文章 #{post_id} 失败: {e}")
             return None
     
+    def fetch_post_stats(self, post_id):
+        """只取文章的阅读数和看好数，返回 (read_count, like_count)；文章不存在时返回 NOT_FOUND，失败时返回 None
+        
+        不清理、不保存正文，供 stats_refresh 增量刷新统计数据使用。
+        """
+        try:
+            post = self._get_post(post_id)
+            if post is NOT_FOUND:
+                return NOT_FOUND
+            return post.read_count, post.like_count
+        except requests.RequestException as e:
+            logger.error(f"✗ 网络请求失败 #{post_id}: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"✗ 解析文章 #{post_id} 统计数据失败: {e}")
+            return None
+    
+    def _known_result(self, post_id):
+        """不发请求就能确定结果时返回 ALREADY_CRAWLED / NOT_FOUND（或已预先请求到的文章），否则返回 None"""
+        if post_id in self.prefetched:
+            return self.prefetched.pop(post_id)
+        if self.known_post_ids is not None and post_id in self.known_post_ids:
+            return ALREADY_CRAWLED
+        if self.missing_post_ids is not None and post_id in self.missing_post_ids:
+            return NOT_FOUND
+        return None
+    
+    def _iter_post_ids(self, start_post_id, retry_post_ids=(), stop_post_id=1):
+        """产出 (postId, 是否重试)：先产出需要重试的postId，再从 start_post_id 开始从大到小遍历到 stop_post_id（含）
+
+        重试的postId可能在遍历区间之内（如上次用了不同的 --start），顺序遍历时不再重复产出。
+        """
+        retry_post_ids = list(retry_post_ids)
+        for post_id in retry_post_ids:
+            yield post_id, True
+        retried = set(retry_post_ids)
+        post_id = start_post_id
+        while post_id >= max(stop_post_id, 1):
+            if post_id not in retried:
+                yield post_id, False
+            post_id -= 1
+    
+    def _iter_fetched_articles(self, post_ids, fetch=None, skip_known=True, tagged=False):
+        """按 post_ids 的顺序依次产出 (post_id, article_data)
+        
+        workers > 1 时使用线程池预取，保持最多 2*workers 个请求在途，
+        但结果仍按postId顺序返回，后续的去重和入库逻辑与串行模式一致。
+        已完成但还没轮到处理的文章超过 max_buffer_bytes 时暂停提交新请求（背压），
+        某个慢请求挡在队首时，后面预取的大正文不会无限堆积。
+        已入库的postId不发请求，article_data 为 ALREADY_CRAWLED；已确认不存在的为 NOT_FOUND。
+        fetch 默认为 fetch_article，也可以换成 fetch_post_stats 等只取部分数据的方法；
+        skip_known=False 时已入库的postId也会重新请求（重新抓取已有文章时使用）。
+        tagged=True 时 post_ids 的每一项为 (post_id, 标记)（如 _iter_post_ids 的是否重试），
+        产出 (post_id, 标记, article_data)。
+        """
+        fetch = fetch or self.fetch_article
+        known_result = self._known_result if skip_known else (lambda post_id: None)
+        items = iter(post_ids) if tagged else ((post_id, None) for post_id in post_ids)
+        output = (lambda post_id, tag, result: (post_id, tag, result)) if tagged else \
+            (lambda post_id, tag, result: (post_id, result))
+        if self.workers == 1:
+            for post_id, tag in items:
+                known = known_result(post_id)
+                yield output(post_id, tag, fetch(post_id) if known is None else known)
+            return
+        
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        pending = deque()
+        window = self.workers * 2
+        try:
+            while True:
+                while len(pending) < window and not self._prefetch_full(pending):
+                    item = next(items, None)
+                    if item is None:
+                        break
+                    next_post_id, tag = item
+                    known = known_result(next_post_id)
+                    future = executor.submit(fetch, next_post_id) if known is None else None
+                    pending.append((next_post_id, tag, future, known))
+                if not pending:
+                    return
+                post_id, tag, future, known = pending.popleft()
+                yield output(post_id, tag, known if future is None else future.result())
+        finally:
+            # 提前结束时取消尚未开始的请求
+            for _, _, future, _ in pending:
+                if future is not None:
+                    future.cancel()
+            executor.shutdown(wait=True)
+    
+    def _prefetch_full(self, pending):
+        """预取队列中已完成的文章占用的内存是否达到 max_buffer_bytes"""
+        buffered = 0
+        for _, _, future, _ in pending:
+            if future is not None and future.done() and not future.cancelled() and future.exception() is None:
+                result = future.result()
+                if isinstance(result, ArticleRecord):
+                    buffered += article_memory_bytes(result)
+                    if buffered >= self.max_buffer_bytes:
+                        self.metrics.incr('prefetch_backpressure')
+                        return True
+        return False
+    
+    def _probe(self, post_id):
+        """探测单个postId，优先使用不发请求就能确定的结果"""
+        known = self._known_result(post_id)
+        return self.fetch_article(post_id) if known is None else known
+    
+    def _probe_gap(self, high, low):
+        """从 high 往下探测连续不存在的postId区间，返回最靠上的存在的 (post_id, article_data)
+        
+        先按 2、4、8…… 的步长（最大 MAX_GAP_STEP）跳跃，直到探到存在的postId（或请求失败），再在最后两次探测之间二分，
+        找到空洞的下边界。被跳过、没有逐个请求的postId记为 STATUS_GAP。
+        一直探到 low 都不存在时返回 (None, None)。
+        """
+        logger.info(f"🔍 连续 {self.gap_threshold} 个postId不存在，从 {high} 开始向下探测空洞")
+        probed_missing = []
+        missing_above = high + 1  # 已确认不存在的最小postId
+        step = 1
+        while True:
+            step = min(step * 2, MAX_GAP_STEP)
+            probe = max(missing_above - step, low)
+            result = self._probe(probe)
+            if result is not NOT_FOUND:
+                break
+            probed_missing.append(probe)
+            missing_above = probe
+            if probe == low:
+                self._mark_checkpoint_range(high, low, STATUS_GAP)
+                self.metrics.incr('gap_postids_skipped', high - low + 1)
+                for post_id in probed_missing:
+                    self._mark_checkpoint(post_id, STATUS_MISSING)
+                logger.info(f"🔍 postId {high} → {low} 全部不存在（探测 {len(probed_missing)} 次）")
+                return None, None
+        
+        # probe 存在、missing_above 不存在，二分找出两者之间最靠上的存在的postId
+        live_post_id, live_result = probe, result
+        lo, hi = probe + 1, missing_above - 1
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            result = self._probe(mid)
+            if result is NOT_FOUND:
+                probed_missing.append(mid)
+                hi = mid - 1
+            else:
+                live_post_id, live_result = mid, result
+                lo = mid + 1
+        
+        self._mark_checkpoint_range(high, live_post_id + 1, STATUS_GAP)
+        self.metrics.incr('gap_postids_skipped', high - live_post_id)
+        for post_id in probed_missing:
+            self._mark_checkpoint(post_id, STATUS_MISSING)
+        logger.info(
+            f"🔍 跳过空洞 postId {high} → {live_post_id + 1}（{high - live_post_id} 个，"
+            f"探测 {len(probed_missing) + 1} 次），从 {live_post_id} 继续"
+        )
+        return live_post_id, live_result
+    
+    def find_newest_post_id(self, high_water, slack=DEFAULT_TAIL_SLACK):
+        """从 high_water 向上探测当前最新的postId，返回 (最新postId, {探测过的postId: 结果})
+        
+        先按 1、2、4、8…… 的步长向上跳跃，直到探到不存在的postId，再在最后一个存在的和第一个
+        不存在的postId之间二分。每个探测点连同它上面 slack 个postId都不存在才算“不存在”，
+        刚发布就被删除的文章不会让探测停在它下面。没有新文章时返回 high_water；
+        探测请求失败（无法判断是否存在）时返回 (None, 已探测的结果)。
+        """
+        probed = {}
+        
+        def first_live(post_id):
+            # post_id 到 post_id+slack 中第一个存在的postId；已入库的不发请求
+            for candidate in range(post_id, post_id + slack + 1):
+                if candidate not in probed:
+                    if self.known_post_ids is not None and candidate in self.known_post_ids:
+                        probed[candidate] = ALREADY_CRAWLED
+                    else:
+                        self.metrics.incr('tail_probe_requests')
+                        probed[candidate] = self.fetch_article(candidate)
+                result = probed[candidate]
+                if result is None:
+                    raise _ProbeFailed(candidate)
+                if result is not NOT_FOUND:
+                    return candidate
+            return None
+        
+        # low：已知存在（或高水位）；high：从它开始的 slack+1 个postId都不存在
+        low, high = high_water, None
+        step = 1
+        try:
+            while high is None:
+                live = first_live(low + step)
+                if live is None:
+                    high = low + step
+                else:
+                    low = live
+                    step *= 2
+            while high - low > 1:
+                mid = (low + high) // 2
+                live = first_live(mid)
+                if live is None:
+                    high = mid
+                else:
+                    low = live
+        except _ProbeFailed as e:
+            logger.warning(f"⚠️  探测最新postId时请求 #{e} 失败")
+            return None, probed
+        return low, probed
+    
+    def _resume_after_gap(self, live_post_id, live_result, stop_post_id):
+        """空洞之后重新开始遍历：先产出探测到的文章，再从它的下一个postId继续预取"""
+        yield live_post_id, False, live_result
+        yield from self._iter_fetched_articles(
+            self._iter_post_ids(live_post_id - 1, (), stop_post_id), tagged=True
+        )
+    
     def save_article_to_local(self, article_data):
         """保存第一篇文章到本地"""
         try:
             filename = f"first_article_{article_data['post_id']}.json"
             with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(article_data, f, ensure_ascii=False, indent=2, default=str)
+                f.write(json_dumps(dict(article_data), indent=True))
             logger.info(f"✓ 第一篇文章已保存到: {filename}")
             return True
         except Exception as e:
             logger.error(f"✗ 保存文章到本地失败: {e}")
             return False
     
+    def load_known_post_ids(self):
+        """一次性加载数据库中已有的i云保文章postId到位图，遍历时直接跳过"""
+        try:
+            known = PostIdBitmap()
+            for src_url in self.storage.iter_src_urls():
+                post_id = post_id_from_url(src_url)
+                if post_id is not None:
+                    known.add(post_id)
+            self.known_post_ids = known
+            logger.info(f"✓ 已加载 {len(known)} 个已入库的postId，这些文章将直接跳过")
+            return True
+        except StorageError as e:
+            logger.warning(f"⚠️  加载已入库postId失败，改为逐篇检查重复: {e}")
+            self.known_post_ids = None
+            return False
+    
     def check_article_exists(self, article_url):
         """检查文章URL是否已存在数据库中"""
         try:
-            cursor = self.db_connection.cursor()
-            query = "SELECT id FROM baoxianblog WHERE src_url = %s LIMIT 1"
-            cursor.execute(query, (article_url,))
-            result = cursor.fetchone()
-            cursor.close()
-            return result is not None
-        except Error as e:
+            with self.db_lock, self.metrics.time('dup_check'):
+                return self.storage.exists(article_url)
+        except StorageError as e:
             logger.warning(f"⚠️  检查URL重复时出错: {e}")
             return False
     
     def insert_article_to_db(self, article_data):
         """将文章插入数据库"""
         try:
-            cursor = self.db_connection.cursor()
-            
-            query = """
-            INSERT INTO baoxianblog 
-            (src_url, src_title, src_content, read_count, like_count, src_user, 
-             from_source, create_time, update_time, isPublish, published_user)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            
-            values = (
-                article_data['src_url'],
-                article_data['src_title'],
-                article_data['src_content'],
-                article_data['read_count'],
-                article_data['like_count'],
-                article_data['src_user'],
-                article_data['from_source'],
-                article_data['create_time'],
-                article_data['create_time'],
-                0,  # isPublish
-                article_data['src_user']
-            )
-            
-            cursor.execute(query, values)
-            self.db_connection.commit()
+            with self.metrics.time('db_insert'):
+                self.storage.write_articles([article_data])
             
             logger.info(f"✓ 文章已写入数据库: {article_data['src_title'][:60]}")
-            cursor.close()
             return True
             
-        except Error as e:
+        except StorageError as e:
             logger.error(f"✗ 数据库写入失败: {e}")
-            self.db_connection.rollback()
             return False
     
+    def _mark_checkpoint(self, post_id, status):
+        """在断点文件中记录postId的处理结果，同时跟踪还没写入或失败的postId（见 _save_progress）"""
+        if status == STATUS_PENDING:
+            self.pending_post_ids.add(post_id)
+        else:
+            self.pending_post_ids.discard(post_id)
+            if status == STATUS_FAILED:
+                self.highest_failed_post_id = max(self.highest_failed_post_id, post_id)
+        if self.checkpoint is not None:
+            self.checkpoint.mark(post_id, status)
+    
+    def _mark_checkpoint_range(self, high, low, status):
+        """在断点文件中把一段postId记录为同一状态"""
+        if self.checkpoint is not None:
+            self.checkpoint.mark_range(high, low, status)
+    
+    def _prepare_hash_store(self):
+        """指纹表已由 content_hash.py 建好时记录指纹；爬虫不执行DDL，表不存在时本次不记录"""
+        self.hash_store = None
+        if self.db_connection is None:
+            return
+        try:
+            hash_store = ContentHashStore(self.db_connection)
+            if hash_store.table_ready():
+                self.hash_store = hash_store
+            else:
+                logger.info("ℹ️  正文指纹表不存在或版本过旧，本次不记录指纹（运行 python3 content_hash.py backfill 创建并补算）")
+        except Error as e:
+            logger.warning(f"⚠️  检查正文指纹表失败，本次不记录指纹: {e}")
+    
+    def _save_content_hashes(self, articles):
+        """记录已写入数据库的文章的 content_hash，失败不影响爬取
+        
+        在写库线程上、持有 db_lock 时调用，只计算 blake2b（每篇几十微秒）；
+        SimHash 每篇要几十毫秒，由 content_hash.py backfill 补算。
+        """
+        if self.hash_store is None or not articles:
+            return
+        try:
+            self.hash_store.save_rows([fingerprint_row(a['post_id'], a['src_content']) for a in articles])
+        except Error as e:
+            logger.warning(f"⚠️  记录 {len(articles)} 篇文章的正文指纹失败: {e}")
+            try:
+                self.db_connection.rollback()
+            except Error:
+                pass
+    
+    def _handle_flush_result(self, flush_result):
+        """记录一次批量写入的结果，返回失败的文章数"""
+        if not flush_result:
+            return 0
+        self.metrics.incr('articles_written', len(flush_result.written))
+        self.metrics.incr('articles_write_failed', len(flush_result.failed))
+        for article_data in flush_result.written:
+            self._mark_checkpoint(article_data['post_id'], STATUS_DONE)
+            # 同一个爬虫实例再次遍历（分片模式、追新模式）时不再请求刚写入的文章
+            if self.known_post_ids is not None:
+                self.known_post_ids.add(article_data['post_id'])
+        for article_data in flush_result.failed:
+            self._mark_checkpoint(article_data['post_id'], STATUS_FAILED)
+        if not flush_result.failed:
+            return 0
+        logger.warning(f"✗ {len(flush_result.failed)} 篇文章插入数据库失败，已跳过")
+        return len(flush_result.failed)
+    
     def check_db_data(self):
         """查看数据库中已保存的文章"""
         try:
-            cursor = self.db_connection.cursor()
-            query = """
-            SELECT id, src_title, read_count, like_count, src_user 
-            FROM baoxianblog 
-            WHERE from_source='iyunbao' 
-            ORDER BY id DESC 
-            LIMIT 5
-            """
-            cursor.execute(query)
-            results = cursor.fetchall()
+            results = self.storage.recent_articles(5)
             
             logger.info("\n" + "=" * 80)
             logger.info("📊 数据库中的文章数据（最新5条）")
@@ -216,65 +550,217 @@ class IyunbaoCrawler:
             for row in results:
                 logger.info(f"  ID: {row[0]:6} | 标题: {row[1][:50]:<50} | 阅读: {row[2]:<6} | 看好: {row[3]:<6} | 作者: {row[4]}")
             logger.info("=" * 80)
-            
-            cursor.close()
-        except Error as e:
+        except StorageError as e:
             logger.error(f"✗ 查询数据库失败: {e}")
     
-    def crawl_articles(self, start_post_id=97867, count=3):
-        """爬取指定数量的文章"""
+    def _save_progress(self, next_post_id, count, success_count, skip_count, fail_count, missing_count=0):
+        """记录遍历游标和计数，并写入断点（缓冲区中未提交的文章不计入成功数）
+        
+        resume_post_id 是没有断点文件时可以安全续跑的位置：遍历游标已经越过了写库缓冲区和写库队列中
+        还没提交的文章，以及抓取或写库失败的文章，从游标续跑会永久漏掉它们，所以不低于其中最大的postId。
+        """
+        self.progress = {
+            'next_post_id': next_post_id,
+            'resume_post_id': max(next_post_id, self.highest_failed_post_id, max(self.pending_post_ids, default=0)),
+            'target_count': count,
+            'success_count': success_count - (len(self.writer) if self.writer else 0),
+            'skip_count': skip_count,
+            'fail_count': fail_count,
+            'missing_count': missing_count
+        }
+        if self.checkpoint is not None:
+            self.checkpoint.update_state(**self.progress)
+    
+    def crawl_articles(self, start_post_id=97867, count=3, resume=False, stop_post_id=1, prefetched=None):
+        """爬取指定数量的文章
+        
+        resume=True 时从断点文件恢复遍历游标和计数，并先重试上次失败或未提交的postId。
+        stop_post_id 为遍历的下界（含），分片模式下用来限定本分片的postId范围。
+        prefetched 为 {postId: fetch_article 的结果}，遍历到这些postId时不再重复请求。
+        """
         if not self.connect_db():
             logger.error("✗ 无法连接数据库，爬虫退出")
             return False
+        self.prefetched = dict(prefetched or {})
         
+        # 同一个爬虫实例多次爬取（如分片模式）时只加载一次
+        if self.preload_known and self.known_post_ids is None:
+            self.load_known_post_ids()
+        self._prepare_hash_store()
+        
+        success_count = 0  # 新增文章数
+        skip_count = 0     # 已存在（跳过）数
+        fail_count = 0     # 真实失败数
+        missing_count = 0  # 不存在（已删除）的postId数
+        retry_post_ids = []
+        previously_failed = set()
+        self.pending_post_ids = set()
+        self.highest_failed_post_id = 0
+        if self.checkpoint is not None:
+            state = self.checkpoint.load_state() if resume else {}
+            if resume and state:
+                start_post_id = state.get('next_post_id', start_post_id)
+                count = count if count is not None else state.get('target_count')
+                success_count = state.get('success_count', 0)
+                skip_count = state.get('skip_count', 0)
+                fail_count = state.get('fail_count', 0)
+                missing_count = state.get('missing_count', 0)
+                retry_post_ids = self.checkpoint.retry_post_ids()
+                previously_failed = set(self.checkpoint.post_ids_with_status(STATUS_FAILED))
+                logger.info(f"🔁 从断点续跑: postId {start_post_id}, 已成功 {success_count} 篇, 待重试 {len(retry_post_ids)} 篇")
+            elif resume:
+                logger.warning(f"⚠️  断点文件 {self.checkpoint.path} 中没有进度记录，从 postId {start_post_id} 开始")
+            else:
+                self.checkpoint.clear_state()
+            # 已确认不存在的postId不再请求
+            self.missing_post_ids = PostIdBitmap(self.checkpoint.post_ids_with_status(STATUS_MISSING))
+        if count is None:
+            count = 3
+        
+        # 抓取和清理HTML（workers 个线程）→ 查重和记录断点（本线程）→ 写库（写库线程），
+        # 各阶段之间都有上限：预取窗口和 max_buffer_bytes、写库队列的批次数，下游慢时上游随之暂停
+        if self.write_queue > 0:
+            self.writer = BackgroundArticleWriter(
+                self.storage, self.batch_size, self.flush_interval, self.metrics, self.max_buffer_bytes,
+                lock=self.db_lock, after_write=self._save_content_hashes, max_pending=self.write_queue
+            )
+        else:
+            self.writer = BatchArticleWriter(
+                self.storage, self.batch_size, self.flush_interval, self.metrics, self.max_buffer_bytes,
+                lock=self.db_lock, after_write=self._save_content_hashes
+            )
+        fetched_articles = self._iter_fetched_articles(
+            self._iter_post_ids(start_post_id, retry_post_ids, stop_post_id), tagged=True
+        )
+        if success_count >= count:
+            # 续跑一次已经完成的爬取：不再请求
+            logger.info(f"✓ 断点中已成功 {success_count}/{count} 篇，无需继续")
+            fetched_articles = None
+        lowest_post_id = max(stop_post_id, 1)
+        next_post_id = start_post_id
+        self._save_progress(next_post_id, count, success_count, skip_count, fail_count, missing_count)
         try:
-            current_post_id = start_post_id
-            success_count = 0  # 新增文章数
-            skip_count = 0     # 已存在（跳过）数
-            fail_count = 0     # 真实失败数
             first_article_saved = False
-            consecutive_fails = 0  # 连续失败次数
+            consecutive_fails = 0  # 连续失败次数（不含不存在的postId）
+            consecutive_missing = 0  # 顺序遍历中连续不存在的postId数
             max_consecutive_fails = 20  # 连续失败20次才停止
             
-            while success_count < count and consecutive_fails < max_consecutive_fails:
-                logger.info(f"\n{'='*80}")
-                logger.info(f"📝 正在爬取第 {success_count + skip_count + 1}个 (postId: {current_post_id}, 成功: {success_count}/{count})")
-                logger.info(f"{'='*80}")
-                
-                article_data = self.fetch_article(current_post_id)
-                
-                if article_data:
-                    # 检查文章URL是否已存在
-                    if self.check_article_exists(article_data['src_url']):
-                        logger.info(f"⏭️  文章已存在数据库中（跳过）: {article_data['src_title'][:60]}")
+            # 探测到空洞后丢弃预取窗口，从空洞下边界重新开始遍历
+            while fetched_articles is not None:
+                resumed_articles = None
+                for current_post_id, retrying, article_data in fetched_articles:
+                    # 只有顺序遍历的部分推进游标，重试的postId可能在游标上下任意位置
+                    if retrying:
+                        if current_post_id in previously_failed:
+                            fail_count -= 1  # 重新计数，本次仍失败时会再加回来
+                    else:
+                        next_post_id = current_post_id - 1
+                    
+                    if article_data is ALREADY_CRAWLED:
+                        logger.debug(f"⏭️  postId {current_post_id} 已在数据库中（跳过，未发请求）")
                         skip_count += 1
                         consecutive_fails = 0  # 重置连续失败计数
-                    else:
-                        # 保存第一篇新文章到本地
-                        if not first_article_saved:
-                            self.save_article_to_local(article_data)
-                            first_article_saved = True
+                        consecutive_missing = 0
+                        self.metrics.incr('articles_skipped')
+                        self._mark_checkpoint(current_post_id, STATUS_EXISTS)
+                        self._save_progress(next_post_id, count, success_count, skip_count, fail_count, missing_count)
+                        continue
+                    
+                    if article_data is NOT_FOUND:
+                        missing_count += 1
+                        consecutive_missing += 0 if retrying else 1
+                        self.metrics.incr('articles_not_found')
+                        self._mark_checkpoint(current_post_id, STATUS_MISSING)
                         
-                        # 插入数据库
-                        if self.insert_article_to_db(article_data):
+                        # 连续不存在的postId太多时跳跃探测空洞的下边界，而不是逐个请求
+                        if (not retrying and self.gap_threshold and consecutive_missing >= self.gap_threshold
+                                and next_post_id >= lowest_post_id and not self.stop_event.is_set()):
+                            consecutive_missing = 0
+                            live_post_id, live_result = self._probe_gap(next_post_id, lowest_post_id)
+                            if live_post_id is None:
+                                next_post_id = lowest_post_id - 1
+                            else:
+                                next_post_id = live_post_id
+                                resumed_articles = self._resume_after_gap(live_post_id, live_result, stop_post_id)
+                            self._save_progress(next_post_id, count, success_count, skip_count, fail_count, missing_count)
+                            break
+                        
+                        self._save_progress(next_post_id, count, success_count, skip_count, fail_count, missing_count)
+                        if self.stop_event.is_set():
+                            logger.warning("⚠️  收到停止请求，结束爬取")
+                            break
+                        continue
+                    
+                    consecutive_missing = 0
+                    logger.info(f"\n{'='*80}")
+                    logger.info(f"📝 正在爬取第 {success_count + skip_count + 1}个 (postId: {current_post_id}, 成功: {success_count}/{count})")
+                    logger.info(f"{'='*80}")
+                    
+                    flush_result = None
+                    if article_data:
+                        # 未预加载位图时逐篇检查文章URL是否已存在
+                        if self.known_post_ids is None and self.check_article_exists(article_data['src_url']):
+                            logger.info(f"⏭️  文章已存在数据库中（跳过）: {article_data['src_title'][:60]}")
+                            skip_count += 1
+                            self.metrics.incr('articles_skipped')
+                            consecutive_fails = 0  # 重置连续失败计数
+                            self._mark_checkpoint(current_post_id, STATUS_EXISTS)
+                        else:
+                            # 保存第一篇新文章到本地
+                            if not first_article_saved:
+                                self.save_article_to_local(article_data)
+                                first_article_saved = True
+                            
+                            # 每篇新文章抓取后立即追加到导出文件
+                            if self.export_sink is not None:
+                                self.export_sink.write(article_data)
+                            
+                            # 加入批量写入缓冲区，先计为成功，批量写入失败时再扣除
+                            self._mark_checkpoint(current_post_id, STATUS_PENDING)
+                            flush_result = self.writer.add(article_data)
                             success_count += 1
+                            self.metrics.incr('articles_success')
                             consecutive_fails = 0  # 重置连续失败计数
                             logger.info(f"✓ 成功爬取 {success_count}/{count} 篇文章 (新增, 已跳过 {skip_count} 篇)")
+                    else:
+                        logger.warning(f"✗ 获取文章失败，跳过该文章")
+                        fail_count += 1
+                        consecutive_fails += 1
+                        self.metrics.incr('articles_failed')
+                        self._mark_checkpoint(current_post_id, STATUS_FAILED)
+                    
+                    # 达到目标数量时立即提交缓冲区，否则按时间阈值提交
+                    if flush_result is None:
+                        if success_count >= count:
+                            flush_result = self.writer.flush()
                         else:
-                            logger.warning(f"✗ 插入数据库失败，跳过该文章")
-                            fail_count += 1
-                            consecutive_fails += 1
-                else:
-                    logger.warning(f"✗ 获取文章失败，跳过该文章")
-                    fail_count += 1
-                    consecutive_fails += 1
+                            flush_result = self.writer.maybe_flush()
+                    failed = self._handle_flush_result(flush_result)
+                    success_count -= failed
+                    fail_count += failed
+                    consecutive_fails += failed
+                    self._save_progress(next_post_id, count, success_count, skip_count, fail_count, missing_count)
+                    
+                    # 请求频率由全局令牌桶控制，这里只判断是否停止（postId从大到小）
+                    if self.stop_event.is_set():
+                        logger.warning("⚠️  收到停止请求，结束爬取")
+                        break
+                    if success_count >= count:
+                        break
+                    # 续跑时需要重试的postId全部处理完后才判断连续失败
+                    if retrying:
+                        continue
+                    if consecutive_fails >= max_consecutive_fails:
+                        break
                 
-                # 处理下一篇文章（postId从大到小）
-                current_post_id -= 1
-                
-                # 延迟请求，避免被反爬 (建议2-3秒)
-                if success_count < count:
-                    time.sleep(3)  # 增加到3秒以避免反爬
+                fetched_articles.close()
+                fetched_articles = resumed_articles
+            
+            # 提交缓冲区中剩余的文章
+            failed = self._handle_flush_result(self.writer.flush())
+            success_count -= failed
+            fail_count += failed
+            self._save_progress(next_post_id, count, success_count, skip_count, fail_count, missing_count)
             
             # 显示最终统计
             logger.info(f"\n{'='*80}")
@@ -282,6 +768,7 @@ class IyunbaoCrawler:
             logger.info(f"{'='*80}")
             logger.info(f"  新增文章: {success_count} 篇")
             logger.info(f"  已存在: {skip_count} 篇")
+            logger.info(f"  不存在: {missing_count} 个postId")
             logger.info(f"  失败: {fail_count} 篇")
             logger.info(f"  总处理: {success_count + skip_count + fail_count} 篇")
             
@@ -303,6 +790,18 @@ class IyunbaoCrawler:
             logger.error(f"✗ 爬虫执行出错: {e}")
             return False
         finally:
+            if fetched_articles is not None:
+                fetched_articles.close()
+            if self.writer:
+                # 异常退出时也尽量把已抓取的文章写入数据库；is_connected 会访问连接，写库线程可能正在使用
+                with self.db_lock:
+                    connected = self.storage.is_connected()
+                if len(self.writer) and connected:
+                    self._handle_flush_result(self.writer.flush())
+                self.writer.close()
+            if self.checkpoint is not None:
+                self.checkpoint.commit()
+            self.prefetched = {}
             self.close_db()
 
 
@@ -317,6 +816,10 @@ def main():
   python3 iyunbao_crawler.py                    # 使用默认参数（postId: 97867, 爬取3篇）
   python3 iyunbao_crawler.py --start 97867 --count 5   # 从97867开始，爬取5篇
   python3 iyunbao_crawler.py -s 97800 -c 10    # 简写形式
+  python3 iyunbao_crawler.py -c 1000 -w 8 --rate 2 --burst 4   # 8个并发，总速率每秒2个请求
+  python3 iyunbao_crawler.py --resume           # 从上次中断的位置续跑，并重试失败的postId
+  python3 iyunbao_crawler.py -c 500 --export articles.ndjson.gz   # 同时把新文章导出为压缩的NDJSON
+  python3 iyunbao_crawler.py --tail --poll-min 60   # 追新模式：持续探测最新postId，只抓取新文章
         '''
     )
     
@@ -330,8 +833,184 @@ def main():
     parser.add_argument(
         '--count', '-c',
         type=int,
-        default=3,
-        help='要爬取的文章数量，默认：3'
+        default=None,
+        help='要爬取的文章数量，默认：3（--resume 时默认沿用上次的目标数量）'
+    )
+    
+    parser.add_argument(
+        '--workers', '-w',
+        type=int,
+        default=1,
+        help='同时在途的请求数（并发抓取线程数），默认：1'
+    )
+    
+    parser.add_argument(
+        '--rate',
+        type=float,
+        default=DEFAULT_RATE,
+        help='所有线程共享的总请求速率（次/秒），默认：0.33（即每3秒1次）'
+    )
+    
+    parser.add_argument(
+        '--burst',
+        type=int,
+        default=DEFAULT_BURST,
+        help='令牌桶容量，允许的瞬时突发请求数，默认：1'
+    )
+    
+    parser.add_argument(
+        '--api-url',
+        default=API_BASE_URL,
+        help='文章接口地址，可指向 mock_api.py 启动的本地模拟接口，默认：i云保线上接口'
+    )
+    
+    parser.add_argument(
+        '--connect-timeout',
+        type=float,
+        default=DEFAULT_CONNECT_TIMEOUT,
+        help='建立连接的超时时间（秒），默认：5'
+    )
+    
+    parser.add_argument(
+        '--read-timeout',
+        type=float,
+        default=DEFAULT_READ_TIMEOUT,
+        help='等待响应的超时时间（秒），默认：15'
+    )
+    
+    parser.add_argument(
+        '--retries',
+        type=int,
+        default=DEFAULT_MAX_RETRIES,
+        help='网络错误、超时、429/5xx 的最大重试次数（指数退避），默认：4'
+    )
+    
+    parser.add_argument(
+        '--gap-threshold',
+        type=int,
+        default=DEFAULT_GAP_THRESHOLD,
+        help='连续多少个postId不存在时跳跃探测空洞，0表示逐个请求，默认：10'
+    )
+    
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help='批量写入数据库的文章数，默认：100'
+    )
+    
+    parser.add_argument(
+        '--flush-interval',
+        type=float,
+        default=DEFAULT_FLUSH_INTERVAL,
+        help='缓冲区最长提交间隔（秒），默认：30'
+    )
+    
+    parser.add_argument(
+        '--storage',
+        default='mysql',
+        help="文章写入位置：'mysql'（baoxianblog），SQLite文件路径，或以 .parquet 结尾的目录，默认：mysql"
+    )
+    
+    parser.add_argument(
+        '--max-buffer-mb',
+        type=float,
+        default=DEFAULT_MAX_BUFFER_BYTES / (1024 * 1024),
+        help='预取后待处理的文章、写库缓冲区中的文章各自最多占用的内存（MB），默认：64'
+    )
+    
+    parser.add_argument(
+        '--db-pool-size',
+        type=int,
+        default=DEFAULT_POOL_SIZE,
+        help=f'MySQL连接池的最大连接数，默认：{DEFAULT_POOL_SIZE}'
+    )
+    
+    parser.add_argument(
+        '--write-queue',
+        type=int,
+        default=DEFAULT_WRITE_QUEUE,
+        help=f'等待写库线程写入的批次数上限，0表示在爬取线程中同步写入，默认：{DEFAULT_WRITE_QUEUE}'
+    )
+    
+    parser.add_argument(
+        '--no-preload',
+        action='store_true',
+        help='不预加载已入库的postId，改为每篇文章抓取后再查询数据库去重'
+    )
+    
+    parser.add_argument(
+        '--checkpoint',
+        default=DEFAULT_CHECKPOINT_FILE,
+        help=f'断点文件路径，默认：{DEFAULT_CHECKPOINT_FILE}'
+    )
+    
+    parser.add_argument(
+        '--no-checkpoint',
+        action='store_true',
+        help='不记录断点'
+    )
+    
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='从断点文件记录的位置续跑，并先重试上次失败或未提交的postId'
+    )
+    
+    parser.add_argument(
+        '--tail',
+        action='store_true',
+        help='追新模式：从高水位向上探测最新postId，定期只抓取新发布的文章（忽略 --count）'
+    )
+    
+    parser.add_argument(
+        '--tail-state',
+        default=DEFAULT_TAIL_CHECKPOINT_FILE,
+        help=f'追新模式的断点文件（记录高水位），默认：{DEFAULT_TAIL_CHECKPOINT_FILE}'
+    )
+    
+    parser.add_argument(
+        '--poll-min',
+        type=float,
+        default=DEFAULT_POLL_MIN,
+        help='追新模式的最短轮询间隔（秒），有新文章时间隔减半直到该值，默认：30'
+    )
+    
+    parser.add_argument(
+        '--poll-max',
+        type=float,
+        default=DEFAULT_POLL_MAX,
+        help='追新模式的最长轮询间隔（秒），没有新文章时间隔翻倍直到该值，默认：600'
+    )
+    
+    parser.add_argument(
+        '--tail-cycles',
+        type=int,
+        default=0,
+        help='追新模式运行的轮数，0表示一直运行，默认：0'
+    )
+    
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        help='在本机该端口提供运行指标：/metrics（Prometheus格式）和 /metrics.json'
+    )
+    
+    parser.add_argument(
+        '--metrics-file',
+        help='定期把运行指标快照写入该JSON文件'
+    )
+    
+    parser.add_argument(
+        '--metrics-interval',
+        type=float,
+        default=10,
+        help='写入指标快照的间隔（秒），默认：10'
+    )
+    
+    parser.add_argument(
+        '--export',
+        help='把每篇新文章追加导出到NDJSON文件，后缀 .gz / .zst 时自动压缩'
     )
     
     args = parser.parse_args()
@@ -341,27 +1020,134 @@ def main():
         logger.error("✗ 起始ID必须大于0")
         return False
     
-    if args.count < 1:
+    if args.count is not None and args.count < 1:
         logger.error("✗ 爬取数量必须大于0")
         return False
     
+    if args.resume and args.no_checkpoint:
+        logger.error("✗ --resume 需要断点文件，不能与 --no-checkpoint 同时使用")
+        return False
+    
+    if args.tail and (args.resume or args.no_checkpoint):
+        logger.error("✗ --tail 使用自己的断点文件（--tail-state），不能与 --resume / --no-checkpoint 同时使用")
+        return False
+    
+    if args.tail and (args.poll_min <= 0 or args.poll_max < args.poll_min or args.tail_cycles < 0):
+        logger.error("✗ 轮询间隔必须大于0且 --poll-max 不小于 --poll-min，轮数不能为负数")
+        return False
+    
+    if args.count is None and not args.resume:
+        args.count = 3
+    
+    if args.workers < 1:
+        logger.error("✗ 并发数必须大于0")
+        return False
+    
+    if args.rate <= 0 or args.burst < 1:
+        logger.error("✗ 请求速率必须大于0，突发数必须大于等于1")
+        return False
+    
+    if args.max_buffer_mb <= 0:
+        logger.error("✗ 缓冲内存上限必须大于0")
+        return False
+    
+    if args.db_pool_size < 1:
+        logger.error("✗ 连接池大小必须大于0")
+        return False
+    
+    if args.write_queue < 0:
+        logger.error("✗ 写库队列长度不能为负数")
+        return False
+    
+    if args.metrics_interval <= 0:
+        logger.error("✗ 指标快照间隔必须大于0")
+        return False
+    
+    if args.gap_threshold < 0:
+        logger.error("✗ 空洞探测阈值不能为负数")
+        return False
+    
+    if args.connect_timeout <= 0 or args.read_timeout <= 0 or args.retries < 0:
+        logger.error("✗ 超时时间必须大于0，重试次数不能为负数")
+        return False
+    
+    if args.batch_size < 1 or args.flush_interval <= 0:
+        logger.error("✗ 批量大小必须大于0，提交间隔必须大于0")
+        return False
+    
     logger.info("\n" + "=" * 80)
     logger.info("🚀 i云保爬虫启动")
     logger.info("=" * 80)
     logger.info(f"📝 参数配置：")
-    logger.info(f"   起始ID (postId)：{args.start}")
-    logger.info(f"   爬取数量：{args.count}")
+    if args.tail:
+        logger.info(f"   追新模式：轮询间隔 {args.poll_min:g} ~ {args.poll_max:g} 秒")
+    else:
+        logger.info(f"   起始ID (postId)：{'断点位置' if args.resume else args.start}")
+        logger.info(f"   爬取数量：{args.count if args.count is not None else '沿用断点'}")
+    logger.info(f"   并发数：{args.workers}（写库队列 {args.write_queue} 批）")
+    logger.info(f"   请求速率：{args.rate:.2f} 次/秒（突发 {args.burst}）")
+    logger.info(f"   断点文件：{args.tail_state if args.tail else '不记录' if args.no_checkpoint else args.checkpoint}")
     logger.info("=" * 80 + "\n")
     
-    crawler = IyunbaoCrawler()
+    metrics = Metrics()
+    metrics_server = MetricsServer(metrics, args.metrics_port) if args.metrics_port else None
+    if metrics_server is not None:
+        logger.info(f"📈 运行指标: http://127.0.0.1:{metrics_server.port}/metrics")
+    snapshot_writer = SnapshotWriter(metrics, args.metrics_file, args.metrics_interval) if args.metrics_file else None
+    if args.tail:
+        checkpoint = CrawlCheckpoint(args.tail_state)
+    else:
+        checkpoint = None if args.no_checkpoint else CrawlCheckpoint(args.checkpoint)
+    export_sink = NDJSONArticleSink(args.export) if args.export else None
+    crawler = IyunbaoCrawler(
+        workers=args.workers,
+        rate=args.rate,
+        burst=args.burst,
+        batch_size=args.batch_size,
+        flush_interval=args.flush_interval,
+        preload_known=not args.no_preload,
+        checkpoint=checkpoint,
+        export_sink=export_sink,
+        connect_timeout=args.connect_timeout,
+        read_timeout=args.read_timeout,
+        max_retries=args.retries,
+        gap_threshold=args.gap_threshold,
+        metrics=metrics,
+        storage=open_storage(args.storage, DB_CONFIG, args.db_pool_size),
+        api_base_url=args.api_url,
+        max_buffer_bytes=int(args.max_buffer_mb * 1024 * 1024),
+        write_queue=args.write_queue
+    )
     
     # 根据参数爬取文章
-    success = crawler.crawl_articles(start_post_id=args.start, count=args.count)
+    try:
+        if args.tail:
+            # post_tail 导入了本模块，在这里导入避免循环导入
+            from post_tail import PostTailer
+            tailer = PostTailer(crawler, checkpoint, args.poll_min, args.poll_max)
+            tailer.load_high_water(args.start)
+            try:
+                tailer.run(args.tail_cycles or None)
+            except KeyboardInterrupt:
+                logger.warning("⚠️  收到中断，追新模式退出")
+            logger.info(f"✓ 追新模式结束，高水位 postId {tailer.high_water}")
+            return True
+        success = crawler.crawl_articles(start_post_id=args.start, count=args.count, resume=args.resume)
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+        if export_sink is not None:
+            export_sink.close()
+        if snapshot_writer is not None:
+            snapshot_writer.close()
+        if metrics_server is not None:
+            metrics_server.close()
     
+    target = args.count if args.count is not None else '断点记录的'
     if success:
-        logger.info(f"\n✓ 任务完成！已成功爬取 {args.count} 篇文章并保存到数据库。")
+        logger.info(f"\n✓ 任务完成！已成功爬取 {target} 篇文章并保存到数据库。")
     else:
-        logger.error(f"\n✗ 任务未能全部完成（目标：{args.count}篇）。")
+        logger.error(f"\n✗ 任务未能全部完成（目标：{target}篇）。")
     
     return success
 
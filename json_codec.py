@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON编解码 - 安装了 msgspec / orjson 时使用快速实现，否则退回标准库 json
+
+  decode_post(payload)  解析文章接口的响应，只取爬虫用到的字段，类型一次校验完
+                        msgspec：按结构体解码，跳过不需要的字段，不构造中间字典
+                        orjson / json：先解析为字典再取字段
+  loads(data)           解析任意JSON（NDJSON导出文件等）
+  dumps(obj, indent)    序列化为 str，中文不转义，datetime 与 json.dumps(default=str) 的格式一致
+  dumps_bytes(obj)      序列化为紧凑的UTF-8字节，NDJSON导出使用
+
+三种实现的解析结果和序列化输出一致，是否安装快速实现只影响速度。
+"""
+
+import json
+from collections import namedtuple
+from typing import Optional
+
+try:
+    import msgspec
+except ImportError:  # 可选依赖
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+DEFAULT_TITLE = '无标题'
+DEFAULT_CONTENT = '<p>无内容</p>'
+DEFAULT_AUTHOR = '头条妹妹'
+
+# 文章接口响应中爬虫用到的字段；is_success 为 False 时其余字段为默认值
+PostResponse = namedtuple('PostResponse', [
+    'is_success', 'error_msg', 'title', 'content', 'read_count', 'like_count', 'author'
+])
+
+if msgspec is not None:
+    class _Author(msgspec.Struct):
+        nickname: str = DEFAULT_AUTHOR
+
+    class _Post(msgspec.Struct):
+        title: str = DEFAULT_TITLE
+        content: str = DEFAULT_CONTENT
+        postPv: int = -1
+        likeNum: int = -1
+        author: Optional[_Author] = None
+
+    class _Response(msgspec.Struct):
+        isSuccess: Optional[bool] = False
+        errorMsg: Optional[str] = None
+        result: Optional[_Post] = None
+
+    # strict=False：数字以字符串返回时（如 "postPv": "123"）也能转换为 int
+    _POST_DECODER = msgspec.json.Decoder(_Response, strict=False)
+else:
+    _POST_DECODER = None
+
+BACKEND = 'msgspec' if msgspec is not None else ('orjson' if orjson is not None else 'json')
+
+
+def loads(data):
+    """解析JSON，data 可以是 str 或 bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _default(value):
+    return str(value)
+
+
+def dumps_bytes(obj):
+    """序列化为紧凑的UTF-8字节，无法直接序列化的值（datetime等）转为 str()"""
+    if orjson is not None:
+        # 不使用 orjson 自带的 datetime 格式，保持与 default=str 相同的 'YYYY-MM-DD HH:MM:SS'
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
+
+
+def dumps(obj, indent=False):
+    """序列化为 str；indent=True 时缩进2个空格"""
+    if orjson is not None:
+        option = orjson.OPT_PASSTHROUGH_DATETIME | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, default=_default, option=option).decode('utf-8')
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=2, default=_default)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=_default)
+
+
+def _post_from_dict(data):
+    """orjson / json 解析出的字典 → PostResponse，与 msgspec 路径的默认值和类型转换一致"""
+    if not isinstance(data, dict):
+        raise ValueError("响应不是JSON对象")
+    if not data.get('isSuccess'):
+        return PostResponse(False, data.get('errorMsg'), DEFAULT_TITLE, DEFAULT_CONTENT, -1, -1, DEFAULT_AUTHOR)
+    result = data.get('result') or {}
+    author = result.get('author') or {}
+    title = result.get('title', DEFAULT_TITLE)
+    content = result.get('content', DEFAULT_CONTENT)
+    nickname = author.get('nickname', DEFAULT_AUTHOR)
+    if not isinstance(title, str) or not isinstance(content, str) or not isinstance(nickname, str):
+        raise ValueError("title / content / author.nickname 应为字符串")
+    return PostResponse(
+        True, data.get('errorMsg'), title, content,
+        int(result.get('postPv', -1)), int(result.get('likeNum', -1)), nickname
+    )
+
+
+def decode_post(payload):
+    """解析文章接口响应（bytes 或 str），返回 PostResponse；格式或类型不对时抛出 ValueError"""
+    if _POST_DECODER is not None:
+        try:
+            response = _POST_DECODER.decode(payload)
+        except msgspec.MsgspecError as e:
+            raise ValueError(f"文章接口响应格式错误: {e}") from e
+        post = response.result
+        if not response.isSuccess:
+            return PostResponse(False, response.errorMsg, DEFAULT_TITLE, DEFAULT_CONTENT, -1, -1, DEFAULT_AUTHOR)
+        if post is None:
+            return PostResponse(True, response.errorMsg, DEFAULT_TITLE, DEFAULT_CONTENT, -1, -1, DEFAULT_AUTHOR)
+        author = post.author.nickname if post.author is not None else DEFAULT_AUTHOR
+        return PostResponse(True, response.errorMsg, post.title, post.content, post.postPv, post.likeNum, author)
+    return _post_from_dict(loads(payload))
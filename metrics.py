@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬虫运行指标 - 分阶段耗时、计数器和吞吐量，可通过本地HTTP端点或定期写入的JSON文件查看
+
+阶段耗时（秒）：
+  http         单次HTTP请求（含重试时每次尝试各记一次）
+  json_decode  解析接口返回的JSON
+  clean_html   清理正文HTML
+  dup_check    逐篇查询数据库去重
+  db_insert    批量写入数据库（每批记一次）
+
+两种输出：
+  --metrics-port 9108   访问 http://127.0.0.1:9108/metrics（Prometheus文本格式）或 /metrics.json
+  --metrics-file m.json 每隔 --metrics-interval 秒覆盖写入一次JSON快照
+
+用法:
+  metrics = Metrics()
+  with metrics.time('http'):
+      ...
+  metrics.incr('articles_success')
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRIC_PREFIX = 'iyunbao'
+# 耗时直方图的桶上限（秒）
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class _StageTimer:
+    """一个阶段的耗时统计：次数、总耗时、最大值和直方图"""
+
+    __slots__ = ('count', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+
+class _Timing:
+    """metrics.time() 返回的上下文管理器"""
+
+    __slots__ = ('metrics', 'stage', 'started')
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.stage, time.perf_counter() - self.started)
+
+
+class Metrics:
+    """线程安全的指标集合，抓取线程、写库线程可以同时记录"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._stages = {}
+        self._gauges = {}
+
+    def time(self, stage):
+        """统计一段代码的耗时：with metrics.time('http'): ..."""
+        return _Timing(self, stage)
+
+    def observe(self, stage, seconds):
+        """记录一次阶段耗时"""
+        with self._lock:
+            timer = self._stages.get(stage)
+            if timer is None:
+                timer = self._stages[stage] = _StageTimer()
+            timer.observe(seconds)
+
+    def incr(self, name, value=1):
+        """计数器加 value"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def gauge(self, name, func):
+        """登记一个读取时才计算的瞬时值，例如当前请求速率"""
+        self._gauges[name] = func
+
+    def snapshot(self):
+        """当前全部指标的字典，可直接序列化为JSON"""
+        with self._lock:
+            counters = dict(self._counters)
+            stages = {
+                stage: {
+                    'count': timer.count,
+                    'total_seconds': round(timer.total, 6),
+                    'avg_ms': round(timer.total / timer.count * 1000, 3) if timer.count else 0,
+                    'max_ms': round(timer.max * 1000, 3),
+                    'buckets': list(timer.buckets),
+                }
+                for stage, timer in self._stages.items()
+            }
+        uptime = time.monotonic() - self._started
+        gauges = {name: func() for name, func in self._gauges.items()}
+        # 吞吐量：每秒处理的postId数和新增文章数
+        processed = sum(counters.get(name, 0) for name in (
+            'articles_success', 'articles_skipped', 'articles_failed', 'articles_not_found'
+        ))
+        gauges['postids_per_second'] = round(processed / uptime, 4) if uptime else 0
+        gauges['articles_per_second'] = round(counters.get('articles_success', 0) / uptime, 4) if uptime else 0
+        return {
+            'started_at': self.started_at,
+            'uptime_seconds': round(uptime, 3),
+            'counters': counters,
+            'stages': stages,
+            'gauges': gauges,
+        }
+
+    def render_prometheus(self):
+        """Prometheus 文本格式"""
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in sorted(snapshot['counters'].items()):
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name}_total counter")
+            lines.append(f"{METRIC_PREFIX}_{name}_total {value}")
+        for name, value in sorted(snapshot['gauges'].items()):
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} gauge")
+            lines.append(f"{METRIC_PREFIX}_{name} {value}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_uptime_seconds gauge")
+        lines.append(f"{METRIC_PREFIX}_uptime_seconds {snapshot['uptime_seconds']}")
+
+        metric = f"{METRIC_PREFIX}_stage_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        for stage, timer in sorted(snapshot['stages'].items()):
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, timer['buckets']):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{stage="{stage}",le="+Inf"}} {timer["count"]}')
+            lines.append(f'{metric}_sum{{stage="{stage}"}} {timer["total_seconds"]}')
+            lines.append(f'{metric}_count{{stage="{stage}"}} {timer["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def write_json(self, path):
+        """原子地覆盖写入JSON快照"""
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+
+
+class MetricsServer:
+    """在后台线程中提供 /metrics（Prometheus）和 /metrics.json"""
+
+    def __init__(self, metrics, port, host='127.0.0.1'):
+        metrics_ref = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] == '/metrics.json':
+                    body = json.dumps(metrics_ref.snapshot(), ensure_ascii=False).encode('utf-8')
+                    content_type = 'application/json; charset=utf-8'
+                elif self.path.split('?')[0] in ('/', '/metrics'):
+                    body = metrics_ref.render_prometheus().encode('utf-8')
+                    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # 不把每次抓取指标的请求打到爬虫日志里
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class SnapshotWriter:
+    """每隔 interval 秒把指标快照写入JSON文件，关闭时再写一次最终结果"""
+
+    def __init__(self, metrics, path, interval=10):
+        self.metrics = metrics
+        self.path = str(path)
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.metrics.write_json(self.path)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.metrics.write_json(self.path)
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+baoxianblog 索引检查与迁移 - 为爬虫和各脚本的常用查询补上索引
+
+常用查询：
+  WHERE src_url = %s                               逐篇查重（--no-preload）、bulk_loader 反连接、正文改写、统计刷新
+  WHERE from_source='iyunbao' ORDER BY id DESC     check_db_data、extract_from_db、export_from_db
+
+没有索引时每次查重都是一次全表扫描，随表增长越来越慢。本工具：
+  check     用 SHOW INDEX 检查推荐的索引是否存在，并 EXPLAIN 常用查询；缺少索引时退出码为1
+  apply     在一条 ALTER TABLE 中创建缺少的索引；--post-id-column 时同时增加 post_id 整数列、
+            索引并回填（InnoDB 在线建索引，不阻塞爬虫写入）
+  backfill  从 src_url 解析postId，回填 post_id 为空的行；爬虫写入的新文章不填 post_id，可定期再运行
+
+已有的索引只要前几列相同（名称不同、src_url 为前缀索引也算）就不会重复创建；
+InnoDB 的二级索引自带主键，(from_source) 索引同样满足 (from_source, id)。
+
+使用方法:
+  python3 migrate_schema.py check
+  python3 migrate_schema.py apply
+  python3 migrate_schema.py apply --post-id-column
+  python3 migrate_schema.py backfill --batch-size 5000
+"""
+
+import argparse
+import logging
+import sys
+
+from mysql.connector import Error
+
+from db_pool import get_pool
+from iyunbao_crawler import DB_CONFIG
+from post_id_set import build_article_url, post_id_from_url
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'baoxianblog'
+FROM_SOURCE = 'iyunbao'
+# 推荐的索引：(名称, 列)
+RECOMMENDED_INDEXES = (
+    ('idx_src_url', ('src_url',)),
+    ('idx_from_source_id', ('from_source', 'id')),
+)
+POST_ID_COLUMN = 'post_id'
+POST_ID_INDEX = ('idx_post_id', (POST_ID_COLUMN,))
+# utf8mb4 下 767 字节的索引长度上限（COMPACT 行格式），更长的字符串列只索引前 191 个字符
+MAX_KEY_CHARS = 191
+DEFAULT_BATCH_SIZE = 5000
+
+# (说明, SQL, 参数)
+HOT_QUERIES = (
+    ('查重', f"SELECT id FROM {TABLE} WHERE src_url = %s LIMIT 1", (build_article_url(1),)),
+    ('最新文章', f"SELECT id FROM {TABLE} WHERE from_source = %s ORDER BY id DESC LIMIT 5", (FROM_SOURCE,)),
+)
+
+
+def load_schema(connection):
+    """读取 baoxianblog 的索引和列，返回 (索引名 → [列], 主键列, 列名 → (类型, 最大字符数))"""
+    cursor = connection.cursor(dictionary=True)
+    try:
+        cursor.execute(f"SHOW INDEX FROM {TABLE}")
+        indexes = {}
+        for row in sorted(cursor.fetchall(), key=lambda r: (r['Key_name'], r['Seq_in_index'])):
+            indexes.setdefault(row['Key_name'], []).append(row['Column_name'])
+        cursor.execute(
+            "SELECT COLUMN_NAME, DATA_TYPE, CHARACTER_MAXIMUM_LENGTH FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (TABLE,)
+        )
+        columns = {
+            row['COLUMN_NAME']: (row['DATA_TYPE'].lower(), row['CHARACTER_MAXIMUM_LENGTH'])
+            for row in cursor.fetchall()
+        }
+    finally:
+        cursor.close()
+    return indexes, indexes.get('PRIMARY', []), columns
+
+
+def covering_index(indexes, primary_key, columns):
+    """已有索引中前几列为 columns 的索引名，没有时返回 None
+
+    InnoDB 二级索引在自身的列之后附带主键列，按附带主键后的完整列序比较：(from_source) 满足
+    (from_source, id)，(from_source, create_time) 则不满足（ORDER BY id 仍要 filesort）。
+    """
+    wanted = list(columns)
+    for name, index_columns in indexes.items():
+        effective = list(index_columns)
+        if name != 'PRIMARY':
+            effective += [column for column in primary_key if column not in effective]
+        if effective[:len(wanted)] == wanted:
+            return name
+    return None
+
+
+def index_column_sql(name, column_types):
+    """索引中列的写法：TEXT 或超过 MAX_KEY_CHARS 的字符串列使用前缀索引"""
+    data_type, max_chars = column_types.get(name, (None, None))
+    if data_type in ('text', 'mediumtext', 'longtext', 'blob', 'mediumblob', 'longblob') or \
+            (data_type in ('varchar', 'char', 'varbinary', 'binary') and max_chars and max_chars > MAX_KEY_CHARS):
+        return f"{name}({MAX_KEY_CHARS})"
+    return name
+
+
+def missing_indexes(indexes, primary_key, column_types):
+    """缺少的推荐索引 [(名称, 列)]；post_id 列存在时也检查它的索引"""
+    wanted = list(RECOMMENDED_INDEXES)
+    if POST_ID_COLUMN in column_types:
+        wanted.append(POST_ID_INDEX)
+    return [(name, columns) for name, columns in wanted if covering_index(indexes, primary_key, columns) is None]
+
+
+def explain_hot_queries(connection):
+    """EXPLAIN 常用查询，返回 [(说明, type, key, rows, Extra)]"""
+    results = []
+    cursor = connection.cursor(dictionary=True)
+    try:
+        for label, sql, params in HOT_QUERIES:
+            cursor.execute(f"EXPLAIN {sql}", params)
+            row = cursor.fetchall()[0]
+            results.append((label, row.get('type'), row.get('key'), row.get('rows'), row.get('Extra') or ''))
+    finally:
+        cursor.close()
+    return results
+
+
+def check(connection):
+    """打印索引和查询计划，返回是否已有全部推荐的索引"""
+    indexes, primary_key, column_types = load_schema(connection)
+    missing = missing_indexes(indexes, primary_key, column_types)
+    wanted = list(RECOMMENDED_INDEXES) + ([POST_ID_INDEX] if POST_ID_COLUMN in column_types else [])
+
+    print("=" * 80)
+    print(f"📋 {TABLE} 的索引:")
+    for name, index_columns in indexes.items():
+        print(f"  {name:<24} ({', '.join(index_columns)})")
+    print("-" * 80)
+    for name, columns in wanted:
+        existing = covering_index(indexes, primary_key, columns)
+        status = f"✓ 已有（{existing}）" if existing else "✗ 缺少"
+        print(f"  ({', '.join(columns)})".ljust(30) + status)
+    if POST_ID_COLUMN in column_types:
+        cursor = connection.cursor()
+        cursor.execute(
+            f"SELECT COUNT(*) FROM {TABLE} WHERE from_source = %s AND {POST_ID_COLUMN} IS NULL", (FROM_SOURCE,)
+        )
+        (unfilled,) = cursor.fetchone()
+        cursor.close()
+        print("  post_id 列".ljust(30) + f"✓ 已有，{unfilled} 行待回填" + ("（运行 backfill）" if unfilled else ""))
+    else:
+        print("  post_id 列".ljust(30) + "- 未添加（可选，apply --post-id-column）")
+    print("-" * 80)
+    print("🔍 常用查询的执行计划:")
+    for label, access_type, key, rows, extra in explain_hot_queries(connection):
+        warning = "  ⚠️  全表扫描" if access_type == 'ALL' else ("  ⚠️  额外排序" if 'filesort' in extra else "")
+        print(f"  {label:<8} type={access_type} key={key} rows={rows} {extra}{warning}")
+    print("=" * 80)
+    return not missing
+
+
+def apply(connection, post_id_column=False, batch_size=DEFAULT_BATCH_SIZE):
+    """创建缺少的索引（和 post_id 列），返回执行的变更说明列表"""
+    indexes, primary_key, column_types = load_schema(connection)
+    clauses = []
+    if post_id_column and POST_ID_COLUMN not in column_types:
+        clauses.append(f"ADD COLUMN {POST_ID_COLUMN} INT UNSIGNED NULL")
+        column_types[POST_ID_COLUMN] = ('int', None)
+    for name, columns in missing_indexes(indexes, primary_key, column_types):
+        if name in indexes:
+            logger.warning(f"⚠️  索引名 {name} 已被其他列占用，跳过")
+            continue
+        clauses.append(f"ADD INDEX {name} ({', '.join(index_column_sql(c, column_types) for c in columns)})")
+
+    if clauses:
+        # 合并为一条 ALTER TABLE，大表只扫描一次
+        sql = f"ALTER TABLE {TABLE} " + ", ".join(clauses)
+        logger.info(f"🔧 {sql}")
+        cursor = connection.cursor()
+        try:
+            cursor.execute(sql)
+        finally:
+            cursor.close()
+        logger.info(f"✓ 已完成 {len(clauses)} 项变更")
+    else:
+        logger.info("✓ 推荐的索引都已存在，没有需要变更的")
+
+    if post_id_column:
+        backfill_post_ids(connection, batch_size)
+    return clauses
+
+
+def backfill_post_ids(connection, batch_size=DEFAULT_BATCH_SIZE):
+    """从 src_url 解析postId，按主键分批回填 post_id 为空的行，每批一个事务；返回回填的行数"""
+    cursor = connection.cursor()
+    last_id = 0
+    updated = unparsed = 0
+    try:
+        while True:
+            cursor.execute(
+                f"SELECT id, src_url FROM {TABLE} "
+                f"WHERE id > %s AND from_source = %s AND {POST_ID_COLUMN} IS NULL ORDER BY id LIMIT %s",
+                (last_id, FROM_SOURCE, batch_size)
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            params = []
+            for row_id, src_url in rows:
+                post_id = post_id_from_url(src_url)
+                if post_id is not None:
+                    params.append((post_id, row_id))
+            unparsed += len(rows) - len(params)
+            if params:
+                cursor.executemany(f"UPDATE {TABLE} SET {POST_ID_COLUMN} = %s WHERE id = %s", params)
+            connection.commit()
+            updated += len(params)
+            logger.info(f"  回填到 id {last_id}，累计 {updated} 行")
+    except Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    logger.info(f"✓ 回填 post_id {updated} 行" + (f"，{unparsed} 行的 src_url 中没有postId" if unparsed else ""))
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=f'检查并补全 {TABLE} 常用查询的索引',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+使用示例:
+  python3 migrate_schema.py check
+  python3 migrate_schema.py apply --post-id-column
+  python3 migrate_schema.py backfill
+        '''
+    )
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.add_parser('check', help='检查索引和查询计划，缺少索引时退出码为1')
+    apply_parser = subparsers.add_parser('apply', help='创建缺少的索引')
+    apply_parser.add_argument('--post-id-column', action='store_true',
+                              help='同时增加 post_id 整数列及其索引，并从 src_url 回填')
+    backfill_parser = subparsers.add_parser('backfill', help='从 src_url 回填 post_id 为空的行')
+    for sub in (apply_parser, backfill_parser):
+        sub.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                         help=f'回填时每个事务更新的行数，默认：{DEFAULT_BATCH_SIZE}')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.command is None:
+        parser.print_help()
+        return False
+    if getattr(args, 'batch_size', 1) < 1:
+        logger.error("✗ 批大小必须大于0")
+        return False
+
+    pool = get_pool(DB_CONFIG, pool_size=1)
+    try:
+        connection = pool.acquire()
+    except Error as e:
+        logger.error(f"✗ 数据库连接失败: {e}")
+        return False
+
+    try:
+        if args.command == 'check':
+            if not check(connection):
+                print("✗ 缺少推荐的索引，运行 python3 migrate_schema.py apply 创建")
+                sys.exit(1)
+            print("✓ 推荐的索引都已存在")
+        elif args.command == 'apply':
+            apply(connection, args.post_id_column, args.batch_size)
+        else:
+            _, _, column_types = load_schema(connection)
+            if POST_ID_COLUMN not in column_types:
+                logger.error(f"✗ {TABLE} 没有 {POST_ID_COLUMN} 列，先运行 apply --post-id-column")
+                return False
+            backfill_post_ids(connection, args.batch_size)
+    except Error as e:
+        logger.error(f"✗ 迁移失败: {e}")
+        return False
+    finally:
+        pool.release(connection)
+    return True
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地模拟i云保文章接口 - 返回合成的 /discover/open/v1/post/{postId} 响应，用于离线测试和基准测试
+
+可以配置：
+  --latency / --jitter   每个请求的固定延迟和随机抖动（秒）
+  --error-rate           随机返回500的比例（瞬时错误，重试后可能成功）
+  --missing-rate         返回 isSuccess=false 的postId比例（按postId固定，同一个postId每次结果相同）
+  --deleted 90000-95000  整段不存在的postId，模拟被删除的区间，可重复指定
+  --max-post-id / --growth  当前最新的postId及每秒新发布的文章数，更大的postId不存在（测试 --tail）
+  --paragraphs / --images  正文大小
+
+使用方法:
+  python3 mock_api.py --port 8099 --latency 0.05 --error-rate 0.02
+  python3 iyunbao_crawler.py ...   # 爬虫通过 api_base_url 指向 http://127.0.0.1:8099/discover/open/v1/post
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bench_sanitizer import make_article
+
+API_PATH = '/discover/open/v1/post/'
+# 预先生成的正文数量，按postId轮流使用，避免每个请求都重新生成HTML
+BODY_POOL_SIZE = 16
+
+_POST_PATH_RE = re.compile(r'^/discover/open/v1/post/(\d+)$')
+
+
+def parse_ranges(specs):
+    """把 ['90000-95000', '100'] 转换为 [(90000, 95000), (100, 100)]"""
+    ranges = []
+    for spec in specs or ():
+        low, _, high = spec.partition('-')
+        low, high = int(low), int(high or low)
+        ranges.append((min(low, high), max(low, high)))
+    return ranges
+
+
+class MockIyunbaoAPI:
+    """在后台线程中运行的模拟接口，支持 HTTP/1.1 keep-alive"""
+
+    def __init__(self, port=0, host='127.0.0.1', latency=0.0, jitter=0.0, error_rate=0.0,
+                 missing_rate=0.0, deleted_ranges=(), paragraphs=20, images=5, seed=0,
+                 max_post_id=None, growth=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.missing_rate = missing_rate
+        self.deleted_ranges = list(deleted_ranges)
+        self.seed = seed
+        self.max_post_id = max_post_id  # 为 None 时任意大的postId都存在
+        self.growth = growth
+        self.started = time.monotonic()
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._bodies = [make_article(paragraphs, images, seed=seed + i) for i in range(BODY_POOL_SIZE)]
+
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # 响应头和正文分两次写出，不关闭Nagle算法时keep-alive连接上每个请求会多等约40ms
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                match = _POST_PATH_RE.match(self.path.split('?')[0])
+                if not match:
+                    self._send(404, {'isSuccess': False, 'errorMsg': 'not found'})
+                    return
+                status, payload = api.respond(int(match.group(1)))
+                self._send(status, payload)
+
+            def _send(self, status, payload):
+                body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # 客户端已断开（如基准测试杀死了爬虫进程），不打印异常
+                    self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    @property
+    def base_url(self):
+        """传给 IyunbaoCrawler(api_base_url=...) 的地址"""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}{API_PATH.rstrip('/')}"
+
+    def newest_post_id(self):
+        """当前最新的postId：max_post_id 加上启动以来按 growth 新发布的文章数"""
+        if self.max_post_id is None:
+            return None
+        return self.max_post_id + int((time.monotonic() - self.started) * self.growth)
+
+    def is_missing(self, post_id):
+        """postId是否不存在：尚未发布、落在删除区间内，或按 missing_rate 固定抽中"""
+        newest = self.newest_post_id()
+        if newest is not None and post_id > newest:
+            return True
+        if any(low <= post_id <= high for low, high in self.deleted_ranges):
+            return True
+        if self.missing_rate <= 0:
+            return False
+        bucket = zlib.crc32(f"{self.seed}:{post_id}".encode()) % 10000
+        return bucket < self.missing_rate * 10000
+
+    def respond(self, post_id):
+        """返回 (HTTP状态码, JSON内容)"""
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+            failed = self.error_rate > 0 and self._rng.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        if failed:
+            return 500, {'isSuccess': False, 'errorMsg': 'mock transient error'}
+        if self.is_missing(post_id):
+            return 200, {'isSuccess': False, 'errorMsg': '文章不存在'}
+        return 200, {
+            'isSuccess': True,
+            'result': {
+                'title': f'模拟文章 #{post_id}',
+                'content': self._bodies[post_id % len(self._bodies)],
+                'postPv': post_id % 5000,
+                'likeNum': post_id % 97,
+                'author': {'nickname': '模拟作者'},
+            }
+        }
+
+    def start(self):
+        """在后台线程中开始服务"""
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def close(self):
+        if self._thread is not None:
+            self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟i云保文章接口')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址，默认：127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099, help='监听端口，默认：8099')
+    parser.add_argument('--latency', type=float, default=0.0, help='每个请求的固定延迟（秒），默认：0')
+    parser.add_argument('--jitter', type=float, default=0.0, help='在固定延迟上叠加的随机延迟上限（秒），默认：0')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='随机返回500的比例，默认：0')
+    parser.add_argument('--missing-rate', type=float, default=0.0, help='不存在的postId比例，默认：0')
+    parser.add_argument('--deleted', action='append', metavar='LOW-HIGH',
+                        help='整段不存在的postId区间，可重复指定')
+    parser.add_argument('--paragraphs', type=int, default=20, help='正文段落数，默认：20')
+    parser.add_argument('--images', type=int, default=5, help='正文图片数，默认：5')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子，默认：0')
+    parser.add_argument('--max-post-id', type=int, help='当前最新的postId，更大的postId不存在，默认：不限')
+    parser.add_argument('--growth', type=float, default=0.0,
+                        help='每秒新发布的文章数（与 --max-post-id 一起使用），默认：0')
+    args = parser.parse_args()
+
+    api = MockIyunbaoAPI(
+        port=args.port, host=args.host, latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, missing_rate=args.missing_rate,
+        deleted_ranges=parse_ranges(args.deleted), paragraphs=args.paragraphs,
+        images=args.images, seed=args.seed, max_post_id=args.max_post_id, growth=args.growth
+    )
+    print(f"🚀 模拟接口已启动: {api.base_url}/{{postId}}")
+    try:
+        api.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+postId 位图 - 用紧凑的内存集合记录已入库的文章
+
+postId 是稠密的整数，每个ID只占1个bit：10万篇文章约12KB内存，
+判断是否已存在是一次下标运算，不需要访问数据库。
+"""
+
+import re
+
+ARTICLE_URL_TEMPLATE = "https://bbs.iyunbao.com/m/community/topic?a=1&postId={}"
+
+_POST_ID_PATTERN = re.compile(r'[?&]postId=(\d+)')
+
+
+def build_article_url(post_id):
+    """根据postId构建文章来源URL（即 baoxianblog.src_url）"""
+    return ARTICLE_URL_TEMPLATE.format(post_id)
+
+
+def post_id_from_url(src_url):
+    """从 src_url 中解析postId，无法解析时返回 None"""
+    match = _POST_ID_PATTERN.search(src_url or '')
+    return int(match.group(1)) if match else None
+
+
+class PostIdBitmap:
+    """按postId下标存储的位图集合，容量随最大ID自动增长"""
+
+    def __init__(self, post_ids=()):
+        self._bits = bytearray()
+        self._count = 0
+        for post_id in post_ids:
+            self.add(post_id)
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, post_id):
+        if post_id < 0:
+            return False
+        index = post_id >> 3
+        return index < len(self._bits) and bool(self._bits[index] & (1 << (post_id & 7)))
+
+    def add(self, post_id):
+        """加入一个postId"""
+        if post_id < 0:
+            raise ValueError("postId 不能为负数")
+        index = post_id >> 3
+        if index >= len(self._bits):
+            # 按倍数扩容，避免逐个字节增长
+            self._bits.extend(bytes(max(index + 1 - len(self._bits), len(self._bits))))
+        mask = 1 << (post_id & 7)
+        if not self._bits[index] & mask:
+            self._bits[index] |= mask
+            self._count += 1
+
+    def discard(self, post_id):
+        """移除一个postId（不存在时忽略）"""
+        if post_id in self:
+            self._bits[post_id >> 3] &= ~(1 << (post_id & 7)) & 0xFF
+            self._count -= 1
+
+    def max(self):
+        """最大的postId，集合为空时返回 None"""
+        for index in range(len(self._bits) - 1, -1, -1):
+            byte = self._bits[index]
+            if byte:
+                return (index << 3) + byte.bit_length() - 1
+        return None
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+追新模式 - 记住已处理到的最大postId（高水位），定期向上探测最新的postId，只抓取新发布的文章
+
+每一轮：
+  1. 从高水位向上按 1、2、4、8…… 的步长探测，直到探到不存在的postId，再在最后一个存在的
+     和第一个不存在的postId之间二分，找到当前最新的postId（IyunbaoCrawler.find_newest_post_id）；
+     每个探测点向上多看 slack 个postId，刚发布就被删除的文章不会让探测停在它下面
+  2. 用 IyunbaoCrawler.crawl_articles 抓取 (高水位, 最新postId] 区间，探测时已请求到的文章不再请求
+  3. 高水位推进到最新postId；区间内有失败或没遍历到的postId时停在它们下面，下一轮重试
+  4. 等待一段时间再开始下一轮：本轮有新文章时间隔减半，没有时翻倍（--poll-min ~ --poll-max）
+
+没有新文章的一轮只需要 slack+1 个请求。高水位和每个postId的处理结果记录在单独的断点文件
+（默认 crawl_tail.db）中，不影响向下遍历的 crawl_checkpoint.db。高水位保存在 meta 表中，
+每轮 crawl_articles 开始时清空 run_state 也不会丢失，进程在一轮中途崩溃后从上一轮的高水位继续。
+
+使用方法:
+  python3 iyunbao_crawler.py --tail
+  python3 iyunbao_crawler.py --tail --poll-min 60 --poll-max 1800 -w 4 --rate 1
+"""
+
+import logging
+
+from iyunbao_crawler import DEFAULT_POLL_MAX, DEFAULT_POLL_MIN, DEFAULT_TAIL_SLACK
+
+logger = logging.getLogger(__name__)
+
+
+def next_poll_interval(interval, found_new, min_interval=DEFAULT_POLL_MIN, max_interval=DEFAULT_POLL_MAX):
+    """根据本轮结果计算下一轮的等待时间：有新文章减半，没有翻倍"""
+    interval = interval / 2 if found_new else interval * 2
+    return max(min_interval, min(max_interval, interval))
+
+
+class PostTailer:
+    """按高水位增量抓取新文章"""
+
+    def __init__(self, crawler, checkpoint, min_interval=DEFAULT_POLL_MIN,
+                 max_interval=DEFAULT_POLL_MAX, slack=DEFAULT_TAIL_SLACK):
+        self.crawler = crawler
+        self.checkpoint = checkpoint  # CrawlCheckpoint，同时作为 crawler 的断点文件
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.slack = max(0, int(slack))
+        self.interval = min_interval
+        self.high_water = None  # 这个postId及以下的文章都已处理
+        self.crawler.checkpoint = checkpoint
+        self.crawler.metrics.gauge('tail_high_water', lambda: self.high_water or 0)
+
+    def load_high_water(self, default_post_id):
+        """读取上次保存的高水位；没有时用已入库的最大postId，再没有时用 default_post_id"""
+        saved = self.checkpoint.get_meta('high_water')
+        if saved:
+            self.high_water = int(saved)
+            logger.info(f"🔁 从断点继续追新，高水位 postId {self.high_water}")
+            return self.high_water
+
+        crawler = self.crawler
+        if crawler.preload_known and crawler.known_post_ids is None and crawler.connect_db():
+            try:
+                crawler.load_known_post_ids()
+            finally:
+                crawler.close_db()
+        known_max = crawler.known_post_ids.max() if crawler.known_post_ids is not None else None
+        self.high_water = known_max or default_post_id
+        logger.info(f"📍 初始高水位 postId {self.high_water}（{'已入库的最大postId' if known_max else '--start'}）")
+        # 立即保存：第一轮中途崩溃后不能再按已入库的最大postId推算，否则会越过失败的postId
+        self.checkpoint.set_meta('high_water', self.high_water)
+        return self.high_water
+
+    def run_cycle(self):
+        """执行一轮，返回本轮新增的文章数；探测或连接数据库失败时返回 None"""
+        high_water = self.high_water
+        newest, probed = self.crawler.find_newest_post_id(high_water, self.slack)
+        if newest is None:
+            logger.warning("⚠️  探测最新postId失败，本轮跳过")
+            return None
+        if newest <= high_water:
+            logger.info(f"💤 没有新文章（高水位 postId {high_water}，探测 {len(probed)} 个postId）")
+            return 0
+
+        logger.info(f"🆕 发现新postId {high_water + 1} → {newest}（{newest - high_water} 个，探测 {len(probed)} 个postId）")
+        # 探测时已请求到的文章遍历时直接使用
+        prefetched = {post_id: result for post_id, result in probed.items() if high_water < post_id <= newest}
+        del probed
+        self.crawler.progress = {}
+        self.crawler.crawl_articles(
+            start_post_id=newest, count=newest - high_water,
+            stop_post_id=high_water + 1, prefetched=prefetched
+        )
+        progress = self.crawler.progress
+        if not progress:
+            return None
+
+        # 从上往下遍历，提前结束时 next_post_id 及以下都还没处理
+        unfinished = [post_id for post_id in self.checkpoint.retry_post_ids() if high_water < post_id <= newest]
+        if progress['next_post_id'] > high_water:
+            unfinished.append(progress['next_post_id'])
+        self.high_water = min(unfinished) - 1 if unfinished else newest
+        if self.high_water < newest:
+            logger.warning(f"⚠️  postId {min(unfinished)} 等 {len(unfinished)} 个未完成，高水位停在 {self.high_water}，下一轮重试")
+        self.checkpoint.set_meta('high_water', self.high_water)
+        return progress['success_count']
+
+    def run(self, max_cycles=None):
+        """循环追新，直到 crawler.stop_event 置位或达到 max_cycles 轮"""
+        cycles = 0
+        while not self.crawler.stop_event.is_set():
+            found = self.run_cycle()
+            cycles += 1
+            if max_cycles and cycles >= max_cycles:
+                break
+            self.interval = next_poll_interval(self.interval, bool(found), self.min_interval, self.max_interval)
+            logger.info(f"⏳ {self.interval:.0f} 秒后开始下一轮")
+            self.crawler.stop_event.wait(self.interval)
+        return cycles
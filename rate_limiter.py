@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+令牌桶限速器 - 让多个并发抓取线程共享同一个全局请求速率预算
+
+rate 为每秒补充的令牌数（即长期平均请求速率），burst 为桶容量（允许的瞬时突发请求数）。
+"""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """线程安全的令牌桶，acquire() 会阻塞直到轮到本次请求"""
+
+    def __init__(self, rate, burst=1):
+        if rate <= 0:
+            raise ValueError("rate 必须大于0")
+        if burst < 1:
+            raise ValueError("burst 必须大于等于1")
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        """按流逝时间补充令牌，最多补满 burst 个"""
+        elapsed = now - self._last
+        self._last = now
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+
+    def set_rate(self, rate):
+        """调整补充速率（自适应限速使用），已积累的令牌按旧速率结算"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(float(rate), 1e-6)
+
+    def pause(self, seconds):
+        """让所有线程至少再等待 seconds 秒（例如服务端返回 Retry-After 时）"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+    def acquire(self, tokens=1):
+        """取走令牌；不足时预约后续令牌并在锁外等待，保证多线程按先来后到排队"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分片分布式爬取 - 把postId区间切成分片，由多个工作进程（可跨多台机器）通过租约领取
+
+分片和租约保存在共享的租约表中：
+  - 本机多进程：SQLite文件（默认 crawl_shards.db）
+  - 多台机器：MySQL表 iyunbao_crawl_shard（--store mysql）
+
+工作进程领取分片后定期续约并上报遍历进度；进程挂掉后租约过期，分片会从上报的进度处被其他进程接手。
+上报的进度不低于还没写入数据库或失败的postId（IyunbaoCrawler.progress['resume_post_id']），
+接手的进程会重新处理它们；已入库的文章按预加载的postId位图跳过，不再请求。
+
+使用方法:
+  python3 shard_coordinator.py plan --low 1 --high 97867 --shard-size 1000
+  python3 shard_coordinator.py work --workers 4 --rate 2          # 本机4个进程，共享每秒2个请求
+  python3 shard_coordinator.py work --store mysql --workers 2 --rate 1   # 每台机器各自运行
+  python3 shard_coordinator.py status
+"""
+
+import argparse
+import logging
+import multiprocessing
+import socket
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from db_pool import get_pool
+from iyunbao_crawler import IyunbaoCrawler, API_BASE_URL, DB_CONFIG, DEFAULT_RATE, DEFAULT_BURST
+from storage import open_storage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE = 'crawl_shards.db'
+DEFAULT_SHARD_SIZE = 1000
+DEFAULT_LEASE_SECONDS = 300
+MAX_SHARD_ATTEMPTS = 3  # 同一分片最多被领取的次数，超过后需要人工处理
+
+SHARD_PENDING = 'pending'
+SHARD_LEASED = 'leased'
+SHARD_DONE = 'done'
+
+Shard = namedtuple('Shard', ['shard_id', 'high_id', 'low_id', 'next_post_id', 'attempts'])
+
+
+class ShardStore:
+    """租约表的公共逻辑，子类提供数据库连接和占位符风格"""
+
+    table = 'iyunbao_crawl_shard'
+    placeholder = '%s'
+
+    def connect(self):
+        raise NotImplementedError
+
+    def release(self, conn):
+        """用完 connect() 取得的连接"""
+        conn.close()
+
+    def _begin_exclusive(self, conn):
+        """开启一个能阻止其他进程同时领取分片的事务"""
+        raise NotImplementedError
+
+    def _sql(self, sql):
+        return sql.replace('?', self.placeholder)
+
+    def _execute(self, sql, params=(), fetch=False):
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self._sql(sql), params)
+            rows = cursor.fetchall() if fetch else cursor.rowcount
+            conn.commit()
+            cursor.close()
+            return rows
+        finally:
+            self.release(conn)
+
+    def create_table(self):
+        """创建租约表"""
+        self._execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.table} (
+                shard_id INTEGER PRIMARY KEY,
+                high_id INTEGER NOT NULL,
+                low_id INTEGER NOT NULL,
+                next_post_id INTEGER NOT NULL,
+                status VARCHAR(16) NOT NULL,
+                owner VARCHAR(128),
+                lease_expires DOUBLE NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                success_count INTEGER NOT NULL DEFAULT 0,
+                updated_at DOUBLE NOT NULL DEFAULT 0
+            )
+        """)
+
+    def plan(self, low_id, high_id, shard_size):
+        """把 [low_id, high_id] 从大到小切成分片写入租约表（已有分片的表不会重复规划）"""
+        self.create_table()
+        existing = self._execute(f"SELECT COUNT(*) FROM {self.table}", fetch=True)[0][0]
+        if existing:
+            logger.warning(f"⚠️  租约表中已有 {existing} 个分片，跳过规划")
+            return 0
+
+        rows = []
+        shard_id = 0
+        high = high_id
+        while high >= low_id:
+            low = max(low_id, high - shard_size + 1)
+            shard_id += 1
+            rows.append((shard_id, high, low, high, SHARD_PENDING, time.time()))
+            high = low - 1
+
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            self._begin_exclusive(conn)
+            cursor.executemany(self._sql(f"""
+                INSERT INTO {self.table} (shard_id, high_id, low_id, next_post_id, status, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """), rows)
+            conn.commit()
+            cursor.close()
+        finally:
+            self.release(conn)
+        logger.info(f"✓ 已规划 {len(rows)} 个分片: postId {high_id} → {low_id}，每片 {shard_size} 个")
+        return len(rows)
+
+    def acquire(self, owner, lease_seconds):
+        """领取一个待处理或租约已过期的分片，没有可领取的分片时返回 None"""
+        now = time.time()
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            self._begin_exclusive(conn)
+            cursor.execute(self._sql(f"""
+                SELECT shard_id, high_id, low_id, next_post_id, attempts FROM {self.table}
+                WHERE (status = ? OR (status = ? AND lease_expires < ?)) AND attempts < ?
+                ORDER BY high_id DESC LIMIT 1
+                {self._lock_clause()}
+            """), (SHARD_PENDING, SHARD_LEASED, now, MAX_SHARD_ATTEMPTS))
+            row = cursor.fetchone()
+            if row is None:
+                conn.rollback()
+                return None
+            cursor.execute(self._sql(f"""
+                UPDATE {self.table}
+                SET status = ?, owner = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ?
+                WHERE shard_id = ?
+            """), (SHARD_LEASED, owner, now + lease_seconds, now, row[0]))
+            conn.commit()
+            cursor.close()
+            return Shard(row[0], row[1], row[2], row[3], row[4] + 1)
+        finally:
+            self.release(conn)
+
+    def _lock_clause(self):
+        return ''
+
+    def renew(self, shard, owner, lease_seconds, next_post_id, success_count):
+        """续约并上报进度；租约已被其他进程接手时返回 False"""
+        now = time.time()
+        updated = self._execute(f"""
+            UPDATE {self.table}
+            SET lease_expires = ?, next_post_id = ?, success_count = ?, updated_at = ?
+            WHERE shard_id = ? AND owner = ? AND status = ?
+        """, (now + lease_seconds, next_post_id, success_count, now, shard.shard_id, owner, SHARD_LEASED))
+        return updated > 0
+
+    def finish(self, shard, owner, next_post_id, success_count):
+        """分片遍历结束：到达下界标记为完成，否则带着进度放回待处理队列"""
+        status = SHARD_DONE if next_post_id < shard.low_id else SHARD_PENDING
+        self._execute(f"""
+            UPDATE {self.table}
+            SET status = ?, owner = NULL, lease_expires = 0, next_post_id = ?, success_count = ?, updated_at = ?
+            WHERE shard_id = ? AND owner = ?
+        """, (status, next_post_id, success_count, time.time(), shard.shard_id, owner))
+        return status
+
+    def summary(self):
+        """按状态统计分片"""
+        return self._execute(f"""
+            SELECT status, COUNT(*), SUM(success_count),
+                   SUM(CASE WHEN next_post_id >= low_id THEN next_post_id - low_id + 1 ELSE 0 END)
+            FROM {self.table} GROUP BY status
+        """, fetch=True)
+
+
+class SQLiteShardStore(ShardStore):
+    """基于SQLite文件的租约表，适合单机多进程（不要放在网络文件系统上）"""
+
+    table = 'crawl_shard'
+    placeholder = '?'
+
+    def __init__(self, path=DEFAULT_STORE):
+        self.path = path
+
+    def connect(self):
+        # 自动提交模式，需要事务的地方显式 BEGIN IMMEDIATE
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _begin_exclusive(self, conn):
+        # 立即获取写锁，其他进程的领取操作会等待本事务结束
+        conn.execute("BEGIN IMMEDIATE")
+
+
+class MySQLShardStore(ShardStore):
+    """基于MySQL表的租约表，供多台机器共享"""
+
+    def __init__(self, db_config=None):
+        self.db_config = db_config or DB_CONFIG
+
+    def connect(self):
+        # 心跳线程每次续约都要连接，从连接池取，不必每次重新建连
+        return get_pool(self.db_config).acquire()
+
+    def release(self, conn):
+        get_pool(self.db_config).release(conn)
+
+    def _begin_exclusive(self, conn):
+        conn.start_transaction()
+
+    def _lock_clause(self):
+        return 'FOR UPDATE'
+
+
+def open_store(spec):
+    """根据 --store 参数打开租约表：'mysql' 使用 DB_CONFIG，其余视为SQLite文件路径"""
+    if spec == 'mysql':
+        return MySQLShardStore()
+    return SQLiteShardStore(spec)
+
+
+def _heartbeat(store, shard, owner, lease_seconds, crawler, stop):
+    """后台续约线程：每 lease_seconds/3 秒续约一次并上报爬虫进度"""
+    while not stop.wait(lease_seconds / 3):
+        progress = crawler.progress
+        try:
+            alive = store.renew(
+                shard, owner, lease_seconds,
+                progress.get('resume_post_id', shard.next_post_id),
+                progress.get('success_count', 0)
+            )
+        except Exception as e:
+            logger.warning(f"⚠️  分片 #{shard.shard_id} 续约失败: {e}")
+            continue
+        if not alive:
+            logger.error(f"✗ 分片 #{shard.shard_id} 的租约已被其他进程接手，停止本分片")
+            crawler.stop_event.set()
+            return
+
+
+def run_worker(store_spec, worker_name, rate, burst, workers, lease_seconds, batch_size,
+               storage_spec='mysql', api_base_url=API_BASE_URL):
+    """工作进程：循环领取分片并用 IyunbaoCrawler 爬取，直到没有可领取的分片"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    store = open_store(store_spec)
+    crawler = IyunbaoCrawler(
+        workers=workers, rate=rate, burst=burst, batch_size=batch_size,
+        storage=open_storage(storage_spec, DB_CONFIG), api_base_url=api_base_url
+    )
+    owner = f"{socket.gethostname()}:{worker_name}"
+    shard_count = 0
+
+    while True:
+        shard = store.acquire(owner, lease_seconds)
+        if shard is None:
+            break
+        logger.info(f"📦 [{worker_name}] 领取分片 #{shard.shard_id}: postId {shard.next_post_id} → {shard.low_id}（第 {shard.attempts} 次）")
+
+        crawler.stop_event.clear()
+        crawler.progress = {}
+        stop = threading.Event()
+        heartbeat = threading.Thread(
+            target=_heartbeat, args=(store, shard, owner, lease_seconds, crawler, stop), daemon=True
+        )
+        heartbeat.start()
+        try:
+            crawler.crawl_articles(
+                start_post_id=shard.next_post_id,
+                count=shard.next_post_id - shard.low_id + 1,
+                stop_post_id=shard.low_id
+            )
+        finally:
+            stop.set()
+            heartbeat.join()
+
+        # 有失败的postId时分片放回待处理队列，下一次领取从其中最大的postId重新遍历
+        progress = crawler.progress
+        status = store.finish(
+            shard, owner,
+            progress.get('resume_post_id', shard.next_post_id),
+            progress.get('success_count', 0)
+        )
+        shard_count += 1
+        logger.info(f"✓ [{worker_name}] 分片 #{shard.shard_id} 结束，状态: {status}")
+
+    logger.info(f"✓ [{worker_name}] 没有可领取的分片，工作进程退出（共处理 {shard_count} 个分片）")
+
+
+def print_summary(store):
+    """打印各状态的分片统计"""
+    print("=" * 80)
+    print(f"{'状态':<10}{'分片数':>10}{'新增文章':>12}{'剩余postId':>14}")
+    print("-" * 80)
+    for status, shards, success, remaining in store.summary():
+        print(f"{status:<10}{shards:>10}{int(success or 0):>12}{int(remaining or 0):>14}")
+    print("=" * 80)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='i云保爬虫分片模式 - 多进程/多机器并行爬取postId区间',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+使用示例:
+  python3 shard_coordinator.py plan --low 1 --high 97867 --shard-size 1000
+  python3 shard_coordinator.py work --workers 4 --rate 2
+  python3 shard_coordinator.py work --store mysql --workers 2 --rate 1
+  python3 shard_coordinator.py status
+        '''
+    )
+    parser.add_argument(
+        '--store',
+        default=DEFAULT_STORE,
+        help=f"租约表位置：SQLite文件路径，或 'mysql' 使用数据库表，默认：{DEFAULT_STORE}"
+    )
+    subparsers = parser.add_subparsers(dest='command')
+
+    plan_parser = subparsers.add_parser('plan', help='规划分片')
+    plan_parser.add_argument('--low', type=int, default=1, help='最小postId，默认：1')
+    plan_parser.add_argument('--high', type=int, default=97867, help='最大postId，默认：97867')
+    plan_parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE, help='每个分片的postId数量，默认：1000')
+
+    work_parser = subparsers.add_parser('work', help='启动工作进程领取分片')
+    work_parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(), help='本机工作进程数，默认：CPU核数')
+    work_parser.add_argument('--threads', type=int, default=1, help='每个工作进程的并发请求数，默认：1')
+    work_parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help='本机所有工作进程共享的总请求速率（次/秒）')
+    work_parser.add_argument('--burst', type=int, default=DEFAULT_BURST, help='每个工作进程的令牌桶容量，默认：1')
+    work_parser.add_argument('--lease', type=int, default=DEFAULT_LEASE_SECONDS, help='租约时长（秒），默认：300')
+    work_parser.add_argument('--batch-size', type=int, default=100, help='批量写入数据库的文章数，默认：100')
+
+    subparsers.add_parser('status', help='查看分片进度')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    store = open_store(args.store)
+
+    if args.command == 'plan':
+        if args.low < 1 or args.high < args.low or args.shard_size < 1:
+            logger.error("✗ postId区间或分片大小不合法")
+            return
+        store.plan(args.low, args.high, args.shard_size)
+    elif args.command == 'work':
+        if args.workers < 1 or args.rate <= 0:
+            logger.error("✗ 工作进程数和请求速率必须大于0")
+            return
+        # 每个进程分到总速率预算的一份，本机总请求速率不变
+        rate_per_worker = args.rate / args.workers
+        logger.info(f"🚀 启动 {args.workers} 个工作进程，每个进程 {rate_per_worker:.3f} 次/秒")
+        processes = []
+        for i in range(args.workers):
+            process = multiprocessing.Process(
+                target=run_worker,
+                args=(args.store, f"worker-{i + 1}", rate_per_worker, args.burst,
+                      args.threads, args.lease, args.batch_size)
+            )
+            process.start()
+            processes.append(process)
+        for process in processes:
+            process.join()
+        print_summary(store)
+    elif args.command == 'status':
+        print_summary(store)
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
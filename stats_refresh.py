@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+阅读数/看好数增量刷新 - 只重新拉取已入库文章的统计数据，批量更新 read_count 和 like_count
+
+已入库的文章不会再被 iyunbao_crawler 抓取，统计数据停留在首次抓取时的值。
+本脚本按刷新计划表 iyunbao_stats_schedule 逐步更新：
+  - 每篇文章有自己的检查间隔：数值有变化时间隔减半，没有变化时间隔翻倍（1小时 ~ 30天），
+    仍在增长的文章被频繁检查，已经稳定的老文章越来越少被请求
+  - 到期的文章按postId从新到旧处理，新文章优先
+  - 已删除（接口返回不存在）的文章不计为失败，直接推迟到最长间隔后再检查，
+    不会每次都占用到期名额、把仍在更新的文章挤出批次
+  - 只有数值变化的行才会 UPDATE，且只更新统计列和 update_time，不触碰 src_content
+  - 每 --batch-size 篇用一条多行 UPDATE 在一个事务内提交
+
+使用方法:
+  python3 stats_refresh.py                         # 刷新最多1000篇到期文章
+  python3 stats_refresh.py --limit 5000 -w 4 --rate 1
+  python3 stats_refresh.py --status                # 查看刷新计划
+"""
+
+import argparse
+import logging
+from collections import defaultdict
+
+from mysql.connector import Error
+
+from iyunbao_crawler import IyunbaoCrawler, DEFAULT_RATE, DEFAULT_BURST, NOT_FOUND
+from post_id_set import post_id_from_url
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_TABLE = 'iyunbao_stats_schedule'
+MIN_INTERVAL = 3600           # 最短检查间隔：1小时
+MAX_INTERVAL = 30 * 86400     # 最长检查间隔：30天
+DEFAULT_LIMIT = 1000
+DEFAULT_BATCH_SIZE = 200
+
+
+def next_interval(interval, changed, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL):
+    """根据本次检查结果计算下一次检查间隔：有变化减半，无变化翻倍"""
+    interval = interval // 2 if changed else interval * 2
+    return max(min_interval, min(max_interval, interval))
+
+
+def _values_table(rows, columns):
+    """生成 UNION ALL 派生表和对应的参数，用于一条语句更新多行"""
+    first = ', '.join(f'%s AS {column}' for column in columns)
+    rest = ', '.join(['%s'] * len(columns))
+    sql = ' UNION ALL '.join([f'SELECT {first}'] + [f'SELECT {rest}'] * (len(rows) - 1))
+    params = [value for row in rows for value in row]
+    return sql, params
+
+
+class StatsRefresher:
+    """按刷新计划拉取统计数据并批量写回 baoxianblog"""
+
+    def __init__(self, crawler, batch_size=DEFAULT_BATCH_SIZE,
+                 min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL):
+        self.crawler = crawler
+        self.batch_size = max(1, int(batch_size))
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+
+    @property
+    def connection(self):
+        return self.crawler.db_connection
+
+    def create_table(self):
+        cursor = self.connection.cursor()
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {SCHEDULE_TABLE} (
+                article_id INT PRIMARY KEY,
+                post_id INT NOT NULL,
+                interval_seconds INT NOT NULL,
+                next_check_at DATETIME NOT NULL,
+                last_checked_at DATETIME NULL,
+                KEY idx_next_check (next_check_at)
+            )
+        """)
+        self.connection.commit()
+        cursor.close()
+
+    def seed(self):
+        """把尚未加入刷新计划的文章加入计划（立即到期），返回新加入的篇数"""
+        cursor = self.connection.cursor()
+        cursor.execute(f"""
+            SELECT b.id, b.src_url FROM baoxianblog b
+            LEFT JOIN {SCHEDULE_TABLE} s ON s.article_id = b.id
+            WHERE b.from_source = 'iyunbao' AND s.article_id IS NULL
+        """)
+        rows = []
+        for article_id, src_url in cursor.fetchall():
+            post_id = post_id_from_url(src_url)
+            if post_id is not None:
+                rows.append((article_id, post_id, self.min_interval))
+        if rows:
+            # executemany 会把 INSERT 合并为多行插入
+            cursor.executemany(
+                f"INSERT IGNORE INTO {SCHEDULE_TABLE} (article_id, post_id, interval_seconds, next_check_at) "
+                f"VALUES (%s, %s, %s, NOW())",
+                rows
+            )
+            self.connection.commit()
+        cursor.close()
+        return len(rows)
+
+    def due_articles(self, limit):
+        """到期的文章，按postId从新到旧：[(article_id, post_id, interval, read_count, like_count)]"""
+        cursor = self.connection.cursor()
+        cursor.execute(f"""
+            SELECT s.article_id, s.post_id, s.interval_seconds, b.read_count, b.like_count
+            FROM {SCHEDULE_TABLE} s JOIN baoxianblog b ON b.id = s.article_id
+            WHERE s.next_check_at <= NOW()
+            ORDER BY s.post_id DESC
+            LIMIT %s
+        """, (limit,))
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+
+    def _write_batch(self, stats_rows, schedule_rows):
+        """一个事务内写入一批：变化的统计数据 + 所有已检查文章的下一次检查时间"""
+        cursor = self.connection.cursor()
+        try:
+            if stats_rows:
+                values, params = _values_table(stats_rows, ('id', 'read_count', 'like_count'))
+                cursor.execute(f"""
+                    UPDATE baoxianblog b JOIN ({values}) v ON b.id = v.id
+                    SET b.read_count = v.read_count, b.like_count = v.like_count, b.update_time = NOW()
+                """, params)
+            if schedule_rows:
+                values, params = _values_table(schedule_rows, ('article_id', 'interval_seconds'))
+                cursor.execute(f"""
+                    UPDATE {SCHEDULE_TABLE} s JOIN ({values}) v ON s.article_id = v.article_id
+                    SET s.interval_seconds = v.interval_seconds,
+                        s.next_check_at = NOW() + INTERVAL v.interval_seconds SECOND,
+                        s.last_checked_at = NOW()
+                """, params)
+            self.connection.commit()
+            return True
+        except Error as e:
+            logger.error(f"✗ 批量更新统计数据失败（{len(schedule_rows)} 篇）: {e}")
+            self.connection.rollback()
+            return False
+        finally:
+            cursor.close()
+
+    def refresh(self, limit=DEFAULT_LIMIT):
+        """刷新最多 limit 篇到期文章，返回 (检查篇数, 更新篇数, 失败篇数, 已删除篇数)"""
+        seeded = self.seed()
+        if seeded:
+            logger.info(f"📋 {seeded} 篇新文章加入刷新计划")
+
+        due = self.due_articles(limit)
+        logger.info(f"🔄 本次到期 {len(due)} 篇文章")
+        if not due:
+            return 0, 0, 0, 0
+
+        # 同一个postId可能对应多行文章（重复抓取的历史数据），只请求一次，结果用于其中每一行
+        rows_by_post_id = defaultdict(list)
+        for row in due:
+            rows_by_post_id[row[1]].append(row)
+        checked = updated = failed = missing = 0
+        stats_rows, schedule_rows = [], []
+        fetched = self.crawler._iter_fetched_articles(
+            list(rows_by_post_id), fetch=self.crawler.fetch_post_stats
+        )
+        try:
+            for post_id, stats in fetched:
+                rows = rows_by_post_id[post_id]
+                if stats is None:
+                    # 请求失败的文章保持到期状态，下次运行时重试
+                    failed += len(rows)
+                    continue
+                for article_id, _, interval, read_count, like_count in rows:
+                    if stats is NOT_FOUND:
+                        # 已删除的文章推迟到最长间隔后再检查，不再占用每次的到期名额
+                        missing += 1
+                        schedule_rows.append((article_id, self.max_interval))
+                        continue
+                    changed = stats != (read_count, like_count)
+                    if changed:
+                        stats_rows.append((article_id,) + stats)
+                    schedule_rows.append((article_id, next_interval(
+                        interval, changed, self.min_interval, self.max_interval
+                    )))
+                if len(schedule_rows) >= self.batch_size:
+                    checked, updated, failed = self._flush(stats_rows, schedule_rows, checked, updated, failed)
+                    stats_rows, schedule_rows = [], []
+                if self.crawler.stop_event.is_set():
+                    break
+        finally:
+            fetched.close()
+            checked, updated, failed = self._flush(stats_rows, schedule_rows, checked, updated, failed)
+        if missing:
+            logger.info(f"🗑️  {missing} 篇文章已删除，推迟到最长检查间隔后再检查")
+        return checked, updated, failed, missing
+
+    def _flush(self, stats_rows, schedule_rows, checked, updated, failed):
+        """写入一批并累计计数"""
+        if not schedule_rows:
+            return checked, updated, failed
+        if self._write_batch(stats_rows, schedule_rows):
+            logger.info(f"✓ 已检查 {len(schedule_rows)} 篇，其中 {len(stats_rows)} 篇统计数据有变化")
+            return checked + len(schedule_rows), updated + len(stats_rows), failed
+        return checked, updated, failed + len(schedule_rows)
+
+    def summary(self):
+        """刷新计划概况：(总篇数, 当前到期篇数, 按检查间隔分布 [(间隔秒数, 篇数)])"""
+        cursor = self.connection.cursor()
+        cursor.execute(f"SELECT COUNT(*), COALESCE(SUM(next_check_at <= NOW()), 0) FROM {SCHEDULE_TABLE}")
+        total, due = cursor.fetchone()
+        cursor.execute(
+            f"SELECT interval_seconds, COUNT(*) FROM {SCHEDULE_TABLE} GROUP BY interval_seconds ORDER BY interval_seconds"
+        )
+        buckets = cursor.fetchall()
+        cursor.close()
+        return total, int(due), buckets
+
+
+def print_summary(refresher):
+    """打印刷新计划概况"""
+    total, due, buckets = refresher.summary()
+    print("=" * 80)
+    print(f"📋 刷新计划共 {total} 篇文章，当前到期 {due} 篇")
+    print("-" * 80)
+    print(f"{'检查间隔':<16}{'文章数':>10}")
+    for interval, count in buckets:
+        label = f"{interval / 3600:.0f} 小时" if interval < 86400 else f"{interval / 86400:.1f} 天"
+        print(f"{label:<16}{count:>10}")
+    print("=" * 80)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='i云保文章统计数据增量刷新 - 只更新 read_count / like_count',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+使用示例:
+  python3 stats_refresh.py
+  python3 stats_refresh.py --limit 5000 -w 4 --rate 1
+  python3 stats_refresh.py --status
+        '''
+    )
+    parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT, help='本次最多检查的到期文章数，默认：1000')
+    parser.add_argument('--workers', '-w', type=int, default=1, help='同时在途的请求数，默认：1')
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help='总请求速率（次/秒），默认：0.33')
+    parser.add_argument('--burst', type=int, default=DEFAULT_BURST, help='令牌桶容量，默认：1')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='每条 UPDATE 包含的文章数，默认：200')
+    parser.add_argument('--min-interval', type=float, default=MIN_INTERVAL / 3600, help='最短检查间隔（小时），默认：1')
+    parser.add_argument('--max-interval', type=float, default=MAX_INTERVAL / 86400, help='最长检查间隔（天），默认：30')
+    parser.add_argument('--status', action='store_true', help='只查看刷新计划，不发请求')
+    args = parser.parse_args()
+
+    if args.limit < 1 or args.workers < 1 or args.rate <= 0 or args.burst < 1 or args.batch_size < 1:
+        logger.error("✗ 参数必须为正数")
+        return False
+    min_interval = max(1, int(args.min_interval * 3600))
+    max_interval = max(min_interval, int(args.max_interval * 86400))
+
+    crawler = IyunbaoCrawler(workers=args.workers, rate=args.rate, burst=args.burst, preload_known=False)
+    if not crawler.connect_db():
+        return False
+    refresher = StatsRefresher(crawler, args.batch_size, min_interval, max_interval)
+    try:
+        refresher.create_table()
+        if args.status:
+            print_summary(refresher)
+            return True
+        checked, updated, failed, missing = refresher.refresh(args.limit)
+        logger.info(f"\n✓ 刷新完成：检查 {checked} 篇（其中已删除 {missing} 篇），更新 {updated} 篇，失败 {failed} 篇")
+        return failed == 0
+    except Error as e:
+        logger.error(f"✗ 刷新统计数据失败: {e}")
+        return False
+    finally:
+        crawler.close_db()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,565 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文章存储 - IyunbaoCrawler 通过 ArticleStorage 接口读写文章，不直接依赖 mysql.connector
+
+  MySQLStorage    baoxianblog 表（默认，--storage mysql）
+  SQLiteStorage   本地SQLite文件，WAL模式，每批文章一个事务（--storage articles.db）
+  ParquetStorage  本地Parquet目录，每批文章一个行组，便于分析（--storage articles.parquet，需要 pyarrow）
+  MemoryStorage   进程内的替身存储，用于基准测试和离线调试，不需要数据库
+
+所有实现的 write_articles() 都在一个事务内写入一批文章，失败时回滚并抛出 StorageError，
+由 BatchArticleWriter 负责拆分重试。
+
+只收集数据时可以先写入本地存储，不受远程MySQL往返延迟的限制，之后再导入 baoxianblog:
+  python3 iyunbao_crawler.py -c 5000 -w 8 --rate 2 --storage articles.db
+  python3 storage.py copy articles.db mysql
+"""
+
+import argparse
+import logging
+import sqlite3
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+from mysql.connector import Error
+
+from db_pool import get_pool
+
+# 可选依赖，只在使用Parquet存储时导入：pyarrow 导入后常驻约30MB内存，写MySQL的爬虫不需要承担
+pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+# 本地存储保存的字段：baoxianblog 中由爬虫填写的列，外加 post_id
+ARTICLE_FIELDS = (
+    'src_url', 'src_title', 'src_content', 'read_count', 'like_count',
+    'src_user', 'from_source', 'create_time', 'post_id'
+)
+
+
+INSERT_ARTICLE_SQL = """
+INSERT INTO baoxianblog
+(src_url, src_title, src_content, read_count, like_count, src_user,
+ from_source, create_time, update_time, isPublish, published_user)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+# 重新抓取时正文有变化的文章只更新内容相关的列，不改动 create_time / isPublish 等
+UPDATE_ARTICLE_SQL = """
+UPDATE baoxianblog
+SET src_title = %s, src_content = %s, read_count = %s, like_count = %s, update_time = %s
+WHERE src_url = %s AND from_source = %s
+"""
+
+
+def article_to_row(article_data):
+    """把文章字典转换为 INSERT_ARTICLE_SQL 的参数元组"""
+    return (
+        article_data['src_url'],
+        article_data['src_title'],
+        article_data['src_content'],
+        article_data['read_count'],
+        article_data['like_count'],
+        article_data['src_user'],
+        article_data['from_source'],
+        article_data['create_time'],
+        article_data['create_time'],
+        0,  # isPublish
+        article_data['src_user']
+    )
+
+
+def article_to_update_row(article_data):
+    """把文章字典转换为 UPDATE_ARTICLE_SQL 的参数元组"""
+    return (
+        article_data['src_title'],
+        article_data['src_content'],
+        article_data['read_count'],
+        article_data['like_count'],
+        article_data['create_time'],
+        article_data['src_url'],
+        article_data['from_source']
+    )
+
+
+class StorageError(Exception):
+    """存储读写失败"""
+
+
+class ArticleStorage:
+    """文章存储接口"""
+
+    # 只有MySQL存储提供数据库连接；正文指纹、统计刷新等直接使用 baoxianblog 的功能依赖它
+    connection = None
+
+    def connect(self):
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+    def is_connected(self):
+        raise NotImplementedError
+
+    def iter_src_urls(self):
+        """逐个产出已保存的i云保文章的 src_url"""
+        raise NotImplementedError
+
+    def exists(self, src_url):
+        """src_url 是否已保存"""
+        raise NotImplementedError
+
+    def write_articles(self, articles):
+        """在一个事务内写入一批文章，失败时回滚并抛出 StorageError"""
+        raise NotImplementedError
+
+    def recent_articles(self, limit=5):
+        """最新保存的文章 [(id, src_title, read_count, like_count, src_user)]"""
+        raise NotImplementedError
+
+
+class MySQLStorage(ArticleStorage):
+    """写入MySQL的 baoxianblog 表
+
+    连接取自 db_pool 的共享连接池，close() 时归还。查重和批量写入遇到连接断开时
+    原地重连并重试一次，远程库短暂断开不会让整次爬取失败。
+    """
+
+    def __init__(self, db_config, pool_size=None):
+        self.db_config = db_config
+        self.pool_size = pool_size  # 为 None 时使用 db_pool.DEFAULT_POOL_SIZE
+        self.pool = None
+        self.connection = None
+
+    def connect(self):
+        if self.pool is None:
+            self.pool = get_pool(self.db_config, self.pool_size)
+        try:
+            self.connection = self.pool.acquire()
+        except Error as e:
+            raise StorageError(e) from e
+
+    def close(self):
+        if self.connection is not None:
+            self.pool.release(self.connection)
+            self.connection = None
+
+    def is_connected(self):
+        return self.connection is not None and self.connection.is_connected()
+
+    def _retry_after_reconnect(self, error):
+        """操作失败且连接已断开时重连，返回是否应该重试"""
+        if self.connection is None or self.connection.is_connected():
+            return False
+        logger.warning(f"⚠️  数据库连接断开（{error}），重连后重试")
+        try:
+            self.pool.check(self.connection)
+            return True
+        except Error as e:
+            logger.error(f"✗ 数据库重连失败: {e}")
+            return False
+
+    def iter_src_urls(self):
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("SELECT src_url FROM baoxianblog WHERE from_source='iyunbao'")
+            while True:
+                rows = cursor.fetchmany(10000)
+                if not rows:
+                    break
+                for (src_url,) in rows:
+                    yield src_url
+            cursor.close()
+        except Error as e:
+            raise StorageError(e) from e
+
+    def exists(self, src_url):
+        try:
+            return self._exists(src_url)
+        except Error as e:
+            if not self._retry_after_reconnect(e):
+                raise StorageError(e) from e
+        try:
+            return self._exists(src_url)
+        except Error as e:
+            raise StorageError(e) from e
+
+    def _exists(self, src_url):
+        cursor = self.connection.cursor()
+        cursor.execute("SELECT id FROM baoxianblog WHERE src_url = %s LIMIT 1", (src_url,))
+        result = cursor.fetchone()
+        cursor.close()
+        return result is not None
+
+    def write_articles(self, articles):
+        try:
+            self._write_articles(articles)
+        except StorageError as e:
+            # 连接断开时事务没有提交，重连后整批重写
+            if not self._retry_after_reconnect(e):
+                raise
+            self._write_articles(articles)
+
+    def _write_articles(self, articles):
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.executemany(INSERT_ARTICLE_SQL, [article_to_row(a) for a in articles])
+            self.connection.commit()
+        except Error as e:
+            try:
+                self.connection.rollback()
+            except Error:
+                pass
+            raise StorageError(e) from e
+        finally:
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except Error:
+                    pass
+
+    def recent_articles(self, limit=5):
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("""
+            SELECT id, src_title, read_count, like_count, src_user
+            FROM baoxianblog
+            WHERE from_source='iyunbao'
+            ORDER BY id DESC
+            LIMIT %s
+            """, (limit,))
+            results = cursor.fetchall()
+            cursor.close()
+            return results
+        except Error as e:
+            raise StorageError(e) from e
+
+
+class MemoryStorage(ArticleStorage):
+    """进程内的替身存储：按 src_url 去重保存文章，不做任何I/O
+
+    keep_content=False 时不保留正文，基准测试测得的内存只反映爬虫本身，不随已写入的文章数增长。
+    write_latency 为每次 write_articles 的等待时间（秒），模拟远程数据库的往返和提交。
+    """
+
+    def __init__(self, articles=(), keep_content=True, write_latency=0.0):
+        self.rows = []
+        self.keep_content = keep_content
+        self.write_latency = write_latency
+        self._by_url = {}
+        self._connected = False
+        for article_data in articles:
+            self._add(article_data)
+
+    def _add(self, article_data):
+        if not self.keep_content:
+            article_data = {key: article_data[key] for key in ARTICLE_FIELDS if key != 'src_content'}
+            article_data['src_content'] = ''
+        self._by_url[article_data['src_url']] = len(self.rows)
+        self.rows.append(article_data)
+
+    def connect(self):
+        self._connected = True
+
+    def close(self):
+        self._connected = False
+
+    def is_connected(self):
+        return self._connected
+
+    def iter_src_urls(self):
+        return iter(list(self._by_url))
+
+    def exists(self, src_url):
+        return src_url in self._by_url
+
+    def write_articles(self, articles):
+        if self.write_latency:
+            time.sleep(self.write_latency)
+        for article_data in articles:
+            self._add(article_data)
+
+    def recent_articles(self, limit=5):
+        return [
+            (index + 1, a['src_title'], a['read_count'], a['like_count'], a['src_user'])
+            for index, a in reversed(list(enumerate(self.rows))[-limit:])
+        ]
+
+    def iter_articles(self):
+        return iter(list(self.rows))
+
+
+class SQLiteStorage(ArticleStorage):
+    """本地SQLite文件：WAL模式、synchronous=NORMAL，每次 write_articles 一个事务
+
+    句柄保存在 db 而不是 connection 中：connection 只用于MySQL专有的功能（如正文指纹表）。
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.db = None
+
+    def connect(self):
+        try:
+            # 爬虫的写库线程也会使用这个连接，由爬虫的 db_lock 保证同一时间只有一个线程访问
+            self.db = sqlite3.connect(self.path, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.execute("""
+                CREATE TABLE IF NOT EXISTS articles (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    src_url TEXT NOT NULL UNIQUE,
+                    src_title TEXT,
+                    src_content TEXT,
+                    read_count INTEGER,
+                    like_count INTEGER,
+                    src_user TEXT,
+                    from_source TEXT,
+                    create_time TEXT,
+                    post_id INTEGER
+                )
+            """)
+            self.db.commit()
+        except sqlite3.Error as e:
+            raise StorageError(e) from e
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def is_connected(self):
+        return self.db is not None
+
+    def iter_src_urls(self):
+        try:
+            for (src_url,) in self.db.execute("SELECT src_url FROM articles WHERE from_source='iyunbao'"):
+                yield src_url
+        except sqlite3.Error as e:
+            raise StorageError(e) from e
+
+    def exists(self, src_url):
+        try:
+            row = self.db.execute("SELECT 1 FROM articles WHERE src_url = ? LIMIT 1", (src_url,)).fetchone()
+            return row is not None
+        except sqlite3.Error as e:
+            raise StorageError(e) from e
+
+    def write_articles(self, articles):
+        rows = [
+            tuple(_local_value(a.get(field)) for field in ARTICLE_FIELDS)
+            for a in articles
+        ]
+        placeholders = ', '.join('?' for _ in ARTICLE_FIELDS)
+        try:
+            with self.db:  # 一个事务，异常时自动回滚
+                self.db.executemany(
+                    f"INSERT INTO articles ({', '.join(ARTICLE_FIELDS)}) VALUES ({placeholders})", rows
+                )
+        except sqlite3.Error as e:
+            raise StorageError(e) from e
+
+    def recent_articles(self, limit=5):
+        try:
+            return self.db.execute("""
+                SELECT id, src_title, read_count, like_count, src_user
+                FROM articles ORDER BY id DESC LIMIT ?
+            """, (limit,)).fetchall()
+        except sqlite3.Error as e:
+            raise StorageError(e) from e
+
+    def iter_articles(self):
+        """按写入顺序逐篇产出文章字典，create_time 还原为 datetime"""
+        try:
+            cursor = self.db.execute(f"SELECT {', '.join(ARTICLE_FIELDS)} FROM articles ORDER BY id")
+            while True:
+                rows = cursor.fetchmany(1000)
+                if not rows:
+                    break
+                for row in rows:
+                    article_data = dict(zip(ARTICLE_FIELDS, row))
+                    if article_data['create_time']:
+                        article_data['create_time'] = datetime.fromisoformat(article_data['create_time'])
+                    yield article_data
+        except sqlite3.Error as e:
+            raise StorageError(e) from e
+
+
+def _local_value(value):
+    """datetime 按 'YYYY-MM-DD HH:MM:SS' 保存，MySQL的DATETIME列可以直接接收"""
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return value
+
+
+def _require_pyarrow():
+    global pyarrow
+    if pyarrow is None:
+        try:
+            import pyarrow as module
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise StorageError("Parquet 存储需要安装 pyarrow：pip install pyarrow") from None
+        pyarrow = module
+
+
+class ParquetStorage(ArticleStorage):
+    """本地Parquet目录：每次运行写一个 part-*.parquet 文件，每批文章一个行组
+
+    Parquet 文件在关闭时才写入文件尾，之前的内容无法读取，因此爬取结束务必正常退出。
+    已保存的 src_url 在连接时从各个文件中读出，用于去重。
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._writer = None
+        self._src_urls = None
+        self._recent = deque(maxlen=20)
+        self._written = 0
+
+    def _schema(self):
+        return pyarrow.schema([
+            ('src_url', pyarrow.string()),
+            ('src_title', pyarrow.string()),
+            ('src_content', pyarrow.string()),
+            ('read_count', pyarrow.int64()),
+            ('like_count', pyarrow.int64()),
+            ('src_user', pyarrow.string()),
+            ('from_source', pyarrow.string()),
+            ('create_time', pyarrow.timestamp('s')),
+            ('post_id', pyarrow.int64()),
+        ])
+
+    def _parts(self):
+        return sorted(self.path.glob('part-*.parquet'))
+
+    def connect(self):
+        _require_pyarrow()
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            src_urls = set()
+            for part in self._parts():
+                table = pyarrow.parquet.read_table(part, columns=['src_url'])
+                src_urls.update(table.column('src_url').to_pylist())
+            self._src_urls = src_urls
+        except (OSError, pyarrow.ArrowException) as e:
+            raise StorageError(e) from e
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self._src_urls = None
+
+    def is_connected(self):
+        return self._src_urls is not None
+
+    def iter_src_urls(self):
+        return iter(list(self._src_urls))
+
+    def exists(self, src_url):
+        return src_url in self._src_urls
+
+    def write_articles(self, articles):
+        try:
+            table = pyarrow.Table.from_pylist(
+                [{field: a.get(field) for field in ARTICLE_FIELDS} for a in articles],
+                schema=self._schema()
+            )
+            if self._writer is None:
+                # 第一次写入时才创建文件，没有新文章的运行不会留下空文件
+                part = self.path / f"part-{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 10 ** 9:09d}.parquet"
+                self._writer = pyarrow.parquet.ParquetWriter(str(part), self._schema(), compression='zstd')
+            self._writer.write_table(table)
+        except (OSError, pyarrow.ArrowException) as e:
+            raise StorageError(e) from e
+        for a in articles:
+            self._src_urls.add(a['src_url'])
+            self._written += 1
+            self._recent.append((self._written, a['src_title'], a['read_count'], a['like_count'], a['src_user']))
+
+    def recent_articles(self, limit=5):
+        """本次运行最新写入的文章，编号为本次写入的序号"""
+        return list(reversed(self._recent))[:limit]
+
+    def iter_articles(self):
+        """逐篇产出所有 part 文件中的文章字典"""
+        _require_pyarrow()
+        try:
+            for part in self._parts():
+                for batch in pyarrow.parquet.ParquetFile(part).iter_batches(batch_size=1000):
+                    yield from batch.to_pylist()
+        except (OSError, pyarrow.ArrowException) as e:
+            raise StorageError(e) from e
+
+
+def open_storage(spec, db_config=None, pool_size=None):
+    """根据 --storage 参数打开存储：'mysql' 使用 db_config（连接池大小 pool_size），'memory' 为内存存储，
+    以 .parquet 结尾的为Parquet目录，其余视为SQLite文件路径"""
+    if spec == 'mysql':
+        return MySQLStorage(db_config, pool_size)
+    if spec == 'memory':
+        return MemoryStorage()
+    if spec.rstrip('/').endswith('.parquet'):
+        return ParquetStorage(spec)
+    return SQLiteStorage(spec)
+
+
+def copy_articles(source, target, batch_size=500):
+    """把本地存储中的文章逐批写入另一个存储，跳过目标中已有的 src_url，返回写入的文章数"""
+    existing = set(target.iter_src_urls())
+    batch = []
+    written = 0
+    for article_data in source.iter_articles():
+        if article_data['src_url'] in existing:
+            continue
+        existing.add(article_data['src_url'])
+        batch.append(article_data)
+        if len(batch) >= batch_size:
+            target.write_articles(batch)
+            written += len(batch)
+            logger.info(f"✓ 已导入 {written} 篇文章")
+            batch = []
+    if batch:
+        target.write_articles(batch)
+        written += len(batch)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='在文章存储之间复制文章，例如把本地SQLite/Parquet导入MySQL')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    copy_parser = subparsers.add_parser('copy', help='复制文章，目标中已有的 src_url 跳过')
+    copy_parser.add_argument('source', help='来源：SQLite文件路径或 .parquet 目录')
+    copy_parser.add_argument('target', help="目标：'mysql' 或另一个本地存储")
+    copy_parser.add_argument('--batch-size', type=int, default=500, help='每个事务写入的文章数，默认：500')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    from iyunbao_crawler import DB_CONFIG  # 避免 iyunbao_crawler ↔ storage 循环导入
+    source = open_storage(args.source)
+    target = open_storage(args.target, DB_CONFIG)
+    if not hasattr(source, 'iter_articles'):
+        logger.error(f"✗ 不能从 {args.source} 读取文章")
+        return False
+    try:
+        source.connect()
+        target.connect()
+        started = time.monotonic()
+        written = copy_articles(source, target, args.batch_size)
+        logger.info(f"✓ 共导入 {written} 篇文章，耗时 {time.monotonic() - started:.1f} 秒")
+        return True
+    except StorageError as e:
+        logger.error(f"✗ 导入失败: {e}")
+        return False
+    finally:
+        source.close()
+        target.close()
+
+
+if __name__ == '__main__':
+    main()